@@ -1,6 +1,377 @@
 import sys 
+import os
+import re
+import io
+import mmap
+import json
+import shutil
+import tempfile
+import time
+import hashlib
+import zlib
+import logging
+import functools
+import collections
+import itertools
+import concurrent.futures
+import asyncio
 import numpy as np
 
+# Exact powers of ten. Any product/quotient of an integer mantissa below
+# 2**53 with one of these is correctly rounded, i.e. identical to float().
+_POW10 = np.array([10.0**i for i in range(23)])
+
+# 10**k for k = -22..22 (at index k+22) as a factor and a divisor, one of
+# which is 1, so that scaling by both rounds once, like float().
+_POW10_UP = np.concatenate([np.ones(len(_POW10)-1),_POW10])
+_POW10_DOWN = np.concatenate([_POW10[:0:-1],np.ones(len(_POW10))])
+
+# Number of data rows decoded per pass by the bulk parser. Keeps the
+# transposed character block resident in cache.
+_BULK_CHUNK_ROWS = 16384
+
+# Rows transposed per copy by the bulk parser. Small enough for the rows
+# being read to stay in L1 cache.
+_TRANSPOSE_ROWS = 512
+
+# Digits per group the bulk parser sums in float32 (exact below 2**24).
+_DIGIT_GROUP = 7
+
+# Longest data row the fixed-width fast path will look for.
+_MAX_ROW_LEN = 4096
+
+# Parallel parsing: row sections are cut into about this many pieces
+# per worker, but never into pieces smaller than the minimum.
+_PARALLEL_PIECES = 4
+_PARALLEL_MIN_ROWS = 65536
+
+# Number of points MeshTalInterpolator processes per pass.
+_INTERP_CHUNK_POINTS = 1 << 18
+
+# Title lines of the tables in a matrix-format (OUT=ij/ik/jk) block.
+_MATRIX_TABLE = re.compile(
+    rb"Tally Results:[ \t]+([XYZ])[ \t]+\(across\)[ \t]+by[ \t]+"
+    rb"([XYZ])[ \t]+\(down\)|Relative Errors")
+_NEWLINE = re.compile(rb"\n")
+
+# Default number of data rows per chunk of a MeshTalStream.
+_STREAM_CHUNK_ROWS = 1 << 20
+
+# Data rows per piece when parsing column-format data into the sparse
+# layout. Small enough that the mapped pages released behind each
+# piece keep the RSS down.
+_SPARSE_CHUNK_ROWS = 1 << 16
+
+# Bumped whenever the layout of the sidecar cache changes.
+_CACHE_VERSION = 2
+
+# Progress and diagnostics go through this logger (name "MMPP"). Nothing
+# is shown unless the application configures logging, e.g.
+# logging.basicConfig(level=logging.INFO).
+logger = logging.getLogger("MMPP")
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class MeshTalStats:
+    """ Per-phase instrumentation. Every phase (header scan, storage
+    allocation, data parse, slice extraction, ...) adds its call count,
+    elapsed time, data rows processed and bytes allocated to the
+    module-level instance MMPP.stats. Phases may nest: the allocation
+    of a block is part of its parse. """
+
+    def __init__(self):
+        self.hooks = []
+        self.enabled = True
+        self._totals = {}
+
+    # #####################################################
+    def __repr__(self):
+        return self.Report()
+
+    # #####################################################
+    @property
+    def phases(self):
+        """ {name: {"calls","seconds","rows","bytes"}} of every phase
+        recorded so far, in order of first occurrence. """
+        return {name:dict(zip(("calls","seconds","rows","bytes"),total))
+                for name,total in self._totals.items()}
+
+    # #####################################################
+    def Reset(self):
+        """ Forgets all recorded phases (the hooks are kept). """
+        self._totals = {}
+
+    # #####################################################
+    def AddHook(self,hook):
+        """ Calls hook(name,record) after every phase, where record is a
+        dict of the phase's "seconds", "rows" and "bytes". Use it to
+        forward timings to a metrics system. """
+        self.hooks.append(hook)
+
+    # #####################################################
+    def RemoveHook(self,hook):
+        """ Stops calling a hook added with AddHook. """
+        self.hooks.remove(hook)
+
+    # #####################################################
+    def Record(self,name,seconds,rows=0,num_bytes=0):
+        """ Adds one run of a phase. """
+
+        if not self.enabled:
+            return
+        total = self._totals.get(name)
+        if total is None:
+            total = self._totals[name] = [0,0.0,0,0]
+        total[0] += 1
+        total[1] += seconds
+        total[2] += rows
+        total[3] += num_bytes
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s: %.6f s, %d rows, %d bytes",name,seconds,
+                         rows,num_bytes)
+        if self.hooks:
+            record = {"seconds":seconds,"rows":rows,"bytes":num_bytes}
+            for hook in self.hooks:
+                hook(name,record)
+
+    # #####################################################
+    def Report(self):
+        """ The recorded phases as a table (time, rows/s, MB). """
+
+        lines = ["%-14s %8s %11s %14s %14s %11s" %
+                 ("phase","calls","seconds","rows","rows/s","MB")]
+        for name,(calls,seconds,rows,num_bytes) in self._totals.items():
+            rate = rows/seconds if seconds > 0.0 else 0.0
+            lines.append("%-14s %8d %11.4f %14d %14.0f %11.1f" %
+                         (name,calls,seconds,rows,rate,num_bytes/2.0**20))
+        return "\n".join(lines)
+
+stats = MeshTalStats()
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class _Phase:
+    """ Don't use this class outside MMPP.
+    Times a with-block as one run of a phase in stats. The rows and
+    bytes attributes can be set inside the block. """
+
+    __slots__ = ("name","rows","bytes","start")
+
+    def __init__(self,name,rows=0,num_bytes=0):
+        self.name = name
+        self.rows = rows
+        self.bytes = num_bytes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self,*exc_info):
+        stats.Record(self.name,time.perf_counter()-self.start,self.rows,
+                     self.bytes)
+        return False
+
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _AxisNumber(axis):
+    """ Maps an axis given as 0/1/2 or "x"/"y"/"z" to 0/1/2. """
+
+    names = {"x":0,"y":1,"z":2}
+    if isinstance(axis,str) and (axis.lower() in names):
+        return names[axis.lower()]
+    if axis in (0,1,2):
+        return int(axis)
+    raise ValueError("axis must be 0, 1, 2 or 'x', 'y', 'z', not " +
+                     repr(axis))
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _BinIndex(upper_bounds,lower_bound,values,side):
+    """ Vectorized bin lookup. Bin i spans up to upper_bounds[i];
+    side is passed to np.searchsorted ("left": a value on a bound
+    belongs to the lower bin). Returns -1 for values below lower_bound,
+    above the last bound or NaN. """
+
+    upper_bounds = np.asarray(upper_bounds,dtype=np.float64)
+    values = np.asarray(values,dtype=np.float64)
+    index = np.searchsorted(upper_bounds,values,side)
+    outside = (index >= len(upper_bounds)) | ~(values >= lower_bound)
+    return np.where(outside,-1,index)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _PlaneIndex(edges,value):
+    """ Don't use this method outside MMPP. The bin of a coordinate
+    along one axis for the slice methods: the _BinIndex rule used by
+    UnpackGiven* and FindBins (a value on a boundary belongs to the
+    lower bin), with values outside the mesh clamped to the first or
+    last bin. """
+
+    index = int(_BinIndex(edges[1:],edges[0],value,"left"))
+    if index < 0:
+        index = 0 if value < edges[0] else len(edges)-2
+    return index
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _EnergyGroupMidpoints(block):
+    """ Midpoints of the energy groups of a block (the total excluded):
+    geometric where the lower bound is positive, half the upper bound
+    for a group starting at 0. """
+
+    highs = np.array(block.e_bins,dtype=np.float64)
+    lows = np.concatenate([[block.bin_lows[3]],highs[:-1]])
+    return np.where(lows > 0,np.sqrt(np.abs(lows*highs)),0.5*highs)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class _SparseBuilder:
+    """ Don't use this class outside MMPP.
+    Collects the nonzero voxels of a sparse block piece by piece.
+    Flat indices are stored as int32 when the block has fewer than
+    2**31 voxels. """
+
+    def __init__(self,size,dtype):
+        self.index_dtype = np.int32 if size < 2**31 else np.int64
+        self.dtype = dtype
+        self.pieces = []
+
+    def Add(self,flat,values,rel_error):
+        """ Keeps the voxels of a piece that score or have an error. """
+        keep = (values != 0.0) | (rel_error != 0.0)
+        self.pieces.append((flat[keep].astype(self.index_dtype),
+                            values[keep].astype(self.dtype),
+                            rel_error[keep].astype(self.dtype)))
+
+    def Finish(self):
+        """ Returns the (index,values,rel_error) arrays, sorted by
+        index. """
+        if len(self.pieces) == 0:
+            return (np.zeros(0,dtype=self.index_dtype),
+                    np.zeros(0,dtype=self.dtype),
+                    np.zeros(0,dtype=self.dtype))
+        index,values,errors = [np.concatenate(p) for p in
+                               zip(*self.pieces)]
+        self.pieces = []
+        if np.any(np.diff(index) < 0):
+            order = np.argsort(index,kind="stable")
+            index,values,errors = index[order],values[order],errors[order]
+        return index,values,errors
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class MeshTalCache:
+    """ Least-recently-used memo of the results of a block's slice,
+    line and QueryPoints calls, bounded by a number of entries and a
+    number of bytes. The block's data arrays are made read-only
+    while results computed from them are kept, so that editing them in
+    place raises instead of leaving stale results. See
+    MeshTalBlock.EnableCache. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,max_entries=64,max_bytes=64 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._locked = []         # Arrays made read-only by Put
+
+    # #####################################################
+    def __len__(self):
+        return len(self._entries)
+
+    # #####################################################
+    def __repr__(self):
+        return "<MeshTalCache %d entries, %.1f MB, %d hits, %d misses>" % \
+               (len(self._entries),self.num_bytes/2.0**20,self.hits,
+                self.misses)
+
+    # #####################################################
+    def Get(self,key):
+        """ The result stored under key, or None. """
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    # #####################################################
+    def Put(self,key,result,sources=()):
+        """ Stores read-only copies of the arrays of a result tuple,
+        evicting the least recently used entries beyond the bounds.
+        A result larger than max_bytes is not stored.
+
+        Arguments:
+            key: [tuple] Hashable key of the result.
+            result: [tuple] Arrays to store.
+            sources: [list of arrays] Arrays the result was computed
+                     from. They stay read-only until Clear.
+
+        Returns:
+            result: [tuple] The stored copies. """
+
+        result = tuple(a.copy() if isinstance(a,np.ma.MaskedArray) else
+                       np.array(a) for a in result)
+        num_bytes = 0
+        for a in result:
+            a.flags.writeable = False
+            num_bytes += a.nbytes
+            if isinstance(a,np.ma.MaskedArray) and \
+               isinstance(a.mask,np.ndarray):
+                a.mask.flags.writeable = False
+        if num_bytes > self.max_bytes:
+            return result
+
+        for a in sources:
+            if a.flags.writeable:
+                a.flags.writeable = False
+                self._locked.append(a)
+        if key in self._entries:
+            self.num_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (result,num_bytes)
+        self.num_bytes += num_bytes
+        while (len(self._entries) > self.max_entries) or \
+              (self.num_bytes > self.max_bytes):
+            self.num_bytes -= self._entries.popitem(last=False)[1][1]
+            self.evictions += 1
+        return result
+
+    # #####################################################
+    def Clear(self):
+        """ Drops every entry (the counters are kept) and makes the
+        arrays locked by Put writeable again. """
+        self._entries.clear()
+        self.num_bytes = 0
+        for a in self._locked:
+            a.flags.writeable = True
+        self._locked = []
+
+    # #####################################################
+    def Stats(self):
+        """ Hits, misses, evictions, entries and bytes as a dict. """
+
+        calls = self.hits+self.misses
+        return {"hits":self.hits,
+                "misses":self.misses,
+                "hit_rate":self.hits/calls if calls else 0.0,
+                "evictions":self.evictions,
+                "entries":len(self._entries),
+                "bytes":self.num_bytes}
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _PointsKey(x,y,z,e):
+    """ Don't use this method outside MMPP.
+    Cache key of a QueryPoints batch: a digest of the coordinates. """
+
+    digest = hashlib.blake2b(digest_size=16)
+    for a in (x,y,z,e):
+        if a is None:
+            digest.update(b"-")
+            continue
+        a = np.ascontiguousarray(a,dtype=np.float64)
+        digest.update(repr(a.shape).encode("ascii"))
+        digest.update(a.data)
+    return digest.hexdigest()
 
 # $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
 class MeshTalBlock:
@@ -17,67 +388,599 @@ class MeshTalBlock:
         self.y_bins = []
         self.z_bins = []
         self.bin_lims = [0.0,0.0,0.0,0.0]
+        self.bin_lows = [0.0,0.0,0.0,0.0]
         self.nx = 0
         self.ny = 0
         self.nz = 0
         self.ng = 0
+        self.tally_number = 0
+        self.particle = ""
+        self.histories = 0.0      # Histories the tally is normalized to
+        self.index = None
+        self.layout = "full"
+        self.dtype = np.float64
+        self.pyramid = None       # MeshTalPyramid, see BuildPyramid
+        self.cache = None         # MeshTalCache, see EnableCache
+        self._data_loader = None
         self.data_values = []
-        print("MeshTalBlock created")
-      
+        logger.debug("MeshTalBlock created")
+
+    # #####################################################
+    @property
+    def data_values(self):
+        """ [ng,nx,ny,nz,5] array of X, Y, Z, Result and Rel Error.
+        Blocks read lazily parse it on first access. Compact and
+        sparse blocks assemble it from their fields on every access. """
+        self.LoadDataValues()
+        if self.layout != "full":
+            return np.stack([self._Column(c) for c in range(0,5)],
+                            axis=-1)
+        return self._data_values
+
+    @data_values.setter
+    def data_values(self,values):
+        self._data_loader = None
+        self.layout = "full"
+        self._data_values = values
+        self._x_centers = None
+        self._y_centers = None
+        self._z_centers = None
+        self._values = None
+        self._rel_error = None
+        self._sparse = None
+        self.pyramid = None
+        self._ClearCache()
+
+    # #####################################################
+    @property
+    def values(self):
+        """ [ng,nx,ny,nz] Results. A strided view into data_values for
+        the full layout, a contiguous array for the compact one, and
+        a dense array built on every access for the sparse one. """
+        return self._Column(3)
+
+    # #####################################################
+    @property
+    def rel_error(self):
+        """ [ng,nx,ny,nz] Relative errors. """
+        return self._Column(4)
+
+    # #####################################################
+    @property
+    def x_centers(self):
+        """ [nx] X coordinates of the voxel centers. """
+        return self._Column(0)[0,:,0,0]
+
+    # #####################################################
+    @property
+    def y_centers(self):
+        """ [ny] Y coordinates of the voxel centers. """
+        return self._Column(1)[0,0,:,0]
+
+    # #####################################################
+    @property
+    def z_centers(self):
+        """ [nz] Z coordinates of the voxel centers. """
+        return self._Column(2)[0,0,0,:]
+
+    # #####################################################
+    def _Column(self,c):
+        """ Returns column c (0-4: X, Y, Z, Result, Rel Error) of the
+        data as a [ng,nx,ny,nz] array without copying. Coordinates of
+        compact and sparse blocks are broadcast (read-only) views of
+        the 1-D center arrays. Results and errors of sparse blocks are
+        densified into a new array. """
+
+        self.LoadDataValues()
+        if self.layout == "full":
+            return self._data_values[...,c]
+
+        shape = (self.ng,self.nx,self.ny,self.nz)
+        if c == 0:
+            return np.broadcast_to(
+                self._x_centers.reshape([1,self.nx,1,1]),shape)
+        if c == 1:
+            return np.broadcast_to(
+                self._y_centers.reshape([1,1,self.ny,1]),shape)
+        if c == 2:
+            return np.broadcast_to(
+                self._z_centers.reshape([1,1,1,self.nz]),shape)
+        if self.layout == "sparse":
+            index,values,errors = self._sparse
+            dense = np.zeros(shape,dtype=self.dtype)
+            dense.reshape(-1)[index] = values if c == 3 else errors
+            return dense
+        if c == 3:
+            return self._values
+        return self._rel_error
+
+    # #####################################################
+    def _DataArrays(self):
+        """ Don't use this method outside MMPP.
+        The arrays holding the data in the current layout. """
+
+        if self.layout == "full":
+            return [self._data_values] \
+                   if isinstance(self._data_values,np.ndarray) else []
+        arrays = [self._x_centers,self._y_centers,self._z_centers]
+        if self.layout == "sparse":
+            return arrays + list(self._sparse)
+        return arrays + [self._values,self._rel_error]
+
+    # #####################################################
+    def _Select(self,c,sel):
+        """ Don't use this method outside MMPP.
+        _Column(c)[sel] for the selections used by slice, line and
+        QueryPoints: integers and slices, or integer arrays that
+        broadcast together. Sparse blocks look the voxels up without
+        densifying. """
+
+        if (self.layout != "sparse") or (c < 3):
+            return self._Column(c)[sel]
+        self.LoadDataValues()
+
+        shape = (self.ng,self.nx,self.ny,self.nz)
+        if any(isinstance(s,slice) for s in sel):
+            axes = [np.arange(n)[s] if isinstance(s,slice) else
+                    np.array([s+n if s < 0 else s])
+                    for n,s in zip(shape,sel)]
+            flat = np.ravel_multi_index(np.ix_(*axes),shape).reshape(
+                [len(a) for a,s in zip(axes,sel) if isinstance(s,slice)])
+        else:
+            sel = [np.where(np.asarray(s) < 0,np.asarray(s)+n,s)
+                   for n,s in zip(shape,sel)]
+            flat = np.ravel_multi_index(np.broadcast_arrays(*sel),shape)
+        return self._SparseLookup(flat)[c-3]
+
+    # #####################################################
+    def _SparseLookup(self,flat):
+        """ Don't use this method outside MMPP.
+        Values and relative errors of a sparse block at flat indices
+        into [ng,nx,ny,nz], with a binary search over the stored
+        indices. Voxels that are not stored are zero. """
+
+        index,values,errors = self._sparse
+        flat = np.asarray(flat).astype(index.dtype,copy=False)
+        v = np.zeros(flat.shape,dtype=values.dtype)
+        u = np.zeros(flat.shape,dtype=errors.dtype)
+        if len(index) == 0:
+            return v,u
+        pos = np.minimum(np.searchsorted(index,flat),len(index)-1)
+        found = index[pos] == flat
+        v[found] = values[pos[found]]
+        u[found] = errors[pos[found]]
+        return v,u
+
+    # #####################################################
+    def NonzeroVoxels(self):
+        """ The voxels with a nonzero result or relative error, in any
+        layout (a sparse block returns its storage).
+
+        Returns:
+            index: [int array] Sorted flat indices into [ng,nx,ny,nz]
+                   (see np.unravel_index).
+            values: [float array] Results.
+            rel_error: [float array] Relative errors. """
+
+        self.LoadDataValues()
+        if self.layout == "sparse":
+            return self._sparse
+        nvox = self.nx*self.ny*self.nz
+        builder = _SparseBuilder(self.ng*nvox,self.dtype)
+        values,errors = self._Column(3),self._Column(4)
+        for g in range(0,self.ng):
+            builder.Add(np.arange(g*nvox,(g+1)*nvox),values[g].ravel(),
+                        errors[g].ravel())
+        return builder.Finish()
+
+    # #####################################################
+    def SetDataLoader(self,loader):
+        """ Don't use this method outside MMPP.
+        Defers loading the data to loader(block), called on first
+        access. """
+        self._data_loader = loader
+
+    # #####################################################
+    def _ClearCache(self):
+        """ Don't use this method outside MMPP.
+        Drops the cached query results, if any. Called wherever the
+        data arrays are replaced. """
+        if self.cache is not None:
+            self.cache.Clear()
+
+    # #####################################################
+    def LoadDataValues(self):
+        """ Parses the data now if it was deferred. """
+        if self._data_loader is not None:
+            loader = self._data_loader
+            self._data_loader = None
+            pyramid = self.pyramid
+            loader(self)
+            self.pyramid = pyramid
+            self._ClearCache()
+
+    # #####################################################
+    def IsLoaded(self):
+        """ False while the data is still deferred. """
+        return self._data_loader is None
+
+    # #####################################################
+    def ParseDataSection(self,data,on_chunk=None):
+        """ Don't use this method outside MMPP.
+        Fills the block's storage, in its layout and dtype, from the
+        column-format data rows of the block.
+
+        Arguments:
+            data: [bytes-like] The data section, starting at the first
+                  row after the "Energy X Y Z Result Rel Error"
+                  header.
+            on_chunk: [callable] See _ParseDataRows. """
+
+        num_rows = self.ng*self.nx*self.ny*self.nz
+        self.SizeDataValues()
+        if self.layout == "sparse":
+            self.__ParseSparseRows(data,num_rows,on_chunk)
+            return
+        if self.layout == "full":
+            rows = self._data_values.reshape([-1,5])
+            _ParseDataRows(data,num_rows,[rows[:,c] for c in range(0,5)],
+                           on_chunk)
+            return
+
+        # Only the result and error columns are stored per row; the
+        # coordinates are picked from the rows of the first group.
+        out = [None,None,None,self._values.reshape(-1),
+               self._rel_error.reshape(-1)]
+        out,row_len = _ParseDataRows(data,num_rows,out,on_chunk)
+        self._x_centers,self._y_centers,self._z_centers = \
+            _ParseCenters(data,self.nx,self.ny,self.nz,row_len)
+
+    # #####################################################
+    def __ParseSparseRows(self,data,num_rows,on_chunk):
+        """ Column-format parse of a sparse block. The rows are decoded
+        _SPARSE_CHUNK_ROWS at a time and only the nonzero voxels of
+        each piece are kept, so the dense arrays never exist. """
+
+        builder = _SparseBuilder(num_rows,self.dtype)
+        row_len = bytes(data[:_MAX_ROW_LEN]).find(b"\n")+1
+        lines = None
+        for r0 in range(0,num_rows,_SPARSE_CHUNK_ROWS):
+            r1 = min(r0+_SPARSE_CHUNK_ROWS,num_rows)
+            out = [None,None,None,np.empty(r1-r0),np.empty(r1-r0)]
+            if (lines is None) and (row_len > 0) and \
+               (r1*row_len <= len(data)) and \
+               (_ParseDataRowsFixedWidth(data[r0*row_len:r1*row_len],
+                                         r1-r0,out) > 0):
+                if on_chunk is not None:
+                    on_chunk(r1*row_len)
+            else:
+                if lines is None:
+                    # Rows of varying length: walk the rest line by line
+                    lines = io.BytesIO(data[max(row_len,0)*r0:])
+                parsed = np.loadtxt(itertools.islice(lines,r1-r0),
+                                    usecols=(4,5),ndmin=2)
+                out[3],out[4] = parsed[:,0],parsed[:,1]
+            builder.Add(np.arange(r0,r1),out[3],out[4])
+
+        self._sparse = builder.Finish()
+        self._x_centers,self._y_centers,self._z_centers = \
+            _ParseCenters(data,self.nx,self.ny,self.nz,
+                          row_len if lines is None else 0)
+
+    # #####################################################
+    def ParseMatrixSection(self,data,on_chunk=None):
+        """ Don't use this method outside MMPP.
+        Fills the block's storage, in its layout and dtype, from the
+        matrix-format (FMESH OUT=ij, ik or jk) tables of the block.
+        Tables come per energy group (the total last) and, within a
+        group, per bin of the axis that is neither across nor down.
+
+        Arguments:
+            data: [bytes-like] The data section, starting at the first
+                  line after the "Energy bin boundaries:" line.
+            on_chunk: [callable] Optional. Called with the offset
+                      past the last table parsed, after every batch
+                      of tables. """
+
+        dims = [self.nx,self.ny,self.nz]
+        self.SizeDataValues()
+        sparse = None
+        if self.layout == "sparse":
+            # Tables are paired up and only their nonzero voxels kept
+            sparse = _SparseBuilder(self.ng*self.nx*self.ny*self.nz,
+                                    self.dtype)
+            pending = {}
+        elif self.layout == "compact":
+            values = self._values
+            errors = self._rel_error
+        else:
+            full = self._data_values
+            values = full[...,3]
+            errors = full[...,4]
+
+        # Axes that never show up across or down keep the bin midpoints
+        centers = []
+        for k,bins in enumerate([self.x_bins,self.y_bins,self.z_bins]):
+            edges = np.array([self.bin_lows[k]]+list(bins))
+            centers.append(0.5*(edges[1:]+edges[:-1]))
+
+        ############################## Locate the tables
+        # The rows are skipped here and parsed below, all tables of one
+        # layout together.
+        groups = {}
+        num_tables = 0
+        num_other = 1
+        for table in _IterMatrixTables(data,self):
+            is_error,g,c,across,down,across_centers,start,end,layout = \
+                table
+            if not is_error:
+                num_tables += 1
+                num_other = dims[3-across-down]
+            centers[across] = across_centers
+            group = groups.setdefault((layout,across,down),[])
+            group.append((is_error,g,c,start,end))
+
+        ############################## Parse the tables
+        # A batch of about _STREAM_CHUNK_ROWS values at a time
+        for (layout,across,down),group in groups.items():
+            other = 3-across-down
+            batch = max(1,_STREAM_CHUNK_ROWS // (dims[down]*dims[across]))
+            for t0 in range(0,len(group),batch):
+                part = group[t0:t0+batch]
+                down_centers,tables = _ParseMatrixTables(
+                    data,[t[3] for t in part],[t[4] for t in part],layout,
+                    dims[down],dims[across])
+                for (is_error,g,c,start,end),table in zip(part,tables):
+                    if sparse is None:
+                        target = errors if is_error else values
+                        np.transpose(target[g],(other,down,across))[c] = \
+                            table
+                        continue
+                    pair = pending.setdefault((across,down,g,c),[None,None])
+                    pair[int(is_error)] = table
+                    if pair[0] is not None and pair[1] is not None:
+                        del pending[(across,down,g,c)]
+                        self.__AddSparseTable(sparse,g,c,across,down,pair)
+                centers[down] = down_centers[0]
+                if on_chunk is not None:
+                    on_chunk(part[-1][4])
+        if sparse is not None:
+            for (across,down,g,c),pair in pending.items():
+                zeros = np.zeros([dims[down],dims[across]])
+                pair = [zeros if t is None else t for t in pair]
+                self.__AddSparseTable(sparse,g,c,across,down,pair)
+
+        ############################## Check the groups
+        num_groups = num_tables // num_other
+        single = (num_groups == 1) and (self.ng == 2)
+        if (not single) and \
+           ((num_groups != self.ng) or (num_tables % num_other != 0)):
+            raise ValueError("Mesh tally %d: found %d matrix tables, "
+                             "expected %d" % (self.tally_number,
+                             num_tables,self.ng*num_other))
+        if sparse is not None:
+            index,v,u = sparse.Finish()
+            if single:
+                # A single energy bin has no separate total
+                nvox = self.nx*self.ny*self.nz
+                index = np.concatenate([index,index+nvox])
+                v = np.concatenate([v,v])
+                u = np.concatenate([u,u])
+            self._sparse = (index,v,u)
+        elif single:
+            values[1] = values[0]
+            errors[1] = errors[0]
+
+        ############################## Store the centers
+        if self.layout != "full":
+            self._x_centers,self._y_centers,self._z_centers = centers
+            return
+        for k in range(0,3):
+            view = [1,1,1,1]
+            view[k+1] = dims[k]
+            full[...,k] = centers[k].reshape(view)
+
+    # #####################################################
+    def __AddSparseTable(self,sparse,g,c,across,down,pair):
+        """ Adds the nonzero voxels of a Tally Results / Relative Errors
+        table pair of a matrix-format section to a _SparseBuilder. """
+
+        dims = [self.nx,self.ny,self.nz]
+        index = [None,None,None]
+        index[3-across-down] = c
+        index[down] = np.arange(0,dims[down]).reshape([-1,1])
+        index[across] = np.arange(0,dims[across]).reshape([1,-1])
+        ix,iy,iz = np.broadcast_arrays(*index)
+        flat = np.ravel_multi_index((g,ix,iy,iz),
+                                    (self.ng,self.nx,self.ny,self.nz))
+        sparse.Add(flat.ravel(),pair[0].ravel(),pair[1].ravel())
+
+    # #####################################################
+    def ToCompact(self,dtype=np.float64):
+        """ Converts the block to the compact layout: 1-D x/y/z_centers
+        plus contiguous values and rel_error arrays of shape
+        [ng,nx,ny,nz], stored as dtype (np.float32 or np.float64).
+        The 5-column data_values tensor is released. """
+
+        self._ClearCache()
+        if self.layout == "compact":
+            if self.IsLoaded():
+                self._values = self._values.astype(dtype,copy=False)
+                self._rel_error = \
+                    self._rel_error.astype(dtype,copy=False)
+            self.dtype = dtype
+            return
+
+        self.LoadDataValues()
+        if self.layout == "sparse":
+            if self._sparse is not None:
+                self._values = self._Column(3).astype(dtype,copy=False)
+                self._rel_error = self._Column(4).astype(dtype,copy=False)
+            self._sparse = None
+            self.dtype = dtype
+            self.layout = "compact"
+            return
+        full = self._data_values
+        self.dtype = dtype
+        if len(full) == 0:
+            self.layout = "compact"
+            return
+        self._x_centers = full[0,:,0,0,0].copy()
+        self._y_centers = full[0,0,:,0,1].copy()
+        self._z_centers = full[0,0,0,:,2].copy()
+        self._values = np.ascontiguousarray(full[...,3],dtype=dtype)
+        self._rel_error = np.ascontiguousarray(full[...,4],dtype=dtype)
+        self._data_values = []
+        self.layout = "compact"
+
+    # #####################################################
+    def ToSparse(self,dtype=np.float64):
+        """ Converts the block to the sparse layout: only the voxels
+        with a nonzero result or relative error are kept, as sorted flat
+        indices into [ng,nx,ny,nz] with their values and rel_error
+        (stored as dtype), plus 1-D x/y/z_centers. Memory scales with
+        the number of nonzero voxels. slice, line, QueryPoints and
+        MeshTalInterpolator work without densifying; values, rel_error
+        and data_values build dense arrays on access, and ToCompact
+        densifies the block for good. """
+
+        self._ClearCache()
+        if self.layout == "sparse":
+            if self.IsLoaded() and (self._sparse is not None):
+                index,values,errors = self._sparse
+                self._sparse = (index,values.astype(dtype,copy=False),
+                                errors.astype(dtype,copy=False))
+            self.dtype = dtype
+            return
+
+        self.LoadDataValues()
+        self.dtype = dtype
+        if (self.layout == "full") and (len(self._data_values) == 0):
+            self.layout = "sparse"
+            return
+        sparse = self.NonzeroVoxels()
+        centers = (self.x_centers.copy(),self.y_centers.copy(),
+                   self.z_centers.copy())
+        self.data_values = []
+        self._x_centers,self._y_centers,self._z_centers = centers
+        self._sparse = sparse
+        self.layout = "sparse"
+
     # #####################################################  
     def __ChooseCellE(self,EValue,verbose=True):
         """ Chooses an energy-bin based on a specific value for the
         energy. """
-        index = len(self.e_bins)-1
-        for a in range(0,len(self.e_bins)):
-            if (self.e_bins[a] > EValue):
-                index = a
-                break
+        index = min(int(np.searchsorted(self.e_bins,EValue,"right")),
+                    len(self.e_bins)-1)
             
-            
-        print("The chosen energy bin is " + 
-              str(index) + " with upper limit " + 
-              str(self.e_bins[index] ))
+        logger.debug("The chosen energy bin is %d with upper limit %g",
+                     index,self.e_bins[index])
         return index
       
     # #####################################################  
     def __ChooseCellX(self,XValue):
         """ Chooses coordinate bin based on specific value. """
 
-        index = (len(self.x_bins))-1
-        for a in range(0,len(self.x_bins)):
-            if (XValue <= self.x_bins[a]):
-                index = a
-                break
-        print("The chosen X coordinate is " + str(self.x_bins[index] ))
+        index = min(int(np.searchsorted(self.x_bins,XValue,"left")),
+                    len(self.x_bins)-1)
+        logger.debug("The chosen X coordinate is %g",self.x_bins[index])
         return index
 
     # #####################################################
     def __ChooseCellY(self,YValue):
         """ Chooses coordinate bin based on specific value. """
 
-        index = (len(self.y_bins))-1
-        for a in range(0,len(self.y_bins)):
-            if(YValue <= self.y_bins[a]):
-                index = a
-                break
-        print("The chosen Y coordinate is " + str(self.y_bins[index] ))
+        index = min(int(np.searchsorted(self.y_bins,YValue,"left")),
+                    len(self.y_bins)-1)
+        logger.debug("The chosen Y coordinate is %g",self.y_bins[index])
         return index
      
     # ##################################################### 
     def __ChooseCellZ(self,ZValue):
         """ Chooses coordinate bin based on specific value. """
 
-        index = (len(self.z_bins))-1
-        for a in range(0,len(self.z_bins)):
-            if(ZValue <= self.z_bins[a]):
-                index = a
-                break
-        print("The chosen Z coordinate is " + str(self.z_bins[index] ))
+        index = min(int(np.searchsorted(self.z_bins,ZValue,"left")),
+                    len(self.z_bins)-1)
+        logger.debug("The chosen Z coordinate is %g",self.z_bins[index])
         return index
+
+    # #####################################################
+    def FindBins(self,x,y,z,e=None):
+        """ Finds the bins containing a batch of points with a binary
+        search over the bin bounds. The rules match the single-value
+        choices of UnpackGivenXE etc.: a coordinate on a boundary
+        belongs to the lower bin, and the energy bin is the first one
+        whose upper bound exceeds e. Points outside the mesh are not
+        clamped but flagged.
+
+        Arguments:
+            x,y,z: [float arrays] Point coordinates. Broadcast
+                   together with e.
+            e: [float array] Optional point energies. If None all
+               points get the total bin (ng-1).
+
+        Returns:
+            ix,iy,iz,ie: [int arrays] Bin indices; -1 where the point
+                         is outside the mesh along that direction.
+            inside: [bool array] True where all four indices are
+                    valid. """
+
+        if e is None:
+            x,y,z = np.broadcast_arrays(np.asarray(x,dtype=np.float64),
+                                        np.asarray(y,dtype=np.float64),
+                                        np.asarray(z,dtype=np.float64))
+            ie = np.full(x.shape,self.ng-1,dtype=np.intp)
+        else:
+            x,y,z,e = np.broadcast_arrays(
+                np.asarray(x,dtype=np.float64),
+                np.asarray(y,dtype=np.float64),
+                np.asarray(z,dtype=np.float64),
+                np.asarray(e,dtype=np.float64))
+            ie = _BinIndex(self.e_bins,self.bin_lows[3],e,"right")
+
+        ix = _BinIndex(self.x_bins,self.bin_lows[0],x,"left")
+        iy = _BinIndex(self.y_bins,self.bin_lows[1],y,"left")
+        iz = _BinIndex(self.z_bins,self.bin_lows[2],z,"left")
+        inside = (ix >= 0) & (iy >= 0) & (iz >= 0) & (ie >= 0)
+
+        return ix,iy,iz,ie,inside
+
+    # #####################################################
+    def QueryPoints(self,x,y,z,e=None):
+        """ Samples the tally at a batch of points (nearest bin, no
+        interpolation).
+
+        Arguments:
+            x,y,z: [float arrays] Point coordinates. Broadcast
+                   together with e.
+            e: [float array] Optional point energies. If None the
+               total over all energies is sampled.
+
+        Returns:
+            ix,iy,iz,ie: [int arrays] Bin indices, -1 outside the mesh
+                         (see FindBins).
+            v: [masked float array] Values, masked outside the mesh.
+            u: [masked float array] Relative errors, masked outside
+               the mesh. """
+
+        if self.cache is not None:
+            key = ("query",_PointsKey(x,y,z,e))
+            result = self.cache.Get(key)
+            if result is not None:
+                return result
+        ix,iy,iz,ie,inside = self.FindBins(x,y,z,e)
+        outside = ~inside
+        sel = tuple(np.where(inside,i,0) for i in (ie,ix,iy,iz))
+        v = np.ma.MaskedArray(self._Select(3,sel),mask=outside)
+        u = np.ma.MaskedArray(self._Select(4,sel),mask=outside)
+
+        if self.cache is not None:
+            return self.cache.Put(key,(ix,iy,iz,ie,v,u),
+                                  self._DataArrays())
+        return ix,iy,iz,ie,v,u
     
     # #####################################################
-    def SizeDataValues(self):
+    def SizeDataValues(self,allocate=True):
         """ Don't use this method outside MMPP. 
         Sizes data structures. """
 
@@ -86,10 +989,30 @@ class MeshTalBlock:
         self.nz = len(self.z_bins)
         self.ng = len(self.e_bins)+1
     
-        self.data_values = np.zeros([self.ng,self.nx,self.ny,self.nz,5])
+        if not allocate:
+            return
+        self._ClearCache()
+        with _Phase("allocate") as phase:
+            shape = [self.ng,self.nx,self.ny,self.nz]
+            if self.layout == "compact":
+                self._x_centers = np.zeros(self.nx)
+                self._y_centers = np.zeros(self.ny)
+                self._z_centers = np.zeros(self.nz)
+                self._values = np.zeros(shape,dtype=self.dtype)
+                self._rel_error = np.zeros(shape,dtype=self.dtype)
+                phase.bytes = self._values.nbytes+self._rel_error.nbytes
+            elif self.layout == "sparse":
+                self._x_centers = np.zeros(self.nx)
+                self._y_centers = np.zeros(self.ny)
+                self._z_centers = np.zeros(self.nz)
+                self._sparse = _SparseBuilder(int(np.prod(shape)),
+                                              self.dtype).Finish()
+            else:
+                self.data_values = np.zeros(shape+[5])
+                phase.bytes = self._data_values.nbytes
     
     # #####################################################
-    def UnpackGivenXYE(self,x,y,e):
+    def UnpackGivenXYE(self,x,y,e,copy=True):
         """ Extracts line data by unpacking data from the data block 
         given an x-coordinate, y-coordinate and an energy value. 
         
@@ -97,22 +1020,17 @@ class MeshTalBlock:
             x: [float] A coordinate. Bin will be chosen. 
             y: [float] A coordinate. Bin will be chosen.
             e: [float] An energy value. Bin will be chosen. 
+            copy: [bool] Return fresh arrays. False returns views into
+                  the block's data.
             
         Returns:
             s: [float array] Coordinate centers.
             v: [float array] Values. """
 
-        n = self.nz 
-        s = np.zeros(n)
-        v = np.zeros(n)
-        for i in range(0,n):
-            s[i] = self.data_values[e,x,y,i,2]
-            v[i] = self.data_values[e,x,y,i,3]
-        
-        return s,v
+        return self.line(2,x,y,e,copy)[0:2]
   
     # #####################################################
-    def UnpackGivenXZE(self,x,z,e):
+    def UnpackGivenXZE(self,x,z,e,copy=True):
         """ Extracts line data by unpacking data from the data block 
         given an x-coordinate, z-coordinate and an energy value. 
         
@@ -120,22 +1038,17 @@ class MeshTalBlock:
             x: [float] A coordinate. Bin will be chosen. 
             z: [float] A coordinate. Bin will be chosen.
             e: [float] An energy value. Bin will be chosen. 
+            copy: [bool] Return fresh arrays. False returns views into
+                  the block's data.
             
         Returns:
             s: [float array] Coordinate centers.
             v: [float array] Values. """
 
-        n = self.ny
-        s = np.zeros(n)
-        v = np.zeros(n)
-        for i in range(0,n):
-            s[i] = self.data_values[e,x,i,z,1]
-            v[i] = self.data_values[e,x,i,z,3]
-        
-        return s,v
+        return self.line(1,x,z,e,copy)[0:2]
   
     # #####################################################
-    def UnpackGivenYZE(self,y,z,e):
+    def UnpackGivenYZE(self,y,z,e,copy=True):
         """ Extracts line data by unpacking data from the data block 
         given an y-coordinate, z-coordinate and an energy value. 
         
@@ -143,28 +1056,25 @@ class MeshTalBlock:
             y: [float] A coordinate. Bin will be chosen. 
             z: [float] A coordinate. Bin will be chosen.
             e: [float] An energy value. Bin will be chosen. 
+            copy: [bool] Return fresh arrays. False returns views into
+                  the block's data.
             
         Returns:
             s: [float array] Coordinate centers.
             v: [float array] Values. """
 
-        n = self.nx
-        s = np.zeros(n)
-        v = np.zeros(n)
-        for i in range(0,n):
-            s[i] = self.data_values[e,i,y,z,0]
-            v[i] = self.data_values[e,i,y,z,3]
-        
-        return s,v
+        return self.line(0,y,z,e,copy)[0:2]
   
     # #####################################################
-    def UnpackGivenXE_bins(self,x,e):
+    def UnpackGivenXE_bins(self,x,e,copy=True):
         """ Extracts YZ-2D plane data by unpacking data from the 
         data block given an x-bin and an energy bin. 
         
         Arguments:
             x: [int] X-bin number.
             e: [int] Energy bin number.
+            copy: [bool] Return fresh arrays. False returns views into
+                  the block's data.
             
         Returns:
             s: [float array] Coordinate centers along y. Logically 2D.
@@ -172,38 +1082,23 @@ class MeshTalBlock:
             v: [float array] Values. Logically 2D.
             u: [float array] Uncertainty.  Logically 2D.
             
-        The returned values are logically 2D (row based). """
+        The returned values are logically 2D (row based). Raises
+        ValueError if the plane has only 1 bin along a direction. """
 
-        n0 = self.ny
-        n1 = self.nz
+        self.__Check2D(0)
 
-        if (n0 <= 1) or (n1 <= 1):
-            print("ERROR: UnpackGivenXE found data that is not 2D. " + \
-                  "This normally indicates only 1 bin along a " + \
-                  "direction.")
-            exit()
-    
-        s = np.zeros([n0,n1])
-        t = np.zeros([n0,n1])
-        v = np.zeros([n0,n1])
-        z = np.zeros([n0,n1])
-        for i in range(0,n0):
-            for j in range(0,n1):
-                s[i,j] = self.data_values[e,x,i,j,1]
-                t[i,j] = self.data_values[e,x,i,j,2]
-                v[i,j] = self.data_values[e,x,i,j,3]
-                z[i,j] = self.data_values[e,x,i,j,4]
-        
-        return s,t,v,z
+        return self.slice(0,x,e,copy)
 
-    # #####################################################    
-    def UnpackGivenYE_bins(self,y,e):
+    # #####################################################
+    def UnpackGivenYE_bins(self,y,e,copy=True):
         """ Extracts XZ-2D plane data by unpacking data from the 
         data block given an y-bin and an energy bin. 
         
         Arguments:
             y: [int] Y-bin number.
             e: [int] Energy bin number.
+            copy: [bool] Return fresh arrays. False returns views into
+                  the block's data.
             
         Returns:
             s: [float array] Coordinate centers along x. Logically 2D.
@@ -211,38 +1106,23 @@ class MeshTalBlock:
             v: [float array] Values. Logically 2D.
             u: [float array] Uncertainty.  Logically 2D.
             
-        The returned values are logically 2D (row based). """
+        The returned values are logically 2D (row based). Raises
+        ValueError if the plane has only 1 bin along a direction. """
 
-        n0 = self.nx
-        n1 = self.nz
+        self.__Check2D(1)
+
+        return self.slice(1,y,e,copy)
 
-        if (n0 <= 1) or (n1 <= 1):
-            print("ERROR: UnpackGivenXE found data that is not 2D. " + \
-                  "This normally indicates only 1 bin along a " + \
-                  "direction.")
-            exit()
-
-        s = np.zeros([n0,n1])
-        t = np.zeros([n0,n1])
-        v = np.zeros([n0,n1])
-        z = np.zeros([n0,n1])
-        for i in range(0,n0):
-            for j in range(0,n1):
-                s[i,j] = self.data_values[e,i,y,j,0]
-                t[i,j] = self.data_values[e,i,y,j,2]
-                v[i,j] = self.data_values[e,i,y,j,3]
-                z[i,j] = self.data_values[e,i,y,j,4]
-    
-        return s,t,v,z
-    
     # #####################################################
-    def UnpackGivenZE_bins(self,zbin,e):
+    def UnpackGivenZE_bins(self,zbin,e,copy=True):
         """ Extracts XY-2D plane data by unpacking data from the 
         data block given an z-bin and an energy bin. 
         
         Arguments:
             z: [int] Z-bin number.
             e: [int] Energy bin number.
+            copy: [bool] Return fresh arrays. False returns views into
+                  the block's data.
             
         Returns:
             s: [float array] Coordinate centers along x. Logically 2D.
@@ -250,37 +1130,23 @@ class MeshTalBlock:
             v: [float array] Values. Logically 2D.
             u: [float array] Uncertainty.  Logically 2D.
             
-        The returned values are logically 2D (row based). """
+        The returned values are logically 2D (row based). Raises
+        ValueError if the plane has only 1 bin along a direction. """
 
-        n0 = self.nx
-        n1 = self.ny
+        self.__Check2D(2)
+
+        return self.slice(2,zbin,e,copy)
 
-        if (n0 <= 1) or (n1 <= 1):
-            print("ERROR: UnpackGivenXE found data that is not 2D. " + \
-                  "This normally indicates only 1 bin along a " + \
-                  "direction.")
-            exit()
-        
-        s = np.zeros([n0,n1])
-        t = np.zeros([n0,n1])
-        v = np.zeros([n0,n1])
-        z = np.zeros([n0,n1])
-        for i in range(0,n0):
-            for j in range(0,n1):
-                s[i,j] = self.data_values[e,i,j,zbin,0]
-                t[i,j] = self.data_values[e,i,j,zbin,1]
-                v[i,j] = self.data_values[e,i,j,zbin,3]
-                z[i,j] = self.data_values[e,i,j,zbin,4]
-        return s,t,v,z
-    
     # #####################################################
-    def UnpackGivenXE(self,xval,e):
+    def UnpackGivenXE(self,xval,e,copy=True):
         """ Extracts YZ-2D plane data by unpacking data from the 
         data block given an x-coordinate and an energy value. 
         
         Arguments:
             x: [float] A coordinate. Bin will be chosen. 
             e: [float] An energy value. Bin will be chosen. 
+            copy: [bool] Return fresh arrays. False returns views into
+                  the block's data.
             
         Returns:
             s: [float array] Coordinate centers along y. Logically 2D.
@@ -291,19 +1157,20 @@ class MeshTalBlock:
         The returned values are logically 2D (row based). """
 
         x = self.__ChooseCellX(float(xval))
-        
-        s,t,v,u = self.UnpackGivenXE_bins(x,e)
+        s,t,v,u = self.UnpackGivenXE_bins(x,e,copy)
         
         return s,t,v,u
   
     # #####################################################
-    def UnpackGivenYE(self,yval,e):
+    def UnpackGivenYE(self,yval,e,copy=True):
         """ Extracts XZ-2D plane data by unpacking data from the 
         data block given an y-coordinate and an energy value. 
         
         Arguments:
             y: [float] A coordinate. Bin will be chosen. 
             e: [float] An energy value. Bin will be chosen. 
+            copy: [bool] Return fresh arrays. False returns views into
+                  the block's data.
             
         Returns:
             s: [float array] Coordinate centers along x. Logically 2D.
@@ -312,20 +1179,22 @@ class MeshTalBlock:
             u: [float array] Uncertainty.  Logically 2D.
             
         The returned values are logically 2D (row based). """
-        
+
         y = self.__ChooseCellY(float(yval))
-        s,t,v,u = self.UnpackGivenYE_bins(y,e)
+        s,t,v,u = self.UnpackGivenYE_bins(y,e,copy)
         
         return s,t,v,u
   
     # #####################################################
-    def UnpackGivenZE(self,zval,e):
+    def UnpackGivenZE(self,zval,e,copy=True):
         """ Extracts XY-2D plane data by unpacking data from the 
         data block given an z-coordinate and an energy value. 
         
         Arguments:
             z: [float] A coordinate. Bin will be chosen. 
             e: [float] An energy value. Bin will be chosen. 
+            copy: [bool] Return fresh arrays. False returns views into
+                  the block's data.
             
         Returns:
             s: [float array] Coordinate centers along x. Logically 2D.
@@ -334,190 +1203,4497 @@ class MeshTalBlock:
             u: [float array] Uncertainty.  Logically 2D.
             
         The returned values are logically 2D (row based). """
-        
+
         z = self.__ChooseCellZ(float(zval))
-        s,t,v,u = self.UnpackGivenZE_bins(z,e)
+        s,t,v,u = self.UnpackGivenZE_bins(z,e,copy)
         
         return s,t,v,u
-
-      
-# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
-def ReadMeshtalfile(meshtal_filename):
-    print('***** Reading file "' + meshtal_filename + '"')
-    mfile = open(meshtal_filename,"r")
-    lines = mfile.readlines()
-    num_lines = len(lines)
-    print("Number of lines = "+str(num_lines))
-  
-    ############################################ Data structures
-    blocks = []
-  
-    ############################################ Read energy groups
-    ell = -1
-    stop_flag = False
-    cur_block = []
-    while not stop_flag:
-        ell += 1
-        line = lines[ell]
-    
-        words = line.split()
-    
-        ############################## Detect new block
-        if len(words) >= 3:
-            if (words[0]=="Mesh") and \
-               (words[1]=="Tally") and \
-               (words[2]=="Number"):
-                cur_block = MeshTalBlock()
-                blocks.append(cur_block)
-    
-        ############################## Detect x bins
-        if len(words) >= 3:
-            if (words[0]=="X") and \
-               (words[1]=="direction:"):
-                num_bounds = len(words)-3
-                for b in range(0,num_bounds):
-                    cur_block.x_bins.append(float(words[b+3]))
-                cur_block.bin_lims[0] = float(words[3])
-                print("X bins extracted:", len(cur_block.x_bins))
-    
-        ############################## Detect y bins
-        if len(words) >= 3:
-            if (words[0]=="Y") and \
-               (words[1]=="direction:"):
-                num_bounds = len(words)-3
-                for b in range(0,num_bounds):
-                    cur_block.y_bins.append(float(words[b+3]))
-                cur_block.bin_lims[1] = float(words[3])
-                print("Y bins extracted:", len(cur_block.y_bins))
-    
-        ############################## Detect z bins
-        if len(words) >= 3:
-            if (words[0]=="Z") and \
-               (words[1]=="direction:"):
-                num_bounds = len(words)-3
-                for b in range(0,num_bounds):
-                    cur_block.z_bins.append(float(words[b+3]))
-                cur_block.bin_lims[2] = float(words[3])
-                print("Z bins extracted:", len(cur_block.z_bins))
-    
-        ############################## Detect energy boundaries
-        if len(words) >= 3:
-            if (words[0]=="Energy") and \
-               (words[1]=="bin") and \
-               (words[2]=="boundaries:"):
-                num_bounds = len(words)-4
-                for g in range(0,num_bounds):
-                    cur_block.e_bins.append(float(words[g+4]))
-                cur_block.bin_lims[3] = float(words[4])
-                print("Energy bins extracted:", 
-                      len(cur_block.e_bins),cur_block.e_bins)
-                print("Sizing data black")
-                cur_block.SizeDataValues()
-    
-        ############################## Extract data
-        if len(words) >= 3:
-            if (words[0]=="Energy") and \
-               (words[1]=="X") and \
-               (words[2]=="Y"):
-                nx = cur_block.nx
-                ny = cur_block.ny
-                nz = cur_block.nz
-                ng = cur_block.ng
-                for e in range(0,ng):
-                    for x in range(0,nx):
-                        for y in range(0,ny):
-                            for z in range(0,nz):
-                                ell += 1
-                                dline = lines[ell]
-                                words = dline.split()
-                                cur_block.data_values[e,x,y,z,0] = float(words[1])
-                                cur_block.data_values[e,x,y,z,1] = float(words[2])
-                                cur_block.data_values[e,x,y,z,2] = float(words[3])
-                                cur_block.data_values[e,x,y,z,3] = float(words[4])
-                                cur_block.data_values[e,x,y,z,4] = float(words[5])
-    
-    
-        if (ell >= (num_lines-1)) or ell>100:
-            stop_flag = True
-            print("***** Quit at file end")
-  
-      # print(words)
-  
-    mfile.close()
   
-    return blocks
+    # #####################################################
+    def __Check2D(self,axis):
+        """ Raises ValueError if the plane normal to axis is not 2D. """
 
-def menu():
-    print("")
-    print("Please select one of the following options:")
-    print("1: Slice in the YZ plane")
-    print("2: Slice in the XZ plane")
-    print("3: Slice in the XY plane")
-    print("4: Enter a specify energy level, it's assumed to be the 0th energy-bin")
-    print("9: Exit")
-    return input()
-    
-# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
-# Main program if run as standalone
-# if __name__ == '__main__':
-#     num_args = len(sys.argv)
-#     print("Program arguments:",sys.argv)
-  
-#     if num_args < 2:
-#        in_meshtal_filename = input("Enter the name of the meshtal file: ")
-#     else:
-#        in_meshtal_filename = sys.argv[1]
-#     blocks = ReadMeshtalfile(in_meshtal_filename)
-  
-#     e = 0
-    
-#     while (True):
-#         temp = float(menu())
-#         if temp == 1:
-#             xval = input("Enter an X coord: ")
-#             s,t,v,z = blocks[0].UnpackGivenXE(xval,e)
-#             s,t,v2,z = blocks[0].UnpackGivenXE(xval,1)
-#             plt.xlabel("Y [cm]")
-#             plt.ylabel("Z [cm]")
-#             #plott(s,t,v)
-#             if (float(input("Do you want to see a plot of the error? 1 or 0: "))==1.0):
-#                 plt.contourf(s,t,z,cmap=cm.jet)
-#                 plt.title("Relative error")
-#                 plt.xlabel("Y [cm]")
-#                 plt.ylabel("Z [cm]")
-#                 plt.show()
-            
-#         elif temp == 2:
-#             yval = input("Enter a Y coord: ")
-#             s,t,v,z = blocks[0].UnpackGivenYE(yval,e)
-#             s,t,v2,z = blocks[0].UnpackGivenYE(yval,1)
-#             plt.xlabel("X [cm]")
-#             plt.ylabel("Z [cm]")
-#             plott(s,t,v)
-#             if (float(input("Do you want to see a plot of the error? 1 or 0: "))==1.0):
-#                 plt.contourf(s,t,z,cmap=cm.jet)
-#                 plt.title("Relative error")
-#                 plt.xlabel("X [cm]")
-#                 plt.ylabel("Z [cm]")
-#                 plt.show()          
-                
-#         elif temp == 3:
-#             zval = input("Enter a Z coord: ")
-#             s,t,v,z = blocks[0].UnpackGivenZE(zval,e)
-#             s,t,v2,z = blocks[0].UnpackGivenZE(zval,1)
-#             plt.xlabel("X [cm]")
-#             plt.ylabel("Y [cm]")
-#             plott(s,t,v)
-#             if (float(input("Do you want to see a plot of the error? 1 or 0: "))==1.0):
-#                 plt.contourf(s,t,z,cmap=cm.jet)
-#                 plt.title("Relative error")
-#                 plt.xlabel("Y [cm]")
-#                 plt.ylabel("Z [cm]")
-#                 plt.show()
-                
-#         elif temp == 4:
-#             e = blocks[0].__ChooseCellE(float(input("choose an energy level: ")))
-            
-#         elif temp == 9:
-#             break
-   
\ No newline at end of file
+        n0,n1 = [[self.nx,self.ny,self.nz][k] for k in range(0,3)
+                 if k != axis]
+        if (n0 <= 1) or (n1 <= 1):
+            raise ValueError("The plane normal to %s is not 2D (%d x %d "
+                             "bins). This normally indicates only 1 bin "
+                             "along a direction." % ("xyz"[axis],n0,n1))
+
+    # #####################################################
+    def slice(self,axis,index,energy,copy=False):
+        """ Extracts the 2D plane normal to an axis.
+
+        Arguments:
+            axis: [int or str] 0/"x", 1/"y" or 2/"z".
+            index: [int] Bin number along axis.
+            energy: [int] Energy bin number.
+            copy: [bool] False (default) returns views into the block's
+                  data without copying; coordinates of compact and
+                  sparse blocks are read-only broadcast views, values
+                  of sparse blocks are always looked up into new
+                  arrays. True returns one contiguous copy of each
+                  array. With a cache (see EnableCache) both return
+                  the cached, read-only copies.
+
+        Returns:
+            s: [float array] Coordinate centers along the first
+               remaining axis. 2D, indexed [first,second].
+            t: [float array] Coordinate centers along the second
+               remaining axis. 2D.
+            v: [float array] Values. 2D.
+            u: [float array] Uncertainty. 2D. """
+
+        axis = _AxisNumber(axis)
+        if self.cache is not None:
+            key = ("slice",axis,index,energy)
+            planes = self.cache.Get(key)
+            if planes is not None:
+                return planes
+        sel = [energy,np.s_[:],np.s_[:],np.s_[:]]
+        sel[1+axis] = index
+        sel = tuple(sel)
+        c0,c1 = [k for k in range(0,3) if k != axis]
+
+        start = time.perf_counter()
+        planes = (self._Column(c0)[sel],self._Column(c1)[sel],
+                  self._Select(3,sel),self._Select(4,sel))
+        num_bytes = 0
+        if copy:
+            planes = tuple(np.array(p) for p in planes)
+            num_bytes = sum(p.nbytes for p in planes)
+        stats.Record("slice",time.perf_counter()-start,planes[2].size,
+                     num_bytes)
+        if self.cache is not None:
+            return self.cache.Put(key,planes,self._DataArrays())
+        return planes
+
+    # #####################################################
+    def line(self,axis,index0,index1,energy,copy=False):
+        """ Extracts the 1D line along an axis.
+
+        Arguments:
+            axis: [int or str] 0/"x", 1/"y" or 2/"z".
+            index0,index1: [int] Bin numbers along the two other axes,
+                           in x, y, z order.
+            energy: [int] Energy bin number.
+            copy: [bool] See slice.
+
+        Returns:
+            s: [float array] Coordinate centers along axis.
+            v: [float array] Values.
+            u: [float array] Uncertainty. """
+
+        axis = _AxisNumber(axis)
+        if self.cache is not None:
+            key = ("line",axis,index0,index1,energy)
+            lines = self.cache.Get(key)
+            if lines is not None:
+                return lines
+        sel = [energy,index0,index1]
+        sel.insert(1+axis,np.s_[:])
+        sel = tuple(sel)
+
+        start = time.perf_counter()
+        lines = (self._Column(axis)[sel],self._Select(3,sel),
+                 self._Select(4,sel))
+        num_bytes = 0
+        if copy:
+            lines = tuple(np.array(l) for l in lines)
+            num_bytes = sum(l.nbytes for l in lines)
+        stats.Record("line",time.perf_counter()-start,lines[1].size,
+                     num_bytes)
+        if self.cache is not None:
+            return self.cache.Put(key,lines,self._DataArrays())
+        return lines
+
+    # #####################################################
+    def FoldGroups(self,weights):
+        """ Weighted sums over the energy groups, e.g. a response
+        folding or a group collapse, computed for every voxel at once.
+        The relative error is propagated treating the groups as
+        independent: var = sum_g (w_g*v_g*u_g)**2.
+
+        Arguments:
+            weights: [float array] [m,ng] (or [ng]) weight of every
+                     group, the total (last) group included, in each
+                     of m sums.
+
+        Returns:
+            values: [float array] [m,nx,ny,nz] (or [nx,ny,nz]).
+            rel_error: [float array] Same shape. """
+
+        weights = np.asarray(weights,dtype=np.float64)
+        single = weights.ndim == 1
+        weights = np.atleast_2d(weights)
+        if weights.shape[1] != self.ng:
+            raise ValueError("Mesh tally %d: %d group weights given, the "
+                             "tally has %d groups (the total included)" %
+                             (self.tally_number,weights.shape[1],self.ng))
+        self.LoadDataValues()
+        nvox = self.nx*self.ny*self.nz
+        m = len(weights)
+        values = np.zeros([m,nvox])
+        variance = np.zeros([m,nvox])
+
+        with _Phase("fold",self.ng*nvox):
+            if self.layout == "sparse":
+                # One weighted histogram per sum over the stored voxels
+                index,v,u = self._sparse
+                g,voxel = np.divmod(index.astype(np.int64),nvox)
+                sigma2 = (v.astype(np.float64)*u)**2
+                for k in range(0,m):
+                    w = weights[k][g]
+                    values[k] = np.bincount(voxel,w*v,minlength=nvox)
+                    variance[k] = np.bincount(voxel,w*w*sigma2,
+                                              minlength=nvox)
+            else:
+                # Matrix products over the group axis, a slab of x
+                # planes at a time to bound the temporaries
+                v4,u4 = self._Column(3),self._Column(4)
+                plane = self.ny*self.nz
+                step = max(1,_STREAM_CHUNK_ROWS // max(1,self.ng*plane))
+                w2 = weights*weights
+                for x0 in range(0,self.nx,step):
+                    x1 = min(x0+step,self.nx)
+                    v = np.asarray(v4[:,x0:x1],dtype=np.float64).reshape(
+                        [self.ng,-1])
+                    sigma2 = (v*np.asarray(u4[:,x0:x1]).reshape(
+                        [self.ng,-1]))**2
+                    values[:,x0*plane:x1*plane] = weights @ v
+                    variance[:,x0*plane:x1*plane] = w2 @ sigma2
+
+        shape = [m,self.nx,self.ny,self.nz]
+        values = values.reshape(shape)
+        rel_error = _SumRelError(values,variance.reshape(shape))
+        if single:
+            return values[0],rel_error[0]
+        return values,rel_error
+
+    # #####################################################
+    def FoldResponse(self,response,groups=None):
+        """ Folds a response function, e.g. flux-to-dose conversion
+        factors, over the energy groups: sum_g R(E_g)*v_g for every
+        voxel, where E_g is the group midpoint (see ResponseFunction).
+
+        Arguments:
+            response: [ResponseFunction or (energies,factors)] The
+                      response table. A plain table is converted once
+                      and then cached, like a ResponseFunction.
+            groups: [int array] The groups to fold. Default: all but
+                    the total.
+
+        Returns:
+            values: [float array] [nx,ny,nz] The folded response.
+            rel_error: [float array] [nx,ny,nz] Its relative error. """
+
+        if not isinstance(response,ResponseFunction):
+            energies,factors = response
+            response = _CachedResponse(
+                np.asarray(energies,dtype=np.float64).tobytes(),
+                np.asarray(factors,dtype=np.float64).tobytes())
+        weights = np.zeros(self.ng)
+        factors = response.GroupFactors(self)
+        if groups is None:
+            weights[0:self.ng-1] = factors
+        else:
+            groups = np.asarray(groups,dtype=np.int64)
+            if np.any(groups == self.ng-1) or np.any(groups == -1):
+                raise ValueError("The total group has no energy to "
+                                 "evaluate the response at")
+            weights[groups] = factors[groups]
+        return self.FoldGroups(weights)
+
+    # #####################################################
+    def CollapseGroups(self,e_bins,e_low=None):
+        """ Rebins the energy groups onto new boundaries. Groups that
+        fall inside a new group are summed; a group that a new boundary
+        splits is shared in proportion to the overlapping energy width
+        (a flat spectrum within the group), so collapsing onto a subset
+        of the existing boundaries is exact. The Total group is kept
+        as it is.
+
+        Arguments:
+            e_bins: [float list] Upper bounds of the new groups, like
+                    MeshTalBlock.e_bins.
+            e_low: [float] Lower bound of the first new group. Default:
+                   that of the block.
+
+        Returns:
+            block: [MeshTalBlock] A new block with the new groups, in
+                   the layout and dtype of this one. """
+
+        e_low = self.bin_lows[3] if e_low is None else float(e_low)
+        new_edges = np.concatenate([[e_low],np.asarray(e_bins,
+                                                       dtype=np.float64)])
+        if (len(new_edges) < 2) or np.any(np.diff(new_edges) <= 0.0):
+            raise ValueError("The new energy bounds must increase")
+        old_edges = np.array([self.bin_lows[3]]+list(self.e_bins),
+                             dtype=np.float64)
+
+        # Overlap of every old group with every new one
+        lo = np.maximum(new_edges[:-1,np.newaxis],old_edges[np.newaxis,:-1])
+        hi = np.minimum(new_edges[1:,np.newaxis],old_edges[np.newaxis,1:])
+        widths = np.diff(old_edges)
+        weights = np.zeros([len(new_edges),self.ng])
+        weights[:-1,:-1] = np.clip(hi-lo,0.0,None)/np.where(widths > 0,
+                                                           widths,1.0)
+        weights[-1,-1] = 1.0
+        values,rel_error = self.FoldGroups(weights)
+
+        block = MeshTalBlock()
+        block.tally_number = self.tally_number
+        block.particle = self.particle
+        block.histories = self.histories
+        block.x_bins = list(self.x_bins)
+        block.y_bins = list(self.y_bins)
+        block.z_bins = list(self.z_bins)
+        block.e_bins = new_edges[1:].tolist()
+        block.bin_lims = list(self.bin_lims)
+        block.bin_lims[3] = block.e_bins[0]
+        block.bin_lows = list(self.bin_lows)
+        block.bin_lows[3] = e_low
+        block.SizeDataValues(allocate=False)
+        block.layout = "compact"
+        block.dtype = self.dtype
+        block._x_centers = np.array(self.x_centers)
+        block._y_centers = np.array(self.y_centers)
+        block._z_centers = np.array(self.z_centers)
+        block._values = values.astype(self.dtype,copy=False)
+        block._rel_error = rel_error.astype(self.dtype,copy=False)
+        if self.layout == "full":
+            block.data_values = block.data_values
+        elif self.layout == "sparse":
+            block.ToSparse(self.dtype)
+        return block
+
+      
+
+    # #####################################################
+    def BuildPyramid(self,min_cells=64):
+        """ Builds a level-of-detail pyramid of the block (see
+        MeshTalPyramid) for fast coarse slices of large meshes, halving
+        the bins until no axis has more than min_cells. The pyramid is
+        kept in self.pyramid and dropped when data_values is replaced.
+
+        Arguments:
+            min_cells: [int] Bins along the longest axis of the
+                       coarsest level.
+
+        Returns:
+            pyramid: [MeshTalPyramid] """
+
+        self.LoadDataValues()
+        pyramid = MeshTalPyramid()
+        pyramid.base = _BlockEdges(self)
+        edges = pyramid.base[0:3]
+        source = lambda g,c: _GroupArray(self,g,c)
+        with _Phase("pyramid",self.ng*self.nx*self.ny*self.nz):
+            while max(len(e)-1 for e in edges) > min_cells:
+                edges,values,rel_error = _CoarsenLevel(edges,source,
+                                                       self.ng,self.dtype)
+                pyramid.edges.append(edges)
+                pyramid.values.append(values)
+                pyramid.rel_error.append(rel_error)
+                source = lambda g,c,v=values,u=rel_error: \
+                         (v if c == 3 else u)[g]
+        self.pyramid = pyramid
+        return pyramid
+
+    # #####################################################
+    def LoadPyramid(self,directory,use_mmap=True):
+        """ Loads a pyramid saved with MeshTalPyramid.Save into
+        self.pyramid, after checking that it was built for a mesh with
+        the bins of this block.
+
+        Arguments:
+            directory: [str] Directory the pyramid was saved to.
+            use_mmap: [bool] Memory-map the levels instead of reading
+                      them.
+
+        Returns:
+            pyramid: [MeshTalPyramid] """
+
+        pyramid = MeshTalPyramid.Load(directory,use_mmap)
+        edges = _BlockEdges(self)
+        if (pyramid.base is None) or \
+           any((len(a) != len(b)) or not np.allclose(a,b)
+               for a,b in zip(pyramid.base,edges)):
+            raise ValueError("The pyramid in %s was not built for the bins "
+                             "of mesh tally %d" % (directory,
+                                                   self.tally_number))
+        self.pyramid = pyramid
+        return pyramid
+
+    # #####################################################
+    def PyramidSlice(self,axis,value,energy,resolution=None):
+        """ Extracts the 2D plane normal to an axis from the coarsest
+        pyramid level with at least resolution bins along both
+        remaining axes (or all of the block's bins, where it has
+        fewer). Without a pyramid, or with resolution None, the plane
+        comes from the block itself, as slice(...,copy=False) returns
+        it.
+
+        Arguments:
+            axis: [int or str] 0/"x", 1/"y" or 2/"z".
+            value: [float] Coordinate along axis. Bin will be chosen.
+            energy: [int] Energy bin number.
+            resolution: [int] Bins wanted along the remaining axes.
+
+        Returns:
+            s,t,v,u: [float arrays] 2D, as slice returns them.
+            level: [int] The pyramid level used, 0 for the block. """
+
+        axis = _AxisNumber(axis)
+        level = 0
+        if (resolution is not None) and (self.pyramid is not None):
+            level = self.pyramid.Level(axis,resolution,
+                                       [self.nx,self.ny,self.nz])
+        if level == 0:
+            edges = [self.bin_lows[axis]] + \
+                    list((self.x_bins,self.y_bins,self.z_bins)[axis])
+            index = _PlaneIndex(edges,value)
+            return self.slice(axis,index,energy) + (level,)
+
+        start = time.perf_counter()
+        planes = self.pyramid.Slice(level,axis,value,energy)
+        stats.Record("slice",time.perf_counter()-start,planes[2].size)
+        return planes + (level,)
+
+    # #####################################################
+    def EnableCache(self,max_entries=64,max_bytes=64 << 20):
+        """ Memoizes slice, line and QueryPoints (and so the
+        UnpackGiven* methods) in a MeshTalCache, for viewers that
+        request the same planes, lines and points over and over. Cached
+        results are shared, read-only arrays. While results are kept,
+        the block's data arrays are read-only too, so editing them in
+        place raises ValueError instead of leaving stale results: call
+        self.cache.Clear() (or DisableCache) before such edits. Arrays
+        taken from the block before the first cached call are views
+        that keep their own flags and are not protected. The cache is
+        cleared whenever the data arrays are replaced: when data_values
+        is set, when deferred data is loaded and by ToCompact and
+        ToSparse.
+
+        Arguments:
+            max_entries: [int] Most results kept.
+            max_bytes: [int] Most bytes of arrays kept.
+
+        Returns:
+            cache: [MeshTalCache] self.cache, with the hit and miss
+                   counters. """
+
+        self.cache = MeshTalCache(max_entries,max_bytes)
+        return self.cache
+
+    # #####################################################
+    def DisableCache(self):
+        """ Drops the cache of EnableCache, making the data arrays
+        writeable again. """
+        if self.cache is not None:
+            self.cache.Clear()
+        self.cache = None
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _PairSum(a,axis):
+    """ Don't use this method outside MMPP.
+    Sums neighbouring pairs of entries along an axis (a last unpaired
+    entry is kept on its own). Axes of length 1 are left as they are. """
+
+    n = a.shape[axis]
+    if n == 1:
+        return a
+    if n % 2:
+        pad = [(0,0)]*a.ndim
+        pad[axis] = (0,1)
+        a = np.pad(a,pad)
+    shape = list(a.shape)
+    shape[axis:axis+1] = [len(range(0,n,2)),2]
+    return a.reshape(shape).sum(axis=axis+1)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _CoarsenLevel(edges,source,ng,dtype):
+    """ Don't use this method outside MMPP.
+    One pyramid level from the level below it: every pair of bins
+    along each axis merged into one, with the volume-weighted average
+    of the values and the relative error of the volume-weighted sum.
+    source(g,c) returns the [nx,ny,nz] results (c=3) or relative errors
+    (c=4) of group g below; they are read a slab of x planes at a time.
+
+    Returns:
+        edges: [list of float arrays] The merged bin boundaries.
+        values: [float array] [ng,nx,ny,nz] Averages.
+        rel_error: [float array] Relative errors. """
+
+    widths = [np.diff(e) for e in edges]
+    new_edges = [e if len(e) == 2 else
+                 np.append(e[0:-1:2],e[-1]) for e in edges]
+    new_widths = [_PairSum(w,0) for w in widths]
+    new_volume = new_widths[0][:,np.newaxis,np.newaxis]* \
+                 np.outer(new_widths[1],new_widths[2])[np.newaxis]
+    nx,ny,nz = [len(w) for w in widths]
+    shape = [ng]+[len(w) for w in new_widths]
+    values = np.empty(shape,dtype=dtype)
+    rel_error = np.empty(shape,dtype=dtype)
+
+    area = np.outer(widths[1],widths[2])
+    step = 1 if nx == 1 else 2*max(1,_STREAM_CHUNK_ROWS // (2*ny*nz))
+    for g in range(0,ng):
+        v,u = source(g,3),source(g,4)
+        for x0 in range(0,nx,step):
+            x1 = min(x0+step,nx)
+            volume = widths[0][x0:x1,np.newaxis,np.newaxis]*area
+            weighted = np.asarray(v[x0:x1],dtype=np.float64)*volume
+            variance = (weighted*u[x0:x1])**2
+            for k in range(0,3):
+                weighted = _PairSum(weighted,k)
+                variance = _PairSum(variance,k)
+            c0 = x0 if nx == 1 else x0//2
+            c1 = c0+len(weighted)
+            values[g,c0:c1] = weighted/new_volume[c0:c1]
+            rel_error[g,c0:c1] = _SumRelError(weighted,variance)
+    return new_edges,values,rel_error
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class MeshTalPyramid:
+    """ Level-of-detail pyramid of a MeshTalBlock for interactive
+    slicing of large meshes. Level k (k=1,2,...) merges every pair of
+    bins of level k-1 along each axis, level 0 being the block itself.
+    A coarse voxel holds the volume-weighted average of the voxels it
+    covers and the relative error of that sum, the voxels taken as
+    independent. Built with MeshTalBlock.BuildPyramid. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self):
+        self.base = None          # Bin boundaries of the block
+        self.edges = []           # [x,y,z] boundaries, per level 1,2,...
+        self.values = []          # [ng,nx,ny,nz] averages, per level
+        self.rel_error = []       # [ng,nx,ny,nz] relative errors
+
+    # #####################################################
+    def __len__(self):
+        return len(self.values)
+
+    # #####################################################
+    def Level(self,axis,resolution,base_shape):
+        """ The coarsest level with at least resolution bins along the
+        two axes normal to axis (or as many as level 0 has). """
+
+        c0,c1 = [k for k in range(0,3) if k != axis]
+        wanted = [min(resolution,base_shape[c]) for c in (c0,c1)]
+        level = 0
+        for k in range(0,len(self.values)):
+            shape = self.values[k].shape[1:]
+            if (shape[c0] < wanted[0]) or (shape[c1] < wanted[1]):
+                break
+            level = k+1
+        return level
+
+    # #####################################################
+    def Slice(self,level,axis,value,energy):
+        """ The 2D plane of a level (1,2,...) normal to axis at the
+        coordinate value, as MeshTalBlock.slice returns it: centers
+        along the remaining axes as broadcast views, values and
+        relative errors as views into the level. """
+
+        edges = self.edges[level-1]
+        values = self.values[level-1]
+        index = _PlaneIndex(edges[axis],value)
+        c0,c1 = [k for k in range(0,3) if k != axis]
+        centers = [0.5*(edges[c][1:]+edges[c][:-1]) for c in (c0,c1)]
+        shape = (len(centers[0]),len(centers[1]))
+        sel = [energy,np.s_[:],np.s_[:],np.s_[:]]
+        sel[1+axis] = index
+        sel = tuple(sel)
+        return (np.broadcast_to(centers[0][:,np.newaxis],shape),
+                np.broadcast_to(centers[1][np.newaxis,:],shape),
+                values[sel],self.rel_error[level-1][sel])
+
+    # #####################################################
+    def Save(self,directory):
+        """ Writes the levels to a directory: one .npy file per array
+        plus a JSON header, written last. """
+
+        os.makedirs(directory,exist_ok=True)
+        header_name = os.path.join(directory,"pyramid.json")
+        if os.path.exists(header_name):
+            os.remove(header_name)
+        header = {"version":_CACHE_VERSION,
+                  "base":[list(map(float,e)) for e in self.base],
+                  "levels":[]}
+        for k in range(0,len(self.values)):
+            entry = {"edges":[list(map(float,e)) for e in self.edges[k]]}
+            for name in ("values","rel_error"):
+                array_file = "level%d_%s.npy" % (k+1,name)
+                np.save(os.path.join(directory,array_file),
+                        getattr(self,name)[k])
+                entry[name] = array_file
+            header["levels"].append(entry)
+        temp_name = header_name + ".tmp"
+        with open(temp_name,"w") as hfile:
+            json.dump(header,hfile)
+        os.replace(temp_name,header_name)
+
+    # #####################################################
+    @staticmethod
+    def Load(directory,use_mmap=True):
+        """ Reads levels written by Save, memory-mapped by default. """
+
+        with open(os.path.join(directory,"pyramid.json"),"r") as hfile:
+            header = json.load(hfile)
+        if header.get("version") != _CACHE_VERSION:
+            raise ValueError("Pyramid in %s was written by another "
+                             "version of MMPP" % directory)
+        mmap_mode = "r" if use_mmap else None
+        pyramid = MeshTalPyramid()
+        pyramid.base = [np.array(e) for e in header["base"]]
+        for entry in header["levels"]:
+            pyramid.edges.append([np.array(e) for e in entry["edges"]])
+            for name in ("values","rel_error"):
+                getattr(pyramid,name).append(np.load(
+                    os.path.join(directory,entry[name]),mmap_mode=mmap_mode))
+        return pyramid
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _AxisWeights(centers,lower,upper,values):
+    """ Linear interpolation weights along one axis.
+
+    Arguments:
+        centers: [float array] Voxel centers along the axis.
+        lower,upper: [float] Mesh boundaries along the axis.
+        values: [float array] Coordinates to interpolate at.
+
+    Returns:
+        i0,i1: [int32 arrays] Lower and upper neighbouring centers.
+        t: [float array] Weight of i1 (1-t for i0). Between a mesh
+           boundary and the outermost center the value is held
+           constant.
+        inside: [bool array] False outside [lower,upper] or NaN. """
+
+    n = len(centers)
+    i0 = np.searchsorted(centers,values,"right")-1
+    np.clip(i0,0,max(n-2,0),out=i0)
+    i1 = np.minimum(i0+1,n-1)
+    c0 = centers[i0]
+    span = centers[i1]-c0
+    t = np.divide(values-c0,span,out=np.zeros(values.shape),
+                  where=(span > 0))
+    np.clip(t,0.0,1.0,out=t)
+    inside = (values >= lower) & (values <= upper)
+
+    return i0.astype(np.int32),i1.astype(np.int32),t,inside
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class InterpolationWeights:
+    """ Precomputed interpolation weights of a set of points on one
+    mesh. Made by MeshTalInterpolator.Weights and reusable for every
+    block (tally or energy bin) on the same mesh. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self):
+        self.shape = ()
+        self.x = None       # (i0,i1,t) along each axis
+        self.y = None
+        self.z = None
+        self.e = None       # (g0,g1,t) or None for the total bin
+        self.inside = None
+
+    # #####################################################
+    def Chunk(self,a,b):
+        """ Weights of the flattened points a:b. """
+
+        chunk = InterpolationWeights()
+        chunk.shape = (b-a,)
+        chunk.x = tuple(w[a:b] for w in self.x)
+        chunk.y = tuple(w[a:b] for w in self.y)
+        chunk.z = tuple(w[a:b] for w in self.z)
+        if self.e is not None:
+            chunk.e = tuple(w[a:b] for w in self.e)
+        chunk.inside = self.inside[a:b]
+        return chunk
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class MeshTalInterpolator:
+    """ Smooth sampling of a MeshTalBlock at arbitrary points: trilinear
+    interpolation between voxel centers and log-log interpolation
+    between energy group midpoints, with the relative error propagated
+    to every sample (bins treated as independent). All operations are
+    vectorized over the points, which are processed in chunks of
+    _INTERP_CHUNK_POINTS to bound temporary memory. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,block,per_unit_energy=False):
+        """ Arguments:
+            block: [MeshTalBlock] The tally to sample.
+            per_unit_energy: [bool] Divide the group values by the group
+                             widths, i.e. interpolate the spectrum
+                             rather than the group integrals. """
+
+        self.block = block
+        self.per_unit_energy = per_unit_energy
+        self.x_centers = np.array(block.x_centers,dtype=np.float64)
+        self.y_centers = np.array(block.y_centers,dtype=np.float64)
+        self.z_centers = np.array(block.z_centers,dtype=np.float64)
+        self.bounds = [(block.bin_lows[k],bins[-1]) for k,bins in
+                       enumerate([block.x_bins,block.y_bins,block.z_bins])]
+
+        ############################## Energy groups
+        highs = np.array(block.e_bins,dtype=np.float64)
+        lows = np.concatenate([[block.bin_lows[3]],highs[:-1]])
+        mids = _EnergyGroupMidpoints(block)
+        self.e_bounds = (block.bin_lows[3],highs[-1])
+        self.e_log_mids = np.log(mids)
+        self.e_widths = np.append(highs-lows,highs[-1]-lows[0])
+
+    # #####################################################
+    def Weights(self,x,y,z,e=None):
+        """ Computes the interpolation weights of a batch of points.
+
+        Arguments:
+            x,y,z: [float arrays] Point coordinates (broadcast).
+            e: [float array] Optional point energies. If None the
+               total bin is sampled.
+
+        Returns:
+            weights: [InterpolationWeights] """
+
+        arrays = [np.asarray(a,dtype=np.float64) for a in (x,y,z)]
+        if e is not None:
+            arrays.append(np.asarray(e,dtype=np.float64))
+        arrays = [a.ravel() for a in np.broadcast_arrays(*arrays)]
+
+        weights = InterpolationWeights()
+        weights.shape = np.broadcast_shapes(*[np.shape(a) for a in
+                                              (x,y,z,e) if a is not None])
+        ix0,ix1,tx,inx = _AxisWeights(self.x_centers,*self.bounds[0],
+                                      arrays[0])
+        iy0,iy1,ty,iny = _AxisWeights(self.y_centers,*self.bounds[1],
+                                      arrays[1])
+        iz0,iz1,tz,inz = _AxisWeights(self.z_centers,*self.bounds[2],
+                                      arrays[2])
+        weights.x = (ix0,ix1,tx)
+        weights.y = (iy0,iy1,ty)
+        weights.z = (iz0,iz1,tz)
+        weights.inside = inx & iny & inz
+
+        if e is not None:
+            with np.errstate(divide="ignore",invalid="ignore"):
+                log_e = np.log(arrays[3])
+            g0,g1,te,ine = _AxisWeights(self.e_log_mids,-np.inf,np.inf,
+                                        log_e)
+            ine = (arrays[3] >= self.e_bounds[0]) & \
+                  (arrays[3] <= self.e_bounds[1])
+            weights.e = (g0,g1,te)
+            weights.inside &= ine
+
+        return weights
+
+    # #####################################################
+    def __Spatial(self,block,g,weights):
+        """ Trilinear value and variance of energy bin(s) g. """
+
+        ix0,ix1,tx = weights.x
+        iy0,iy1,ty = weights.y
+        iz0,iz1,tz = weights.z
+
+        # Gather the corners from the flat storage with np.take, which
+        # is much faster than 4-D fancy indexing. Sparse blocks look
+        # them up instead.
+        if block.layout == "sparse":
+            corners = block._SparseLookup
+        else:
+            if block.layout == "compact":
+                values = block.values.reshape(-1)
+                errors = block.rel_error.reshape(-1)
+                stride,value_col,error_col = 1,0,0
+            else:
+                values = block.data_values.reshape(-1)
+                errors = values
+                stride,value_col,error_col = 5,3,4
+            def corners(flat):
+                flat = flat*stride
+                return (np.take(values,flat+value_col),
+                        np.take(errors,flat+error_col))
+        nx,ny,nz = block.nx,block.ny,block.nz
+        g = np.asarray(g,dtype=np.int64)
+
+        v = np.zeros(weights.shape)
+        var = np.zeros(weights.shape)
+        for cx,wx in ((ix0,1.0-tx),(ix1,tx)):
+            fx = (g*nx+cx)*ny
+            for cy,wy in ((iy0,1.0-ty),(iy1,ty)):
+                wxy = wx*wy
+                fxy = (fx+cy)*nz
+                for cz,wz in ((iz0,1.0-tz),(iz1,tz)):
+                    w = wxy*wz
+                    corner,error = corners(fxy+cz)
+                    sigma = w*error*corner
+                    v += w*corner
+                    var += sigma*sigma
+        if self.per_unit_energy:
+            width = self.e_widths[g]
+            v /= width
+            var /= width*width
+
+        return v,var
+
+    # #####################################################
+    def __ApplyChunk(self,block,weights):
+        """ Interpolated values and relative errors of one chunk. """
+
+        if weights.e is None:
+            v,var = self.__Spatial(block,block.ng-1,weights)
+            with np.errstate(divide="ignore",invalid="ignore"):
+                u = np.where(v != 0,np.sqrt(var)/np.abs(v),0.0)
+            return v,u
+
+        g0,g1,t = weights.e
+        v0,var0 = self.__Spatial(block,g0,weights)
+        v1,var1 = self.__Spatial(block,g1,weights)
+        with np.errstate(divide="ignore",invalid="ignore"):
+            r0 = np.where(v0 != 0,np.sqrt(var0)/np.abs(v0),0.0)
+            r1 = np.where(v1 != 0,np.sqrt(var1)/np.abs(v1),0.0)
+
+            # Log-log where both groups score, linear otherwise
+            positive = (v0 > 0) & (v1 > 0)
+            loglog = np.exp((1.0-t)*np.log(np.where(positive,v0,1.0)) +
+                            t*np.log(np.where(positive,v1,1.0)))
+            linear = (1.0-t)*v0+t*v1
+            v = np.where(positive,loglog,linear)
+
+            # d(ln v) = (1-t) d(ln v0) + t d(ln v1) for log-log
+            u_log = np.sqrt(((1.0-t)*r0)**2+(t*r1)**2)
+            sigma = np.sqrt(((1.0-t)*r0*v0)**2+(t*r1*v1)**2)
+            u_lin = np.where(linear != 0,sigma/np.abs(linear),0.0)
+            u = np.where(positive,u_log,u_lin)
+
+        return v,u
+
+    # #####################################################
+    def Apply(self,weights,block=None):
+        """ Samples a block with precomputed weights.
+
+        Arguments:
+            weights: [InterpolationWeights] From Weights().
+            block: [MeshTalBlock] Optional other block on the same mesh
+                   (e.g. another tally). Defaults to this one.
+
+        Returns:
+            v: [masked float array] Interpolated values, shaped like
+               the points and masked outside the mesh.
+            u: [masked float array] Propagated relative errors. """
+
+        if block is None:
+            block = self.block
+        elif (list(block.x_bins) != list(self.block.x_bins)) or \
+             (list(block.y_bins) != list(self.block.y_bins)) or \
+             (list(block.z_bins) != list(self.block.z_bins)) or \
+             (list(block.e_bins) != list(self.block.e_bins)):
+            raise ValueError("block is not on the interpolator's mesh")
+
+        n = weights.inside.size
+        v = np.empty(n)
+        u = np.empty(n)
+        for a in range(0,n,_INTERP_CHUNK_POINTS):
+            b = min(a+_INTERP_CHUNK_POINTS,n)
+            v[a:b],u[a:b] = self.__ApplyChunk(block,weights.Chunk(a,b))
+
+        mask = ~weights.inside.reshape(weights.shape)
+        return np.ma.MaskedArray(v.reshape(weights.shape),mask=mask), \
+               np.ma.MaskedArray(u.reshape(weights.shape),mask=mask)
+
+    # #####################################################
+    def Sample(self,x,y,z,e=None):
+        """ Interpolates the block at a batch of points.
+
+        Arguments:
+            x,y,z: [float arrays] Point coordinates (broadcast).
+            e: [float array] Optional point energies. If None the
+               total bin is sampled.
+
+        Returns:
+            v: [masked float array] Interpolated values, masked outside
+               the mesh.
+            u: [masked float array] Propagated relative errors. """
+
+        return self.Apply(self.Weights(x,y,z,e))
+
+    # #####################################################
+    def SamplePolyline(self,vertices,num_points=1000,e=None):
+        """ Interpolates the block at evenly spaced points along a
+        polyline, e.g. a path through a facility.
+
+        Arguments:
+            vertices: [float array] Shape [m,3] polyline vertices.
+            num_points: [int] Number of samples, vertices included at
+                        both ends.
+            e: [float] Optional energy. If None the total bin is
+               sampled.
+
+        Returns:
+            s: [float array] Distance of each sample along the path.
+            points: [float array] Shape [num_points,3] sample points.
+            v: [masked float array] Interpolated values.
+            u: [masked float array] Propagated relative errors. """
+
+        vertices = np.asarray(vertices,dtype=np.float64)
+        lengths = np.sqrt(np.sum(np.diff(vertices,axis=0)**2,axis=1))
+        path = np.concatenate([[0.0],np.cumsum(lengths)])
+        s = np.linspace(0.0,path[-1],num_points)
+        points = np.stack([np.interp(s,path,vertices[:,k])
+                           for k in range(0,3)],axis=1)
+        v,u = self.Sample(points[:,0],points[:,1],points[:,2],e)
+
+        return s,points,v,u
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class ResponseFunction:
+    """ A response tabulated against energy, e.g. flux-to-dose
+    conversion factors, for MeshTalBlock.FoldResponse. The response of
+    a group is the table interpolated log-log at the group midpoint
+    (geometric, or half the upper bound for a group starting at 0),
+    held at the end values outside the table. Where a factor is not
+    positive the interpolation is linear in the factor. The group
+    factors are computed once per energy-group structure and cached. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,energies,factors,name=""):
+        """ Arguments:
+            energies: [float array] Increasing, positive energies (MeV).
+            factors: [float array] Response at each energy.
+            name: [str] Optional label. """
+
+        self.energies = np.array(energies,dtype=np.float64).ravel()
+        self.factors = np.array(factors,dtype=np.float64).ravel()
+        self.name = name
+        if (len(self.energies) == 0) or \
+           (len(self.energies) != len(self.factors)):
+            raise ValueError("A response needs one factor per energy")
+        if np.any(self.energies <= 0.0) or \
+           np.any(np.diff(self.energies) <= 0.0):
+            raise ValueError("Response energies must be positive and "
+                             "increasing")
+        self._group_factors = {}
+
+    # #####################################################
+    def __repr__(self):
+        return "<ResponseFunction %s(%d points, %g-%g MeV)>" % \
+               (self.name + " " if self.name else "",len(self.energies),
+                self.energies[0],self.energies[-1])
+
+    # #####################################################
+    def Evaluate(self,energies):
+        """ The response at the given energies. """
+
+        log_e = np.log(np.asarray(energies,dtype=np.float64))
+        log_table = np.log(self.energies)
+        if np.all(self.factors > 0.0):
+            return np.exp(np.interp(log_e,log_table,np.log(self.factors)))
+        return np.interp(log_e,log_table,self.factors)
+
+    # #####################################################
+    def GroupFactors(self,block):
+        """ The response at the midpoint of every energy group of block
+        (the total excluded). Cached per group structure. """
+
+        key = (float(block.bin_lows[3]),tuple(block.e_bins))
+        factors = self._group_factors.get(key)
+        if factors is None:
+            factors = self.Evaluate(_EnergyGroupMidpoints(block))
+            factors.flags.writeable = False
+            self._group_factors[key] = factors
+        return factors
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+@functools.lru_cache(maxsize=16)
+def _CachedResponse(energies,factors):
+    """ Don't use this method outside MMPP.
+    ResponseFunction of a plain table passed to FoldResponse, keyed by
+    the bytes of its arrays, so that repeated folds with the same
+    table reuse the group factors. """
+
+    return ResponseFunction(np.frombuffer(energies),np.frombuffer(factors))
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class _FixedWidthLayout:
+    """ Don't use this class outside MMPP.
+    Character layout of a row of right-aligned numeric fields, as MCNP
+    writes them, and the weights that turn the digits of a block of
+    such rows into every field's mantissa and exponent with a single
+    matrix product.
+
+    Arguments:
+        row: [uint8 array] Characters of one row.
+        spans: [list] (start,end) of each field in row. A field spans
+               from the end of the previous field to the end of its
+               own text.
+
+    Raises ValueError if the fields can not be decoded exactly (no
+    single decimal point, more than 15 digits, ...). """
+
+    def __init__(self,row,spans):
+        need = []       # Positions holding a digit in every row
+        fixed = []      # Positions holding the same character in every row
+        self.esign = [] # Positions of the exponent signs
+        self.fields = []
+        weights = []
+        for a,b in spans:
+            text = row[a:b]
+            dots = np.flatnonzero(text == ord("."))
+            exps = np.flatnonzero((text == ord("E")) | (text == ord("e")))
+            if (len(dots) != 1) or (len(exps) > 1):
+                raise ValueError("No fixed decimal point")
+            dot = int(dots[0])
+            fixed.append(a+dot)
+
+            ############################## Exponent
+            exponent = None
+            mant_end = b-a
+            if len(exps) == 1:
+                epos = int(exps[0])
+                if (epos+2 >= b-a) or (b-a-epos-2 > _DIGIT_GROUP):
+                    raise ValueError("No fixed exponent")
+                fixed.append(a+epos)
+                self.esign.append(a+epos+1)
+                digits = list(range(b-1,a+epos+1,-1))
+                need.extend(digits)
+                exponent = len(weights)
+                weights.append(digits)
+                mant_end = epos
+
+            # More than 15 significant digits would not be exact in a double
+            if (mant_end-1 > 15) or (mant_end <= dot+1):
+                raise ValueError("No exact mantissa")
+
+            ############################## Mantissa, least significant first
+            digits = [a+j for j in range(mant_end-1,-1,-1) if j != dot]
+            lead = [j for j in digits if j < a+dot-1]  # Digit, blank or sign
+            need.extend(j for j in digits if j >= a+dot-1)
+            groups = []
+            for g in range(0,len(digits),_DIGIT_GROUP):
+                groups.append(len(weights))
+                weights.append(digits[g:g+_DIGIT_GROUP])
+            self.fields.append((a,b,groups,exponent,len(self.esign)-1,
+                                np.array(lead,dtype=np.intp),mant_end-dot-1))
+
+        self.need = np.array(need,dtype=np.intp)
+        self.fixed = np.array(fixed,dtype=np.intp)
+        self.fixed_codes = row[self.fixed] - np.uint8(48)
+        self.esign = np.array(self.esign,dtype=np.intp)
+        self.weights = np.zeros([len(weights),len(row)],dtype=np.float32)
+        for r,digits in enumerate(weights):
+            self.weights[r,digits] = _POW10[0:len(digits)]
+
+    # #####################################################
+    def Decode(self,chars,out):
+        """ Decodes the fields of a block of rows.
+
+        Arguments:
+            chars: [uint8 array] Characters of the rows, transposed to
+                   shape [row_len,num_rows] so that every character
+                   position is contiguous.
+            out: [list] Destination 1-D array (any dtype) of each
+                 field.
+
+        Returns: True, or False if a row does not follow the layout
+                 (out is then partly written). """
+
+        # Digits become 0-9, every other character a code above 9
+        d = chars - np.uint8(48)
+        top = d.max(axis=1)
+        low = d.min(axis=1)
+        if np.any(top[self.need] > 9) or \
+           np.any(top[self.fixed] != self.fixed_codes) or \
+           np.any(low[self.fixed] != self.fixed_codes):
+            return False
+        signs = chars[self.esign]
+        eneg = (signs == ord("-"))
+        if not np.all(eneg | (signs == ord("+"))):
+            return False
+
+        # Leading positions that are blank in every row are left out of
+        # the product; mixed ones have their blanks and signs zeroed.
+        blank = np.uint8(ord(" ")+256-48)
+        rows = [self.need]
+        negative = []
+        for field in self.fields:
+            lead = field[5]
+            lead = lead[(top[lead] != blank) | (low[lead] != blank)]
+            rows.append(lead)
+            mixed = lead[top[lead] > 9]
+            if len(mixed) == 0:
+                negative.append(None)
+                continue
+            c = d[mixed]
+            digit = (c <= 9)
+            text = chars[mixed]
+            sign = (text == ord("-"))
+            if not np.all(digit | sign | (text == ord(" ")) |
+                          (text == ord("+"))):
+                return False
+            negative.append(sign.any(axis=0) if sign.any() else None)
+            c *= digit
+            d[mixed] = c
+
+        # Mantissa and exponent digit groups stay below 2**24, so the
+        # float32 product is exact
+        rows = np.concatenate(rows)
+        groups = np.matmul(self.weights[:,rows],d[rows].astype(np.float32))
+
+        for k,(a,b,mant,exponent,esign,lead,frac) in enumerate(self.fields):
+            v = groups[mant[0]].astype(np.float64)
+            for i in range(1,len(mant)):
+                v += groups[mant[i]]*_POW10[_DIGIT_GROUP*i]
+            if negative[k] is not None:
+                np.negative(v,out=v,where=negative[k])
+            if exponent is None:
+                np.divide(v,_POW10[frac],out=out[k])
+                continue
+
+            # Scale by the power of ten
+            p = groups[exponent]
+            np.negative(p,out=p,where=eneg[esign])
+            p += len(_POW10)-1-frac
+            inexact = None
+            if (p.min() < 0) or (p.max() >= len(_POW10_UP)):
+                inexact = np.flatnonzero((p < 0) | (p >= len(_POW10_UP)))
+                p[inexact] = 0
+            p = p.astype(np.intp)
+            v *= _POW10_UP[p]
+            np.divide(v,_POW10_DOWN[p],out=out[k])
+            if inexact is not None:
+                text = np.ascontiguousarray(chars[a:b,inexact].T)
+                out[k][inexact] = text.view("S%d" % (b-a)).ravel().astype(
+                    np.float64)
+
+        return True
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _FixedWidthLayoutOf(row,spans):
+    """ Don't use this method outside MMPP.
+    The _FixedWidthLayout of row, None if it has none. """
+
+    try:
+        return _FixedWidthLayout(row,spans)
+    except ValueError:
+        return None
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _DecodeFixedWidthField(chars):
+    """ Decodes one right-aligned numeric column of a fixed-width
+    data section.
+
+    Arguments:
+        chars: [uint8 array] Characters of the column, transposed to
+               shape [width,num_rows] so that every character position
+               is contiguous.
+
+    Returns:
+        v: [float array] The decoded values, bit-identical to calling
+           float() on each field, or None if the column does not have
+           a consistent fixed layout (the caller then falls back to a
+           generic parser). """
+
+    w,n = chars.shape
+    layout = _FixedWidthLayoutOf(chars[:,0],[(0,w)])
+    v = np.empty(n)
+    if (layout is None) or not layout.Decode(chars,[v]):
+        return None
+    return v
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ParseDataRowsFixedWidth(data,num_rows,out,on_chunk=None):
+    """ Fast path of _ParseDataRows for data sections in which every
+    row has the same length and column layout (which is how MCNP
+    writes them).
+
+    Returns:
+        row_len: [int] The common row length (newline included), or 0
+                 if the layout is not fixed. """
+
+    if num_rows == 0:
+        return 0
+    row_len = bytes(data[:_MAX_ROW_LEN]).find(b"\n")+1
+    if (row_len <= 0) or (row_len*num_rows > len(data)):
+        return 0
+    buf = np.frombuffer(data,dtype=np.uint8,count=row_len*num_rows)
+    buf = buf.reshape([num_rows,row_len])
+
+    # Each column spans from the end of the previous field to the end
+    # of its own field (fields are right-aligned).
+    fields = [m.end() for m in re.finditer(rb"\S+",bytes(data[:row_len]))]
+    if len(fields) < 6:
+        return 0
+    cols = [c for c in range(0,5) if out[c] is not None]
+    c0 = fields[cols[0]]
+    c1 = fields[cols[-1]+1]
+    layout = _FixedWidthLayoutOf(buf[0,c0:c1],
+                                 [(fields[c]-c0,fields[c+1]-c0) for c in cols])
+    if layout is None:
+        return 0
+
+    for r0 in range(0,num_rows,_BULK_CHUNK_ROWS):
+        r1 = min(r0+_BULK_CHUNK_ROWS,num_rows)
+        if np.any(buf[r0:r1,row_len-1] != ord("\n")):
+            return 0
+        chars = np.empty([c1-c0,r1-r0],dtype=np.uint8)
+        for t0 in range(r0,r1,_TRANSPOSE_ROWS):
+            t1 = min(t0+_TRANSPOSE_ROWS,r1)
+            chars[:,t0-r0:t1-r0] = buf[t0:t1,c0:c1].T
+        if not layout.Decode(chars,[out[c][r0:r1] for c in cols]):
+            return 0
+        if on_chunk is not None:
+            on_chunk(r1*row_len)
+
+    return row_len
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ParseDataRows(data,num_rows,out=None,on_chunk=None):
+    """ Parses a column-format data section in one bulk pass.
+
+    Arguments:
+        data: [bytes-like] The data rows, i.e. the lines following the
+              "Energy X Y Z Result Rel Error" header. Anything after
+              the first num_rows rows is ignored.
+        num_rows: [int] Number of rows to parse.
+        out: [list] Optional destinations for the X, Y, Z, Result and
+             Rel Error columns: five 1-D arrays of length num_rows
+             (any dtype), or None for columns that are not needed.
+        on_chunk: [callable] Optional. Called with the number of bytes
+                  of data consumed so far, after every chunk of rows.
+
+    Returns:
+        rows: [float array] Shape [num_rows,5] holding the X, Y, Z,
+              Result and Rel Error columns, i.e. exactly what the
+              line-by-line parser stores in data_values. If out is
+              given it is filled instead and returned.
+        row_len: [int] Common length of the rows, 0 if the section is
+                 not fixed width. """
+
+    rows = None
+    if out is None:
+        rows = np.empty([num_rows,5])
+        out = [rows[:,c] for c in range(0,5)]
+    cols = [c for c in range(0,5) if out[c] is not None]
+    if (num_rows == 0) or (len(cols) == 0):
+        return (out if rows is None else rows),0
+
+    row_len = _ParseDataRowsFixedWidth(data,num_rows,out,on_chunk)
+    if row_len == 0:
+        parsed = np.loadtxt(io.BytesIO(data),
+                            usecols=tuple(c+1 for c in cols),
+                            max_rows=num_rows,ndmin=2)
+        for k,c in enumerate(cols):
+            out[c][:] = parsed[:,k]
+
+    return (out if rows is None else rows),row_len
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _IterMatrixTables(data,block):
+    """ Don't use this method outside MMPP.
+    Walks the tables of a matrix-format data section in file order.
+    Only the title and header line of each table are decoded; its rows
+    are skipped.
+
+    Arguments:
+        data: [bytes-like] The data section.
+        block: [MeshTalBlock] The (sized) block the section belongs to.
+
+    Yields:
+        table: [tuple] (is_error, g, c, across, down, across_centers,
+               start, end, layout): whether it is a Relative Errors
+               table, the energy group, the bin along the third axis,
+               the across and down axes (0-2), the across-axis centers
+               and the extent and layout of the rows (see
+               _MatrixTableLayout). """
+
+    dims = [block.nx,block.ny,block.nz]
+    num_tables = 0
+    pos = 0
+    while True:
+        match = _MATRIX_TABLE.search(data,pos)
+        if match is None:
+            return
+        pos = match.end()
+        is_error = match.group(1) is None
+        if not is_error:
+            across = _AxisNumber(match.group(1).decode())
+            down = _AxisNumber(match.group(2).decode())
+            g,c = divmod(num_tables,dims[3-across-down])
+            num_tables += 1
+        elif num_tables == 0:
+            continue
+        if g >= block.ng:
+            raise ValueError("Mesh tally %d has more matrix tables "
+                             "than energy bins" % block.tally_number)
+
+        head = _NEWLINE.search(data,match.end()).end()
+        start = _NEWLINE.search(data,head).end()
+        across_centers = np.array([float(w) for w in
+                                   bytes(data[head:start]).split()])
+        if len(across_centers) != dims[across]:
+            raise ValueError("Mesh tally %d: matrix table has %d "
+                             "columns, expected %d" %
+                             (block.tally_number,len(across_centers),
+                              dims[across]))
+        layout,pos = \
+            _MatrixTableLayout(data,start,dims[down],dims[across])
+        yield is_error,g,c,across,down,across_centers,start,pos,layout
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _MatrixTableLayout(data,start,n_down,n_across):
+    """ Finds the extent of the rows of one matrix-format table and
+    checks whether they are fixed width with equally wide value
+    fields (which is how MCNP writes them).
+
+    Arguments:
+        data: [bytes-like] The data section.
+        start: [int] Offset of the first row, i.e. the line after the
+               row of across-axis centers.
+        n_down: [int] Number of rows.
+        n_across: [int] Number of values per row.
+
+    Returns:
+        layout: [tuple] The row length and the end of every field in
+                the first row, or None if the rows are not fixed width.
+        end: [int] Offset just past the last row. """
+
+    eol = _NEWLINE.search(data,start)
+    row_len = 0 if eol is None else eol.end()-start
+    end = start+row_len*n_down
+    if (row_len > 0) and (end <= len(data)):
+        rows = np.frombuffer(data,dtype=np.uint8,count=row_len*n_down,
+                             offset=start).reshape([n_down,row_len])
+        solid = rows[0] > ord(" ")
+        fields = tuple((np.flatnonzero(solid[:-1] & ~solid[1:])+1).tolist())
+        widths = np.diff(fields)
+        if (len(fields) == n_across+1) and \
+           np.all(widths == widths[0]) and \
+           np.all(rows[:,row_len-1] == ord("\n")):
+            return (row_len,fields),end
+
+    end = start
+    for r in range(0,n_down):
+        eol = _NEWLINE.search(data,end)
+        end = len(data) if eol is None else eol.end()
+    return None,end
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ParseMatrixTables(data,starts,ends,layout,n_down,n_across):
+    """ Parses the rows of matrix-format tables that share one layout.
+    Each row holds the center of a down-axis bin followed by n_across
+    values. Fixed-width tables are decoded together, about as many
+    values per pass as the column parser decodes.
+
+    Arguments:
+        data: [bytes-like] The data section.
+        starts: [list of int] Offset of the first row of each table.
+        ends: [list of int] Offset just past the last row of each.
+        layout: [tuple] As returned by _MatrixTableLayout, None to
+                parse the tables with the generic parser.
+        n_down: [int] Number of rows per table.
+        n_across: [int] Number of values per row.
+
+    Returns:
+        centers: [float array] [num_tables,n_down] The first columns.
+        tables: [float array] [num_tables,n_down,n_across] The
+                values. """
+
+    num_tables = len(starts)
+    centers = np.empty([num_tables,n_down])
+    tables = np.empty([num_tables,n_down,n_across])
+    per_pass = max(1,5*_BULK_CHUNK_ROWS // (n_down*n_across))
+
+    for t0 in range(0,num_tables,per_pass):
+        t1 = min(t0+per_pass,num_tables)
+
+        ############################## Fixed-width fast path
+        if layout is not None:
+            row_len,fields = layout
+            rows = np.concatenate([
+                np.frombuffer(data,dtype=np.uint8,count=row_len*n_down,
+                              offset=start).reshape([n_down,row_len])
+                for start in starts[t0:t1]])
+            c = _DecodeFixedWidthField(
+                np.ascontiguousarray(rows[:,0:fields[0]].T))
+            chars = rows[:,fields[0]:fields[-1]].reshape(
+                [-1,fields[1]-fields[0]])
+            v = _DecodeFixedWidthField(np.ascontiguousarray(chars.T))
+            if (c is not None) and (v is not None):
+                centers[t0:t1] = c.reshape([-1,n_down])
+                tables[t0:t1] = v.reshape([-1,n_down,n_across])
+                continue
+
+        ############################## Generic fallback
+        for t in range(t0,t1):
+            parsed = np.loadtxt(io.BytesIO(bytes(data[starts[t]:ends[t]])),
+                                ndmin=2)
+            if parsed.shape != (n_down,n_across+1):
+                raise ValueError("Malformed matrix table at offset %d" %
+                                 starts[t])
+            centers[t] = parsed[:,0]
+            tables[t] = parsed[:,1:]
+
+    return centers,tables
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ParseCenters(data,nx,ny,nz,row_len=0):
+    """ Picks the voxel center coordinates out of the data rows of the
+    first energy group (rows are ordered x, y, z with z fastest) and
+    parses only those rows.
+
+    Arguments:
+        row_len: [int] Fixed row length as returned by _ParseDataRows,
+                 0 if unknown. Allows seeking straight to the rows.
+
+    Returns:
+        xc,yc,zc: [float arrays] Centers along x, y and z. """
+
+    xrows = np.arange(0,nx)*(ny*nz)
+    yrows = np.arange(0,ny)*nz
+    zrows = np.arange(0,nz)
+    wanted = np.unique(np.concatenate([xrows,yrows,zrows]))
+
+    if row_len > 0:
+        picked = b"".join(bytes(data[r*row_len:(r+1)*row_len])
+                          for r in wanted)
+    else:
+        wanted_set = set(wanted.tolist())
+        picked = []
+        r = 0
+        for line in io.BytesIO(data):
+            if len(line.split()) == 0:
+                continue
+            if r in wanted_set:
+                picked.append(line)
+            r += 1
+            if r > wanted[-1]:
+                break
+        picked = b"".join(picked)
+
+    rows,picked_len = _ParseDataRows(picked,len(wanted))
+    pos = {r:k for k,r in enumerate(wanted.tolist())}
+    xc = rows[[pos[r] for r in xrows.tolist()],0]
+    yc = rows[[pos[r] for r in yrows.tolist()],1]
+    zc = rows[[pos[r] for r in zrows.tolist()],2]
+
+    return xc,yc,zc
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ParseBlockHeaderLine(cur_block,words,allocate=True):
+    """ Don't use this method outside MMPP.
+    Picks up the tally number and bin boundaries of a block from one
+    (split) header line. The block is sized once the energy bin
+    boundaries are known.
+
+    Returns:
+        found: [bool] True if the line was a header line. """
+
+    if len(words) < 3:
+        return False
+
+    ############################## Tally number
+    if (words[0]=="Mesh") and \
+       (words[1]=="Tally") and \
+       (words[2]=="Number"):
+        cur_block.tally_number = int(words[3])
+        return True
+
+    ############################## Particle ("This is a neutron mesh tally.")
+    if (words[-2:] == ["mesh","tally."]) and (len(words) >= 3):
+        cur_block.particle = words[-3]
+        return True
+
+    ############################## Detect x bins
+    if (words[0]=="X") and \
+       (words[1]=="direction:"):
+        num_bounds = len(words)-3
+        for b in range(0,num_bounds):
+            cur_block.x_bins.append(float(words[b+3]))
+        cur_block.bin_lims[0] = float(words[3])
+        cur_block.bin_lows[0] = float(words[2])
+        logger.debug("X bins extracted: %d",len(cur_block.x_bins))
+        return True
+
+    ############################## Detect y bins
+    if (words[0]=="Y") and \
+       (words[1]=="direction:"):
+        num_bounds = len(words)-3
+        for b in range(0,num_bounds):
+            cur_block.y_bins.append(float(words[b+3]))
+        cur_block.bin_lims[1] = float(words[3])
+        cur_block.bin_lows[1] = float(words[2])
+        logger.debug("Y bins extracted: %d",len(cur_block.y_bins))
+        return True
+
+    ############################## Detect z bins
+    if (words[0]=="Z") and \
+       (words[1]=="direction:"):
+        num_bounds = len(words)-3
+        for b in range(0,num_bounds):
+            cur_block.z_bins.append(float(words[b+3]))
+        cur_block.bin_lims[2] = float(words[3])
+        cur_block.bin_lows[2] = float(words[2])
+        logger.debug("Z bins extracted: %d",len(cur_block.z_bins))
+        return True
+
+    ############################## Detect energy boundaries
+    if (words[0]=="Energy") and \
+       (words[1]=="bin") and \
+       (words[2]=="boundaries:"):
+        num_bounds = len(words)-4
+        for g in range(0,num_bounds):
+            cur_block.e_bins.append(float(words[g+4]))
+        cur_block.bin_lims[3] = float(words[4])
+        cur_block.bin_lows[3] = float(words[3])
+        logger.debug("Energy bins extracted: %d %s",
+                     len(cur_block.e_bins),cur_block.e_bins)
+        cur_block.SizeDataValues(allocate)
+        return True
+
+    return False
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _IsDataHeader(words):
+    """ True for the "Energy X Y Z Result Rel Error" line that precedes
+    the data rows of a column-format block. """
+
+    return (len(words) >= 3) and \
+           (words[0]=="Energy") and \
+           (words[1]=="X") and \
+           (words[2]=="Y")
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _IsMatrixHeader(words):
+    """ True for the line that opens the data of a matrix-format
+    (OUT=ij/ik/jk) block: "Energy Bin:", "Total Energy Bin",
+    "<axis> bin:" or "Tally Results:". """
+
+    return (words[:2] == ["Energy","Bin:"]) or \
+           (words[:3] == ["Total","Energy","Bin"]) or \
+           (words[:2] == ["Tally","Results:"]) or \
+           ((len(words) >= 2) and (words[0] in ("X","Y","Z")) and \
+            (words[1] == "bin:"))
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class MeshTalBlockIndex:
+    """ Byte offsets of one mesh tally inside a meshtal file. An offset
+    of -1 means the line was not found. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self):
+        self.tally_number = 0
+        self.header_offset = -1   # "Mesh Tally Number" line
+        self.x_offset = -1        # "X direction:" line
+        self.y_offset = -1        # "Y direction:" line
+        self.z_offset = -1        # "Z direction:" line
+        self.e_offset = -1        # "Energy bin boundaries:" line
+        self.data_offset = -1     # First data row or matrix line
+        self.section_end = -1     # Next "Mesh Tally Number" line or EOF
+        self.num_rows = 0
+        self.row_len = 0          # Fixed data row length, 0 if unknown
+        self.format = "column"    # "column" or "matrix" (OUT=ij/ik/jk)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _FileHistories(mm,end):
+    """ Reads the "Number of histories used for normalizing tallies"
+    line of the file header (before offset end). Returns 0.0 if there
+    is none. """
+
+    pos = mm.find(b"Number of histories used for normalizing tallies",
+                  0,end)
+    if pos < 0:
+        return 0.0
+    eol = mm.find(b"\n",pos)
+    line = mm[pos:(len(mm) if eol < 0 else eol)]
+    try:
+        return float(line.split(b"=")[-1])
+    except ValueError:
+        return 0.0
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _IndexMappedFile(mm):
+    """ Pre-scans a memory-mapped meshtal file. Only the header lines
+    of each block are decoded; the data sections are skipped with
+    mmap.find().
+
+    Returns:
+        index: [list of (MeshTalBlockIndex,MeshTalBlock)] Sized blocks
+               with their bins filled in but no data_values. """
+
+    with _Phase("scan") as phase:
+        index = _IndexMappedFileBlocks(mm)
+        phase.rows = sum(entry.num_rows for entry,block in index)
+    logger.info("Found %d mesh tallies",len(index))
+    return index
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _IndexMappedFileBlocks(mm):
+    """ Don't use this method outside MMPP.
+    The scan of _IndexMappedFile. """
+
+    index = []
+    size = len(mm)
+    key = b"Mesh Tally Number"
+    offsets = {"X":"x_offset","Y":"y_offset","Z":"z_offset",
+               "Energy":"e_offset"}
+    pos = mm.find(key)
+    histories = _FileHistories(mm,size if pos < 0 else pos)
+    while pos >= 0:
+        entry = MeshTalBlockIndex()
+        entry.header_offset = mm.rfind(b"\n",0,pos)+1
+        block = MeshTalBlock()
+        block.histories = histories
+
+        ############################## Walk the header lines
+        p = entry.header_offset
+        while p < size:
+            eol = mm.find(b"\n",p)
+            eol = size if eol < 0 else eol+1
+            words = mm[p:eol].decode("ascii","replace").split()
+            if _IsDataHeader(words):
+                entry.data_offset = eol
+                break
+            if _IsMatrixHeader(words):
+                entry.data_offset = p
+                entry.format = "matrix"
+                break
+            if (p > entry.header_offset) and (words[:3] == \
+               ["Mesh","Tally","Number"]):
+                break
+            if _ParseBlockHeaderLine(block,words,allocate=False) and \
+               (words[0] in offsets):
+                setattr(entry,offsets[words[0]],p)
+            p = eol
+        entry.tally_number = block.tally_number
+        entry.num_rows = block.ng*block.nx*block.ny*block.nz
+
+        ############################## Skip the data rows
+        # MCNP writes fixed-width rows, so the end of the section can be
+        # computed from the first row and checked at one spot instead
+        # of searching through (and paging in) the whole section.
+        search_from = p
+        if (entry.data_offset >= 0) and (entry.format == "column"):
+            search_from = entry.data_offset
+            row_len = mm.find(b"\n",entry.data_offset)+1-entry.data_offset
+            data_end = entry.data_offset+row_len*entry.num_rows
+            if (row_len > 0) and (data_end <= size) and \
+               (mm[data_end-1:data_end] == b"\n") and \
+               (mm[data_end-row_len-1:data_end-row_len] == b"\n"):
+                search_from = data_end
+                entry.row_len = row_len
+
+        elif entry.data_offset >= 0:
+            search_from = _SkipMatrixTables(
+                mm,entry.data_offset,[block.nx,block.ny,block.nz])
+
+        nxt = mm.find(key,search_from)
+        entry.section_end = size if nxt < 0 else mm.rfind(b"\n",0,nxt)+1
+        _ReleaseMappedPages(mm,entry.header_offset,entry.section_end)
+
+        block.index = entry
+        index.append((entry,block))
+        pos = nxt
+
+    return index
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _SkipMatrixTables(mm,pos,dims):
+    """ Don't use this method outside MMPP.
+    Hops over the tables of a matrix-format data section. Only the
+    lines between tables, the title, the header and the first row of
+    each table are read; the end of its rows is computed and checked
+    at one spot, like the column-format rows in _IndexMappedFile.
+
+    Returns:
+        pos: [int] Offset past the last table found this way, from
+             which the search for the next tally continues. """
+
+    down = None
+    while True:
+        match = _MATRIX_TABLE.search(mm,pos,pos+_MAX_ROW_LEN)
+        if (match is None) or \
+           (mm.find(b"Mesh Tally Number",pos,match.start()) >= 0):
+            return pos
+        if match.group(1) is not None:
+            down = _AxisNumber(match.group(2).decode())
+        elif down is None:
+            return pos
+        head = mm.find(b"\n",match.end())+1
+        start = mm.find(b"\n",head)+1
+        row_len = mm.find(b"\n",start)+1-start
+        end = start+row_len*dims[down]
+        if (head <= 0) or (start <= 0) or (row_len <= 0) or \
+           (end > len(mm)) or (mm[end-1:end] != b"\n") or \
+           (mm[end-row_len-1:end-row_len] != b"\n"):
+            return match.end()
+        pos = end
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ReleaseMappedPages(mm,start=0,end=None):
+    """ Tells the kernel that the mapped pages in [start,end) are no
+    longer needed so they stop counting towards this process' RSS.
+    The file itself is untouched; the pages are simply re-read from
+    the page cache if accessed again. """
+
+    if not (hasattr(mm,"madvise") and hasattr(mmap,"MADV_DONTNEED")):
+        return
+    end = len(mm) if end is None else end
+    start -= start % mmap.PAGESIZE
+    if end > start:
+        try:
+            mm.madvise(mmap.MADV_DONTNEED,start,end-start)
+        except (OSError,ValueError):
+            pass
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _LoadMappedData(mm,entry,block,progress=None):
+    """ Don't use this method outside MMPP.
+    Parses the data section of one indexed block from the mapped
+    file. Used as the deferred loader of lazy blocks.
+
+    Arguments:
+        progress: [callable] Optional. Called with the number of bytes
+                  of the data section parsed so far. """
+
+    if entry.data_offset < 0:
+        block.SizeDataValues()
+        return
+    released = [entry.data_offset]
+    def release(num_bytes):
+        # Only the rows parsed since the last call
+        _ReleaseMappedPages(mm,released[0],entry.data_offset+num_bytes)
+        released[0] = entry.data_offset+num_bytes
+        if progress is not None:
+            progress(num_bytes)
+
+    logger.info("Parsing mesh tally %d (%d rows, %s format)",
+                block.tally_number,entry.num_rows,entry.format)
+    with _Phase("parse",entry.num_rows):
+        data = memoryview(mm)[entry.data_offset:entry.section_end]
+        if entry.format == "matrix":
+            block.ParseMatrixSection(data,release)
+        else:
+            block.ParseDataSection(data,release)
+        data.release()
+        _ReleaseMappedPages(mm,entry.data_offset,entry.section_end)
+    if progress is not None:
+        progress(entry.section_end-entry.data_offset)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _MapMeshtalfile(meshtal_filename):
+    """ Memory-maps a meshtal file read-only. Returns None for an empty
+    file (which cannot be mapped). """
+
+    with open(meshtal_filename,"rb") as mfile:
+        if os.fstat(mfile.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(mfile.fileno(),0,access=mmap.ACCESS_READ)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def IndexMeshtalfile(meshtal_filename):
+    """ Builds the byte-offset index of a meshtal file without parsing
+    any data rows.
+
+    Arguments:
+        meshtal_filename: [str] Path to the meshtal file.
+
+    Returns:
+        index: [list of MeshTalBlockIndex] One entry per mesh tally,
+               in file order. """
+
+    mm = _MapMeshtalfile(meshtal_filename)
+    if mm is None:
+        return []
+    index = [entry for entry,block in _IndexMappedFile(mm)]
+    mm.close()
+    return index
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class MeshTalInfo:
+    """ Header-only description of one mesh tally, as listed by
+    ScanMeshtalfile. Holds no data; ToBlock() reads it. """
+
+    # pylint: disable=too-many-instance-attributes
+    # Necessary
+
+    # #####################################################
+    # Constructor
+    def __init__(self,meshtal_filename,block,signature):
+        self.filename = meshtal_filename
+        self.tally_number = block.tally_number
+        self.particle = block.particle
+        self.histories = block.histories
+        self.format = block.index.format
+        self.x_bins = list(block.x_bins)
+        self.y_bins = list(block.y_bins)
+        self.z_bins = list(block.z_bins)
+        self.e_bins = list(block.e_bins)
+        self.bin_lims = list(block.bin_lims)
+        self.bin_lows = list(block.bin_lows)
+        self.nx = block.nx
+        self.ny = block.ny
+        self.nz = block.nz
+        self.ng = block.ng
+        self.index = block.index
+        self.data_bytes = max(0,block.index.section_end -
+                                block.index.data_offset)
+        self._signature = signature
+
+    # #####################################################
+    def __repr__(self):
+        return ("<MeshTalInfo tally %d (%s) %dx%dx%d, %d groups, "
+                "%d data bytes>" % (self.tally_number,self.particle,
+                self.nx,self.ny,self.nz,self.ng,self.data_bytes))
+
+    # #####################################################
+    def Bounds(self):
+        """ Extent of the mesh.
+
+        Returns:
+            lower: [list] Lower x, y, z and energy bounds.
+            upper: [list] Upper x, y, z and energy bounds. """
+
+        upper = [self.x_bins[-1] if self.nx > 0 else 0.0,
+                 self.y_bins[-1] if self.ny > 0 else 0.0,
+                 self.z_bins[-1] if self.nz > 0 else 0.0,
+                 self.e_bins[-1] if self.ng > 1 else 0.0]
+        return list(self.bin_lows),upper
+
+    # #####################################################
+    def _CheckUnchanged(self):
+        """ Raises ValueError if the file was modified after the scan,
+        which would invalidate the recorded offsets. """
+        if _SourceSignature(self.filename,False) != self._signature:
+            raise ValueError('"' + self.filename + '" changed since it '
+                             'was scanned')
+
+    # #####################################################
+    def ToBlock(self,layout="full",dtype=np.float64):
+        """ Reads this tally's data from the file, seeking straight
+        to its data section.
+
+        Arguments:
+            layout: [str] "full", "compact" or "sparse", see
+                    ReadMeshtalfile.
+            dtype: [numpy dtype] See ReadMeshtalfile.
+
+        Returns:
+            block: [MeshTalBlock] """
+
+        self._CheckUnchanged()
+        block = MeshTalBlock()
+        block.tally_number = self.tally_number
+        block.particle = self.particle
+        block.histories = self.histories
+        block.x_bins = list(self.x_bins)
+        block.y_bins = list(self.y_bins)
+        block.z_bins = list(self.z_bins)
+        block.e_bins = list(self.e_bins)
+        block.bin_lims = list(self.bin_lims)
+        block.bin_lows = list(self.bin_lows)
+        block.SizeDataValues(allocate=False)
+        block.layout = layout
+        block.dtype = dtype
+        block.index = self.index
+
+        mm = _MapMeshtalfile(self.filename)
+        _LoadMappedData(mm,self.index,block)
+        mm.close()
+
+        return block
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def ScanMeshtalfile(meshtal_filename):
+    """ Lists the mesh tallies of a meshtal file from their header lines
+    only. Data sections are seeked past, not read, so the cost does
+    not depend on the size of the data.
+
+    Arguments:
+        meshtal_filename: [str] Path to the meshtal file.
+
+    Returns:
+        infos: [list of MeshTalInfo] One entry per mesh tally, in file
+               order. """
+
+    signature = _SourceSignature(meshtal_filename,False)
+    mm = _MapMeshtalfile(meshtal_filename)
+    if mm is None:
+        return []
+    infos = [MeshTalInfo(meshtal_filename,block,signature)
+             for entry,block in _IndexMappedFile(mm)]
+    mm.close()
+    return infos
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class MeshTalChunk:
+    """ A piece of a tally's data as delivered by MeshTalStream: the
+    results and relative errors of a set of voxels together with their
+    bin indices. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,g,ix,iy,iz,values,rel_error,volume):
+        self.g = g                   # [n] Energy group
+        self.ix = ix                 # [n] Bin indices
+        self.iy = iy
+        self.iz = iz
+        self.values = values         # [n] Results
+        self.rel_error = rel_error   # [n] Relative errors
+        self.volume = volume         # [n] Voxel volumes
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class MeshTalStream:
+    """ Walks the data of one mesh tally in chunks straight from the
+    file, for tallies too large to hold in memory. Only one chunk is
+    decoded at a time and the mapped pages are released behind it,
+    so memory stays bounded by the chunk size whatever the size of the
+    file. Reductions (the Stream* classes) are fed by Run():
+
+        info = MMPP.ScanMeshtalfile("big.msht")[0]
+        stream = MMPP.MeshTalStream(info)
+        total,profile = stream.Run(MMPP.StreamEnergyIntegral(),
+                                   MMPP.StreamProjection("z"))
+    """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,info,chunk_rows=_STREAM_CHUNK_ROWS):
+        """ Arguments:
+            info: [MeshTalInfo] The tally, as listed by
+                  ScanMeshtalfile.
+            chunk_rows: [int] Number of voxels per chunk. Memory use
+                        is about 150 bytes per voxel of a chunk (plus
+                        any in-memory outputs of the reductions). A
+                        chunk of a matrix-format tally is one table,
+                        whatever this is set to. """
+
+        self.info = info
+        self.chunk_rows = max(1,int(chunk_rows))
+        self.shape = (info.ng,info.nx,info.ny,info.nz)
+        self.widths = []
+        for k,bins in enumerate([info.x_bins,info.y_bins,info.z_bins]):
+            self.widths.append(np.diff([info.bin_lows[k]]+list(bins)))
+
+    # #####################################################
+    def __Chunk(self,g,ix,iy,iz,values,rel_error):
+        """ Wraps decoded values into a MeshTalChunk. """
+        volume = self.widths[0][ix]*self.widths[1][iy]*self.widths[2][iz]
+        return MeshTalChunk(g,ix,iy,iz,values,rel_error,volume)
+
+    # #####################################################
+    def Chunks(self):
+        """ Yields the tally's data as MeshTalChunk objects, in file
+        order. Every voxel of every energy group (the total last) is
+        delivered exactly once. """
+
+        info = self.info
+        info._CheckUnchanged()
+        entry = info.index
+        if entry.data_offset < 0:
+            return
+        mm = _MapMeshtalfile(info.filename)
+        try:
+            if entry.format != "matrix":
+                for chunk in self.__ColumnChunks(mm):
+                    yield chunk
+                return
+            groups_seen = set()
+            for group in (None,1):
+                if (group == 1) and \
+                   not ((info.ng == 2) and (groups_seen == {0})):
+                    # Only a single energy bin has no separate total
+                    break
+                chunks = self.__MatrixChunks(mm,group)
+                try:
+                    for chunk in chunks:
+                        groups_seen.add(int(chunk.g[0]))
+                        yield chunk
+                finally:
+                    # Releases its view of the map before it is closed
+                    chunks.close()
+        finally:
+            mm.close()
+
+    # #####################################################
+    def __ColumnChunks(self,mm):
+        """ Chunks of a column-format data section. """
+
+        entry = self.info.index
+        num_rows = int(np.prod(self.shape))
+        row_len = entry.row_len
+        lines = None
+        if row_len == 0:
+            # Rows of varying length can only be walked line by line
+            mm.seek(entry.data_offset)
+            lines = iter(mm.readline,b"")
+
+        for r0 in range(0,num_rows,self.chunk_rows):
+            r1 = min(r0+self.chunk_rows,num_rows)
+            if row_len > 0:
+                start = entry.data_offset+r0*row_len
+                end = entry.data_offset+r1*row_len
+                data = memoryview(mm)[start:end]
+                out = [None,None,None,np.empty(r1-r0),np.empty(r1-r0)]
+                _ParseDataRows(data,r1-r0,out)
+                data.release()
+                _ReleaseMappedPages(mm,start,end)
+                values,rel_error = out[3],out[4]
+            else:
+                parsed = np.loadtxt(itertools.islice(lines,r1-r0),
+                                    usecols=(4,5),ndmin=2)
+                values,rel_error = parsed[:,0],parsed[:,1]
+            g,ix,iy,iz = np.unravel_index(np.arange(r0,r1),self.shape)
+            yield self.__Chunk(g,ix,iy,iz,values,rel_error)
+
+    # #####################################################
+    def __MatrixChunks(self,mm,group):
+        """ Chunks of a matrix-format data section: one per pair of
+        Tally Results and Relative Errors tables. group, if given,
+        overrides the energy group of the chunks. """
+
+        info = self.info
+        entry = info.index
+        block = MeshTalBlock()
+        block.tally_number = info.tally_number
+        block.nx,block.ny,block.nz,block.ng = \
+            info.nx,info.ny,info.nz,info.ng
+        dims = [info.nx,info.ny,info.nz]
+
+        data = memoryview(mm)[entry.data_offset:entry.section_end]
+        try:
+            values = None
+            for table in _IterMatrixTables(data,block):
+                is_error,g,c,across,down,across_centers,start,end,layout \
+                    = table
+                centers,parsed = _ParseMatrixTables(
+                    data,[start],[end],layout,dims[down],dims[across])
+                if not is_error:
+                    values = parsed[0]
+                    continue
+                if values is None:
+                    continue
+                index = [None,None,None]
+                index[3-across-down] = c
+                index[down] = np.arange(0,dims[down]).reshape([-1,1])
+                index[across] = np.arange(0,dims[across]).reshape([1,-1])
+                ix,iy,iz = [i.ravel() for i in np.broadcast_arrays(*index)]
+                ig = np.full(ix.shape,g if group is None else group)
+                yield self.__Chunk(ig,ix,iy,iz,values.ravel(),
+                                   parsed[0].ravel())
+                values = None
+                _ReleaseMappedPages(mm,entry.data_offset,
+                                    entry.data_offset+end)
+        finally:
+            data.release()
+
+    # #####################################################
+    def Run(self,*reductions,progress=None):
+        """ Feeds every chunk to all the given reductions in a single
+        pass over the file.
+
+        Arguments:
+            progress: [callable] Optional. Called as progress(done,total)
+                      with the number of rows streamed so far and in
+                      all, after every chunk.
+
+        Returns:
+            results: The result of each reduction, in order (a single
+                     result if one reduction was given). """
+
+        info = self.info
+        total = info.ng*info.nx*info.ny*info.nz
+        with _Phase("stream",total):
+            for reduction in reductions:
+                reduction.Start(self)
+            done = 0
+            for chunk in self.Chunks():
+                for reduction in reductions:
+                    reduction.Add(chunk)
+                done += len(chunk.values)
+                if progress is not None:
+                    progress(done,total)
+            results = [reduction.Finish() for reduction in reductions]
+
+        return results[0] if len(results) == 1 else results
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _StreamOutput(out,name,shape):
+    """ Don't use this method outside MMPP.
+    Resolves the output array of a reduction: a new in-memory array
+    for None, a new memory-mapped .npy file for a file name, or the
+    given array (for example an np.memmap) zeroed. """
+
+    if out is None:
+        return np.zeros(shape)
+    if isinstance(out,str):
+        return np.lib.format.open_memmap(out,mode="w+",dtype=np.float64,
+                                         shape=tuple(shape))
+    if tuple(out.shape) != tuple(shape):
+        raise ValueError("%s must have shape %s, not %s" %
+                         (name,tuple(shape),tuple(out.shape)))
+    out[...] = 0.0
+    return out
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _SumRelError(total,variance):
+    """ Relative error of a sum of independent bins from its summed
+    variance; 0 where the sum is 0. """
+
+    total = np.asarray(total,dtype=np.float64)
+    error = np.zeros(total.shape)
+    np.divide(np.sqrt(variance),np.abs(total),out=error,
+              where=(total != 0.0))
+    return error
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class StreamEnergyIntegral:
+    """ Sum over energy groups for every voxel, with its relative
+    error (groups treated as independent). The [nx,ny,nz] result can
+    be written to memory-mapped output. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,groups=None,values_out=None,rel_error_out=None):
+        """ Arguments:
+            groups: [list of int] Groups to sum. Default: all except
+                    the total (i.e. the last group).
+            values_out, rel_error_out: [str or array] Optional. Output
+                    .npy file names, or [nx,ny,nz] arrays (for example
+                    np.memmap) to fill. By default the results are
+                    kept in memory. """
+
+        self.groups = groups
+        self.values_out = values_out
+        self.rel_error_out = rel_error_out
+
+    # #####################################################
+    def Start(self,stream):
+        """ Don't use this method outside MMPP. """
+        ng,nx,ny,nz = stream.shape
+        groups = self.groups
+        if groups is None:
+            groups = range(0,max(1,ng-1))
+        self.selected = np.zeros(ng,dtype=bool)
+        self.selected[list(groups)] = True
+        self.total = _StreamOutput(self.values_out,"values_out",
+                                   [nx,ny,nz])
+        self.variance = _StreamOutput(self.rel_error_out,
+                                      "rel_error_out",[nx,ny,nz])
+
+    # #####################################################
+    def Add(self,chunk):
+        """ Don't use this method outside MMPP. """
+        total = self.total.reshape(-1)
+        variance = self.variance.reshape(-1)
+        nx,ny,nz = self.total.shape
+        for g in np.unique(chunk.g):
+            if not self.selected[g]:
+                continue
+            sel = (chunk.g == g)
+            # Voxels are unique within a group, so no np.add.at needed
+            voxel = (chunk.ix[sel]*ny+chunk.iy[sel])*nz+chunk.iz[sel]
+            v = chunk.values[sel]
+            total[voxel] += v
+            variance[voxel] += (v*chunk.rel_error[sel])**2
+
+    # #####################################################
+    def Finish(self):
+        """ Don't use this method outside MMPP.
+
+        Returns:
+            values: [nx,ny,nz] Summed results.
+            rel_error: [nx,ny,nz] Their relative errors (in place of
+                       the accumulated variance). """
+
+        # Converted an x-plane at a time to keep memory bounded
+        for x in range(0,self.total.shape[0]):
+            self.variance[x] = _SumRelError(self.total[x],
+                                            self.variance[x])
+        for out in (self.total,self.variance):
+            if isinstance(out,np.memmap):
+                out.flush()
+        return self.total,self.variance
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class StreamProjection:
+    """ Profile along one axis: the volume integral of the results
+    over each plane normal to the axis, per energy group. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,axis):
+        """ Arguments:
+            axis: [int or str] 0-2 or "x", "y", "z". """
+        self.axis = _AxisNumber(axis)
+
+    # #####################################################
+    def Start(self,stream):
+        """ Don't use this method outside MMPP. """
+        self.ng = stream.shape[0]
+        self.n = stream.shape[self.axis+1]
+        self.total = np.zeros(self.ng*self.n)
+        self.variance = np.zeros(self.ng*self.n)
+        widths = stream.widths
+        volume = np.prod([np.sum(widths[k]) for k in range(0,3)
+                          if k != self.axis])
+        self.plane_volume = widths[self.axis]*volume
+
+    # #####################################################
+    def Add(self,chunk):
+        """ Don't use this method outside MMPP. """
+        i = (chunk.ix,chunk.iy,chunk.iz)[self.axis]
+        key = chunk.g*self.n+i
+        integral = chunk.values*chunk.volume
+        size = self.ng*self.n
+        self.total += np.bincount(key,integral,size)
+        self.variance += np.bincount(key,(integral*chunk.rel_error)**2,
+                                     size)
+
+    # #####################################################
+    def Finish(self):
+        """ Don't use this method outside MMPP.
+
+        Returns:
+            integral: [ng,n] Volume integral over each plane.
+            rel_error: [ng,n] Its relative error.
+            mean: [ng,n] Volume-averaged result over each plane. """
+
+        integral = self.total.reshape([self.ng,self.n])
+        rel_error = _SumRelError(integral,
+                                 self.variance.reshape([self.ng,self.n]))
+        return integral,rel_error,integral/self.plane_volume
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class StreamRegionSum:
+    """ Volume integral of the results over a box-shaped region of
+    interest (voxels whose centers lie inside it), per energy group.
+    Without bounds the integral over the whole mesh. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,lower=None,upper=None):
+        """ Arguments:
+            lower: [list] Lower x, y, z corner. Default: no limit.
+            upper: [list] Upper x, y, z corner. Default: no limit. """
+        self.lower = lower
+        self.upper = upper
+
+    # #####################################################
+    def Start(self,stream):
+        """ Don't use this method outside MMPP. """
+        self.ng = stream.shape[0]
+        info = stream.info
+        self.inside = []
+        for k,bins in enumerate([info.x_bins,info.y_bins,info.z_bins]):
+            edges = np.array([info.bin_lows[k]]+list(bins))
+            centers = 0.5*(edges[1:]+edges[:-1])
+            inside = np.ones(len(centers),dtype=bool)
+            if self.lower is not None:
+                inside &= (centers >= self.lower[k])
+            if self.upper is not None:
+                inside &= (centers <= self.upper[k])
+            self.inside.append(inside)
+        self.total = np.zeros(self.ng)
+        self.variance = np.zeros(self.ng)
+        self.volume = np.sum(self.inside[0]*stream.widths[0]) * \
+                      np.sum(self.inside[1]*stream.widths[1]) * \
+                      np.sum(self.inside[2]*stream.widths[2])
+
+    # #####################################################
+    def Add(self,chunk):
+        """ Don't use this method outside MMPP. """
+        sel = self.inside[0][chunk.ix] & self.inside[1][chunk.iy] & \
+              self.inside[2][chunk.iz]
+        integral = chunk.values[sel]*chunk.volume[sel]
+        self.total += np.bincount(chunk.g[sel],integral,self.ng)
+        self.variance += np.bincount(chunk.g[sel],
+                                     (integral*chunk.rel_error[sel])**2,
+                                     self.ng)
+
+    # #####################################################
+    def Finish(self):
+        """ Don't use this method outside MMPP.
+
+        Returns:
+            integral: [ng] Volume integral over the region.
+            rel_error: [ng] Its relative error.
+            volume: [float] Volume of the voxels in the region. """
+
+        return self.total,_SumRelError(self.total,self.variance), \
+               self.volume
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class StreamExtrema:
+    """ Smallest and largest result of each energy group and the bins
+    where they occur (the first occurrence in file order). """
+
+    # #####################################################
+    def Start(self,stream):
+        """ Don't use this method outside MMPP. """
+        ng = stream.shape[0]
+        self.vmin = np.full(ng,np.inf)
+        self.vmax = np.full(ng,-np.inf)
+        self.imin = np.full([ng,3],-1)
+        self.imax = np.full([ng,3],-1)
+
+    # #####################################################
+    def Add(self,chunk):
+        """ Don't use this method outside MMPP. """
+        for g in np.unique(chunk.g):
+            sel = np.flatnonzero(chunk.g == g)
+            v = chunk.values[sel]
+            k = sel[np.argmin(v)]
+            if chunk.values[k] < self.vmin[g]:
+                self.vmin[g] = chunk.values[k]
+                self.imin[g] = [chunk.ix[k],chunk.iy[k],chunk.iz[k]]
+            k = sel[np.argmax(v)]
+            if chunk.values[k] > self.vmax[g]:
+                self.vmax[g] = chunk.values[k]
+                self.imax[g] = [chunk.ix[k],chunk.iy[k],chunk.iz[k]]
+
+    # #####################################################
+    def Finish(self):
+        """ Don't use this method outside MMPP.
+
+        Returns:
+            vmin: [ng] Smallest result per group.
+            imin: [ng,3] Its x, y and z bin.
+            vmax: [ng] Largest result per group.
+            imax: [ng,3] Its x, y and z bin. """
+
+        return self.vmin,self.imin,self.vmax,self.imax
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class StreamErrorStatistics:
+    """ Error-weighted statistics of each energy group. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,threshold=0.1):
+        """ Arguments:
+            threshold: [float] Relative error up to which a scoring
+                       voxel counts as reliable (MCNP's guideline for
+                       point quantities is 0.1). """
+        self.threshold = threshold
+
+    # #####################################################
+    def Start(self,stream):
+        """ Don't use this method outside MMPP. """
+        self.ng = stream.shape[0]
+        self.sums = {name:np.zeros(self.ng) for name in
+                     ("count","scoring","reliable","rel_error",
+                      "weight","weighted","volume","integral")}
+
+    # #####################################################
+    def Add(self,chunk):
+        """ Don't use this method outside MMPP. """
+        ng = self.ng
+        g = chunk.g
+        v = chunk.values
+        u = chunk.rel_error
+        scoring = (v != 0.0)
+        sigma = np.abs(v*u)
+        weight = np.zeros(len(v))
+        np.divide(1.0,sigma**2,out=weight,where=(sigma > 0.0))
+        sums = self.sums
+        sums["count"] += np.bincount(g,None,ng)
+        sums["scoring"] += np.bincount(g,scoring,ng)
+        sums["reliable"] += np.bincount(g,scoring &
+                                        (u <= self.threshold),ng)
+        sums["rel_error"] += np.bincount(g,u*scoring,ng)
+        sums["weight"] += np.bincount(g,weight,ng)
+        sums["weighted"] += np.bincount(g,weight*v,ng)
+        sums["volume"] += np.bincount(g,chunk.volume,ng)
+        sums["integral"] += np.bincount(g,v*chunk.volume,ng)
+
+    # #####################################################
+    def Finish(self):
+        """ Don't use this method outside MMPP.
+
+        Returns:
+            stats: [dict] Per group ([ng] arrays):
+                   "count": voxels,
+                   "scoring": voxels with a non-zero result,
+                   "reliable_fraction": fraction of the scoring voxels
+                       with a relative error up to the threshold,
+                   "mean_rel_error": mean relative error of the
+                       scoring voxels,
+                   "mean": volume-averaged result,
+                   "weighted_mean": inverse-variance weighted mean of
+                       the scoring voxels,
+                   "weighted_mean_std": its standard deviation. """
+
+        sums = self.sums
+        def ratio(a,b):
+            out = np.zeros(self.ng)
+            np.divide(a,b,out=out,where=(b > 0.0))
+            return out
+
+        return {"count":sums["count"],
+                "scoring":sums["scoring"],
+                "reliable_fraction":ratio(sums["reliable"],
+                                          sums["scoring"]),
+                "mean_rel_error":ratio(sums["rel_error"],sums["scoring"]),
+                "mean":ratio(sums["integral"],sums["volume"]),
+                "weighted_mean":ratio(sums["weighted"],sums["weight"]),
+                "weighted_mean_std":ratio(np.ones(self.ng),
+                                          np.sqrt(sums["weight"]))}
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class StreamToArrays:
+    """ Copies the results and relative errors into [ng,nx,ny,nz]
+    arrays, typically memory-mapped .npy files so that a tally larger
+    than memory can be converted once and then sliced from disk. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,values_out,rel_error_out=None):
+        """ Arguments:
+            values_out, rel_error_out: [str or array] Output .npy file
+                    names, or [ng,nx,ny,nz] arrays to fill. Relative
+                    errors are skipped if rel_error_out is None. """
+        self.values_out = values_out
+        self.rel_error_out = rel_error_out
+
+    # #####################################################
+    def Start(self,stream):
+        """ Don't use this method outside MMPP. """
+        self.values = _StreamOutput(self.values_out,"values_out",
+                                    stream.shape)
+        self.rel_error = None
+        if self.rel_error_out is not None:
+            self.rel_error = _StreamOutput(self.rel_error_out,
+                                           "rel_error_out",stream.shape)
+
+    # #####################################################
+    def Add(self,chunk):
+        """ Don't use this method outside MMPP. """
+        index = (chunk.g,chunk.ix,chunk.iy,chunk.iz)
+        self.values[index] = chunk.values
+        if self.rel_error is not None:
+            self.rel_error[index] = chunk.rel_error
+
+    # #####################################################
+    def Finish(self):
+        """ Don't use this method outside MMPP.
+
+        Returns:
+            values: [ng,nx,ny,nz] The filled values array.
+            rel_error: [ng,nx,ny,nz] The filled errors array or None. """
+
+        for out in (self.values,self.rel_error):
+            if isinstance(out,np.memmap):
+                out.flush()
+        return self.values,self.rel_error
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ParseRowsTask(meshtal_filename,start,end,num_rows,cols,dtype,
+                   split):
+    """ Don't use this method outside MMPP.
+    Process-pool worker: maps the file and parses num_rows data rows
+    starting at byte offset start.
+
+    Arguments:
+        cols: [list of int] Columns (0-4) to return.
+        split: [bool] The range is a piece of a larger data section.
+               Such pieces are only valid for fixed-width rows, so
+               the generic fallback is not attempted.
+
+    Returns:
+        arrays: [list of arrays] One 1-D array of dtype per entry in
+                cols, or None if a split piece was not fixed width. """
+
+    mm = _MapMeshtalfile(meshtal_filename)
+    data = memoryview(mm)[start:end]
+    out = [None]*5
+    for c in cols:
+        out[c] = np.empty(num_rows,dtype=dtype)
+    if split:
+        ok = _ParseDataRowsFixedWidth(data,num_rows,out) > 0
+    else:
+        _ParseDataRows(data,num_rows,out)
+        ok = True
+    data.release()
+    mm.close()
+
+    if not ok:
+        return None
+    return [out[c] for c in cols]
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ParseSectionTask(meshtal_filename,start,end,block):
+    """ Don't use this method outside MMPP.
+    Process-pool worker: maps the file and parses the whole data
+    section [start,end) into a copy of the (sized, indexed) block.
+    Used for matrix-format sections and sparse blocks.
+
+    Returns:
+        arrays: [dict] The parsed arrays, see _BlockArrays. """
+
+    mm = _MapMeshtalfile(meshtal_filename)
+    data = memoryview(mm)[start:end]
+    if block.index.format == "matrix":
+        block.ParseMatrixSection(data)
+    else:
+        block.ParseDataSection(data)
+    data.release()
+    mm.close()
+
+    return _BlockArrays(block)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ParseBlocksParallel(meshtal_filename,mm,index,workers,report):
+    """ Don't use this method outside MMPP.
+    Parses the data sections of all indexed blocks in a process pool.
+    Blocks are parsed whole, except that large fixed-width sections
+    of dense blocks are cut into row ranges so that a single big
+    tally also spreads over the workers. Pieces are written back in
+    file order, so the result is identical to the serial reader.
+
+    Arguments:
+        mm: [mmap] The mapped file (used for the coordinate rows of
+            compact blocks and for any serial fallback).
+        index: [list of (MeshTalBlockIndex,MeshTalBlock)] Sized blocks
+               with their layout and dtype set.
+        report: [list of callable] Per block None, or the progress
+                callback of _LoadMappedData. """
+
+    total_rows = sum(entry.num_rows for entry,block in index)
+    piece_rows = max(_PARALLEL_MIN_ROWS,
+                     -(-total_rows // (workers*_PARALLEL_PIECES)))
+
+    ############################## Cut the work into tasks
+    tasks = []
+    section_tasks = []
+    for b,(entry,block) in enumerate(index):
+        if (entry.data_offset < 0) or (entry.num_rows == 0):
+            block.SizeDataValues()
+            continue
+        if (entry.format == "matrix") or (block.layout == "sparse"):
+            section_tasks.append((b,(meshtal_filename,entry.data_offset,
+                                     entry.section_end,block)))
+            continue
+        if block.layout == "compact":
+            cols,dtype = [3,4],block.dtype
+        else:
+            cols,dtype = [0,1,2,3,4],np.float64
+        if (entry.row_len > 0) and (entry.num_rows > piece_rows):
+            for r0 in range(0,entry.num_rows,piece_rows):
+                r1 = min(r0+piece_rows,entry.num_rows)
+                start = entry.data_offset+r0*entry.row_len
+                end = entry.data_offset+r1*entry.row_len
+                tasks.append((b,r0,r1,(meshtal_filename,start,end,r1-r0,
+                                       cols,dtype,True)))
+        else:
+            tasks.append((b,0,entry.num_rows,
+                          (meshtal_filename,entry.data_offset,
+                           entry.section_end,entry.num_rows,cols,dtype,
+                           False)))
+
+    ############################## Run them
+    failed = set()
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_ParseRowsTask,*args)
+                   for b,r0,r1,args in tasks]
+        section_futures = [pool.submit(_ParseSectionTask,*args)
+                           for b,args in section_tasks]
+
+        # Allocate the storage while the workers are busy
+        targets = {}
+        for b in set(task[0] for task in tasks):
+            entry,block = index[b]
+            block.SizeDataValues()
+            if block.layout == "compact":
+                targets[b] = [None,None,None,block._values.reshape(-1),
+                              block._rel_error.reshape(-1)]
+            else:
+                rows = block._data_values.reshape([-1,5])
+                targets[b] = [rows[:,c] for c in range(0,5)]
+
+        for (b,r0,r1,args),future in zip(tasks,futures):
+            arrays = future.result()
+            if arrays is None:
+                failed.add(b)
+                continue
+            for c,array in zip(args[4],arrays):
+                targets[b][c][r0:r1] = array
+            if (report[b] is not None) and (b not in failed):
+                report[b](args[2]-index[b][0].data_offset)
+
+        for (b,args),future in zip(section_tasks,section_futures):
+            _SetBlockArrays(index[b][1],future.result())
+            if report[b] is not None:
+                report[b](args[2]-args[1])
+
+    ############################## Finish the blocks
+    for b in set(task[0] for task in tasks):
+        entry,block = index[b]
+        if b in failed:
+            _LoadMappedData(mm,entry,block,report[b])
+        elif block.layout == "compact":
+            data = memoryview(mm)[entry.data_offset:entry.section_end]
+            block._x_centers,block._y_centers,block._z_centers = \
+                _ParseCenters(data,block.nx,block.ny,block.nz,
+                              entry.row_len)
+            data.release()
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ReadMeshtalfileMapped(meshtal_filename,lazy,layout,dtype,workers,
+                           progress=None):
+    """ Don't use this method outside MMPP.
+    Bulk reader behind ReadMeshtalfile. Indexes the mapped file and
+    attaches a deferred loader to every block, or parses all blocks
+    (in a process pool if workers > 1). """
+
+    mm = _MapMeshtalfile(meshtal_filename)
+    if mm is None:
+        return []
+
+    index = _IndexMappedFile(mm)
+    for entry,block in index:
+        block.layout = layout
+        block.dtype = dtype
+
+    if lazy:
+        for entry,block in index:
+            block.SetDataLoader(functools.partial(_LoadMappedData,mm,
+                                                  entry))
+        return [block for entry,block in index]
+
+    # Progress counts the bytes of the data sections parsed so far
+    report = [None]*len(index)
+    if progress is not None:
+        total = sum(entry.section_end-entry.data_offset for entry,block in
+                    index if entry.data_offset >= 0)
+        done = 0
+        for b,(entry,block) in enumerate(index):
+            report[b] = functools.partial(
+                lambda done,num_bytes: progress(done+num_bytes,total),done)
+            if entry.data_offset >= 0:
+                done += entry.section_end-entry.data_offset
+
+    if (workers is not None) and (workers > 1):
+        with _Phase("parse",sum(entry.num_rows for entry,block in index)):
+            _ParseBlocksParallel(meshtal_filename,mm,index,workers,report)
+    else:
+        for b,(entry,block) in enumerate(index):
+            _LoadMappedData(mm,entry,block,report[b])
+
+    return [block for entry,block in index]
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ReadMeshtalfileLines(meshtal_filename):
+    """ Don't use this method outside MMPP.
+    The original line-by-line reader. """
+
+    mfile = open(meshtal_filename,"r")
+    lines = mfile.readlines()
+    num_lines = len(lines)
+    logger.debug("Number of lines = %d",num_lines)
+  
+    ############################################ Data structures
+    blocks = []
+  
+    ############################################ Read energy groups
+    ell = -1
+    stop_flag = False
+    cur_block = []
+    while not stop_flag:
+        ell += 1
+        line = lines[ell]
+    
+        words = line.split()
+    
+        ############################## Detect new block
+        if len(words) >= 3:
+            if (words[0]=="Mesh") and \
+               (words[1]=="Tally") and \
+               (words[2]=="Number"):
+                cur_block = MeshTalBlock()
+                blocks.append(cur_block)
+    
+        ############################## Detect bins
+        _ParseBlockHeaderLine(cur_block,words)
+    
+        ############################## Extract data
+        if _IsDataHeader(words):
+            nx = cur_block.nx
+            ny = cur_block.ny
+            nz = cur_block.nz
+            ng = cur_block.ng
+            for e in range(0,ng):
+                for x in range(0,nx):
+                    for y in range(0,ny):
+                        for z in range(0,nz):
+                            ell += 1
+                            dline = lines[ell]
+                            words = dline.split()
+                            cur_block.data_values[e,x,y,z,0] = float(words[1])
+                            cur_block.data_values[e,x,y,z,1] = float(words[2])
+                            cur_block.data_values[e,x,y,z,2] = float(words[3])
+                            cur_block.data_values[e,x,y,z,3] = float(words[4])
+                            cur_block.data_values[e,x,y,z,4] = float(words[5])
+    
+    
+        if ell >= (num_lines-1):
+            stop_flag = True
+            logger.debug("Quit at file end")
+
+    mfile.close()
+
+    return blocks
+
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _CacheDir(meshtal_filename):
+    """ Sidecar directory holding the cache of a meshtal file. """
+    return meshtal_filename + ".mmpp"
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _FileHash(filename):
+    """ BLAKE2b digest of a file's content, read in 16 MB chunks. """
+
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filename,"rb") as hfile:
+        chunk = hfile.read(1 << 24)
+        while chunk:
+            digest.update(chunk)
+            chunk = hfile.read(1 << 24)
+    return digest.hexdigest()
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _SourceSignature(meshtal_filename,with_hash):
+    """ Size, modification time and (optionally) content hash of the
+    source file, as recorded in the cache header. """
+
+    stat = os.stat(meshtal_filename)
+    signature = {"size":stat.st_size,"mtime_ns":stat.st_mtime_ns}
+    if with_hash:
+        signature["hash"] = _FileHash(meshtal_filename)
+    return signature
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _BlockArrays(block):
+    """ The arrays that make up the data of a block, by name. """
+
+    if block.layout == "compact":
+        return {"x_centers":block._x_centers,
+                "y_centers":block._y_centers,
+                "z_centers":block._z_centers,
+                "values":block._values,
+                "rel_error":block._rel_error}
+    if block.layout == "sparse":
+        return {"x_centers":block._x_centers,
+                "y_centers":block._y_centers,
+                "z_centers":block._z_centers,
+                "sparse_index":block._sparse[0],
+                "values":block._sparse[1],
+                "rel_error":block._sparse[2]}
+    return {"data_values":np.asarray(block._data_values)}
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _SetBlockArrays(block,arrays):
+    """ Inverse of _BlockArrays: stores the named arrays in the block,
+    according to its layout. """
+
+    block._ClearCache()
+    if block.layout == "compact":
+        block._x_centers = arrays["x_centers"]
+        block._y_centers = arrays["y_centers"]
+        block._z_centers = arrays["z_centers"]
+        block._values = arrays["values"]
+        block._rel_error = arrays["rel_error"]
+    elif block.layout == "sparse":
+        block._x_centers = arrays["x_centers"]
+        block._y_centers = arrays["y_centers"]
+        block._z_centers = arrays["z_centers"]
+        block._sparse = (arrays["sparse_index"],arrays["values"],
+                         arrays["rel_error"])
+    else:
+        block.data_values = arrays["data_values"]
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _WriteMeshtalCache(meshtal_filename,blocks,signature):
+    """ Writes the parsed blocks to the sidecar cache: one raw .npy file
+    per array plus a JSON header, written last so that a cache is
+    only ever picked up once it is complete. """
+
+    cache_dir = _CacheDir(meshtal_filename)
+    header_name = os.path.join(cache_dir,"header.json")
+    os.makedirs(cache_dir,exist_ok=True)
+    if os.path.exists(header_name):
+        os.remove(header_name)
+    for name in os.listdir(cache_dir):
+        if name.endswith(".npy"):
+            os.remove(os.path.join(cache_dir,name))
+
+    header = {"version":_CACHE_VERSION,"source":signature,"blocks":[]}
+    for b,block in enumerate(blocks):
+        block.LoadDataValues()
+        entry = {"tally_number":block.tally_number,
+                 "particle":block.particle,
+                 "histories":block.histories,
+                 "x_bins":list(block.x_bins),
+                 "y_bins":list(block.y_bins),
+                 "z_bins":list(block.z_bins),
+                 "e_bins":list(block.e_bins),
+                 "bin_lims":list(block.bin_lims),
+                 "bin_lows":list(block.bin_lows),
+                 "layout":block.layout,
+                 "dtype":np.dtype(block.dtype).name,
+                 "index":None if block.index is None else \
+                         vars(block.index),
+                 "arrays":{}}
+        for name,array in _BlockArrays(block).items():
+            array_file = "block%d_%s.npy" % (b,name)
+            np.save(os.path.join(cache_dir,array_file),array)
+            entry["arrays"][name] = array_file
+        header["blocks"].append(entry)
+
+    temp_name = header_name + ".tmp"
+    with open(temp_name,"w") as hfile:
+        json.dump(header,hfile)
+    os.replace(temp_name,header_name)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _LoadMeshtalCache(meshtal_filename,layout,dtype,with_hash,use_mmap,
+                      lazy=False):
+    """ Loads the blocks from the sidecar cache. With lazy, each
+    block only loads its arrays on first access.
+
+    Returns:
+        blocks: [list of MeshTalBlock] or None if there is no cache,
+                it is stale (source size, mtime or, with with_hash,
+                content changed) or it was written for a different
+                layout/dtype. """
+
+    header_name = os.path.join(_CacheDir(meshtal_filename),"header.json")
+    try:
+        with open(header_name,"r") as hfile:
+            header = json.load(hfile)
+    except (OSError,ValueError):
+        return None
+
+    if header.get("version") != _CACHE_VERSION:
+        return None
+    cached = header["source"]
+    current = _SourceSignature(meshtal_filename,False)
+    if (cached["size"] != current["size"]) or \
+       (cached["mtime_ns"] != current["mtime_ns"]):
+        return None
+    if with_hash and \
+       (cached.get("hash") != _FileHash(meshtal_filename)):
+        return None
+    for entry in header["blocks"]:
+        if (entry["layout"] != layout) or \
+           (entry["dtype"] != np.dtype(dtype).name):
+            return None
+
+    cache_dir = _CacheDir(meshtal_filename)
+    mmap_mode = "r" if use_mmap else None
+    blocks = []
+    for entry in header["blocks"]:
+        block = MeshTalBlock()
+        block.tally_number = entry["tally_number"]
+        block.particle = entry.get("particle","")
+        block.histories = entry.get("histories",0.0)
+        block.x_bins = entry["x_bins"]
+        block.y_bins = entry["y_bins"]
+        block.z_bins = entry["z_bins"]
+        block.e_bins = entry["e_bins"]
+        block.bin_lims = entry["bin_lims"]
+        block.bin_lows = entry["bin_lows"]
+        block.SizeDataValues(allocate=False)
+        if entry["index"] is not None:
+            block.index = MeshTalBlockIndex()
+            block.index.__dict__.update(entry["index"])
+
+        if layout != "full":
+            block.layout = layout
+        block.dtype = dtype
+        loader = functools.partial(_LoadCachedArrays,cache_dir,
+                                   entry["arrays"],mmap_mode)
+        if lazy:
+            block.SetDataLoader(loader)
+        else:
+            loader(block)
+        blocks.append(block)
+
+    return blocks
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _LoadCachedArrays(cache_dir,array_files,mmap_mode,block):
+    """ Don't use this method outside MMPP.
+    Loads the arrays of one block from the sidecar cache. Used as the
+    deferred loader of lazy blocks read from the cache. """
+
+    arrays = {}
+    for name,array_file in array_files.items():
+        arrays[name] = np.load(os.path.join(cache_dir,array_file),
+                               mmap_mode=mmap_mode)
+    _SetBlockArrays(block,arrays)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def ClearMeshtalCache(meshtal_filename):
+    """ Deletes the sidecar cache of a meshtal file, if any. """
+
+    cache_dir = _CacheDir(meshtal_filename)
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def ReadMeshtalfile(meshtal_filename,bulk=True,lazy=False,
+                    layout="full",dtype=np.float64,
+                    cache=False,cache_hash=False,cache_mmap=True,
+                    workers=None,progress=None):
+    """ Reads a meshtal file into a list of data blocks, one per
+    mesh tally.
+
+    Arguments:
+        meshtal_filename: [str] Path to the meshtal file.
+        bulk: [bool] Memory-map the file and parse each data section
+              in one vectorized pass (default). Reads both the column
+              format and the matrix format (FMESH OUT=ij/ik/jk).
+              False uses the original line-by-line loop, which only
+              knows the column format.
+        lazy: [bool] Only with bulk. Return the blocks straight after
+              the header pre-scan; each block parses its data_values
+              from the mapped file on first access. With cache, a
+              read served from the cache defers loading each block's
+              arrays the same way, but a read that has to write the
+              cache parses every block up front.
+        layout: [str] "full" stores the [ng,nx,ny,nz,5] data_values
+                tensor. "compact" stores 1-D x/y/z_centers plus
+                contiguous values and rel_error arrays (see
+                MeshTalBlock.ToCompact). "sparse" stores only the
+                voxels with a nonzero result or error (see
+                MeshTalBlock.ToSparse); the bulk parser fills it
+                piece by piece without building the dense arrays.
+        dtype: [numpy dtype] np.float64 or np.float32. Storage type of
+               values and rel_error in the compact and sparse
+               layouts.
+        cache: [bool] Keep a binary copy of the parsed blocks in the
+               sidecar directory "<meshtal_filename>.mmpp" and load
+               from it instead of re-parsing while the source file's
+               size and mtime are unchanged.
+        cache_hash: [bool] Also check the source's content hash before
+                    using the cache (costs one read of the file).
+        cache_mmap: [bool] Memory-map the cached arrays (read-only)
+                    instead of loading them into memory.
+        workers: [int] Only with bulk. Parse the tally blocks (and
+                 row ranges of large blocks) in a pool of this many
+                 processes. The result is identical to the serial
+                 read. Ignored when lazy.
+        progress: [callable] Optional. Called as progress(done,total)
+                  with the bytes of data parsed so far and in all,
+                  e.g. to drive a progress bar. Bulk reads call it
+                  after every chunk of rows (or matrix-format tally,
+                  or parallel piece), the line reader once at the end.
+                  Not called for lazy reads.
+
+    Timings of the read's phases are added to MMPP.stats.
+
+    Returns:
+        blocks: [list of MeshTalBlock] """
+
+    if layout not in ("full","compact","sparse"):
+        raise ValueError('layout must be "full", "compact" or "sparse", '
+                         'not ' + repr(layout))
+
+    logger.info('Reading file "%s"',meshtal_filename)
+    if cache:
+        with _Phase("cache_read") as phase:
+            blocks = _LoadMeshtalCache(meshtal_filename,layout,dtype,
+                                       cache_hash,cache_mmap,lazy and bulk)
+            if blocks is not None:
+                phase.rows = sum(b.ng*b.nx*b.ny*b.nz for b in blocks)
+        if blocks is not None:
+            logger.info("Loaded from cache")
+            return blocks
+        signature = _SourceSignature(meshtal_filename,cache_hash)
+
+    if bulk:
+        blocks = _ReadMeshtalfileMapped(meshtal_filename,
+                                        lazy and not cache,layout,dtype,
+                                        workers,progress)
+    else:
+        with _Phase("parse") as phase:
+            blocks = _ReadMeshtalfileLines(meshtal_filename)
+            phase.rows = sum(b.ng*b.nx*b.ny*b.nz for b in blocks)
+        for block in blocks:
+            if layout == "compact":
+                block.ToCompact(dtype)
+            elif layout == "sparse":
+                block.ToSparse(dtype)
+        if progress is not None:
+            size = os.path.getsize(meshtal_filename)
+            progress(size,size)
+
+    if cache:
+        with _Phase("cache_write") as phase:
+            _WriteMeshtalCache(meshtal_filename,blocks,signature)
+            phase.rows = sum(b.ng*b.nx*b.ny*b.nz for b in blocks)
+
+    return blocks
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ConvergenceRecord(block,threshold=0.1):
+    """ Don't use this method outside MMPP.
+    Error statistics of the Total group of a parsed block, for the
+    convergence history of MeshTalWatcher. """
+
+    index,values,errors = block.NonzeroVoxels()
+    nvox = block.nx*block.ny*block.nz
+    lo = np.searchsorted(index,(block.ng-1)*nvox)
+    voxel = index[lo:]-(block.ng-1)*nvox
+    v = values[lo:].astype(np.float64)
+    u = errors[lo:].astype(np.float64)
+    scoring = v != 0.0
+    widths = [np.diff(e) for e in _BlockEdges(block)[0:3]]
+    ix,iy,iz = np.unravel_index(voxel,(block.nx,block.ny,block.nz))
+    weighted = v*widths[0][ix]*widths[1][iy]*widths[2][iz]
+    integral = weighted.sum()
+    num_scoring = int(np.count_nonzero(scoring))
+    return {"histories":block.histories,
+            "time":time.time(),
+            "scoring":num_scoring,
+            "mean_rel_error":float(u[scoring].mean()) if num_scoring
+                             else 0.0,
+            "max_rel_error":float(u[scoring].max()) if num_scoring
+                            else 0.0,
+            "reliable_fraction":float(np.count_nonzero(
+                scoring & (u <= threshold)))/num_scoring if num_scoring
+                                else 0.0,
+            "integral":float(integral),
+            "integral_rel_error":float(_SumRelError(
+                integral,np.sum((weighted*u)**2)))}
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class MeshTalWatcher:
+    """ Follows a meshtal file that MCNP rewrites at every dump during
+    a run. A Poll only looks into the file when its size or
+    modification time changed. It then re-indexes it, which reads the
+    header lines of each tally but not the data rows, and re-parses only
+    the tallies whose section changed, keeping the blocks of the others.
+    MCNP rewrites the histories count in the file header at every dump,
+    so a section counts as unchanged, without being read, when the file
+    header, its offset and its length are all the same. Files without
+    a histories line, or any file with verify, also have each such
+    section checksummed (CRC32). A convergence history of the Total
+    group of every tally is recorded at each change.
+
+        watcher = MMPP.MeshTalWatcher("run.msht")
+        changed = watcher.Poll()          # tally numbers re-parsed
+        watcher.history[14][-1]["mean_rel_error"]
+
+    From asyncio code, await watcher.PollAsync() or iterate over
+    watcher.Watch(interval). """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,meshtal_filename,layout="full",dtype=np.float64,
+                 workers=None,settle=2.0,threshold=0.1,verify=False):
+        """ Arguments:
+            meshtal_filename: [str] Path to the meshtal file.
+            layout,dtype,workers: See ReadMeshtalfile.
+            settle: [float] Seconds the file must be left unmodified
+                    before it is read, so that a dump still being
+                    written is not picked up.
+            threshold: [float] Relative error up to which a scoring
+                       voxel counts as reliable in the history.
+            verify: [bool] Checksum every section at each change of the
+                    file, for files whose results can change without
+                    their header (not written by MCNP). Costs a read of
+                    the whole file per change. """
+
+        self.meshtal_filename = meshtal_filename
+        self.layout = layout
+        self.dtype = dtype
+        self.workers = workers
+        self.settle = settle
+        self.threshold = threshold
+        self.verify = verify
+        self.history = {}         # Tally number: list of records
+        self._blocks = {}         # Tally number: MeshTalBlock
+        self._checksums = {}      # Tally number: fingerprint of section
+        self._order = []          # Tally numbers in file order
+        self._signature = None
+
+    # #####################################################
+    @property
+    def blocks(self):
+        """ [list of MeshTalBlock] The current blocks, in file order. """
+        return [self._blocks[t] for t in self._order]
+
+    # #####################################################
+    def Block(self,tally_number):
+        """ The current block of a tally. """
+        return self._blocks[tally_number]
+
+    # #####################################################
+    def Poll(self):
+        """ Re-reads the changed tallies if the file was modified since
+        the last poll (and has settled).
+
+        Returns:
+            changed: [list of int] Tally numbers re-parsed, in file
+                     order. Empty if nothing changed. """
+
+        try:
+            stat = os.stat(self.meshtal_filename)
+        except OSError:
+            return []
+        signature = (stat.st_size,stat.st_mtime_ns)
+        if (signature == self._signature) or \
+           (time.time()-stat.st_mtime < self.settle):
+            return []
+        mm = _MapMeshtalfile(self.meshtal_filename)
+        if mm is None:
+            return []
+        try:
+            changed = self.__Update(mm)
+        except (ValueError,IndexError) as error:
+            # Most likely a dump caught half-written; keep the previous
+            # state and try again at the next poll
+            logger.warning("Could not read %s, keeping the previous "
+                           "state: %s",self.meshtal_filename,error)
+            return []
+        finally:
+            mm.close()
+        stat = os.stat(self.meshtal_filename)
+        if (stat.st_size,stat.st_mtime_ns) != signature:
+            logger.warning("%s changed while it was read",
+                           self.meshtal_filename)
+            return []
+        self._signature = signature
+        return changed
+
+    # #####################################################
+    def __Update(self,mm):
+        """ Don't use this method outside MMPP.
+        Indexes the mapped file, fingerprints the tally sections and
+        parses the changed tallies. The watcher's state is only
+        replaced once every tally has been read. """
+
+        index = _IndexMappedFile(mm)
+        checksums = {}
+        changed = []
+        file_header = zlib.crc32(mm[0:index[0][0].header_offset]) \
+                      if index else 0
+        num_bytes = 0
+        with _Phase("checksum",0) as phase:
+            for entry,block in index:
+                if entry.data_offset < 0:
+                    raise ValueError("mesh tally %d is incomplete" %
+                                     entry.tally_number)
+                digest = (file_header,entry.header_offset,
+                          entry.section_end-entry.header_offset)
+                if self.verify or (block.histories <= 0.0):
+                    # CRC32 runs several times faster than a parse; with
+                    # the section length it is plenty to spot a
+                    # rewritten tally
+                    digest += (zlib.crc32(memoryview(mm)[
+                        entry.header_offset:entry.section_end]),)
+                    _ReleaseMappedPages(mm,entry.header_offset,
+                                        entry.section_end)
+                    num_bytes += digest[2]
+                checksums[entry.tally_number] = digest
+                if self._checksums.get(entry.tally_number) != digest:
+                    block.layout = self.layout
+                    block.dtype = self.dtype
+                    changed.append((entry,block))
+            phase.bytes = num_bytes
+
+        if changed:
+            logger.info("%d of %d mesh tallies changed",len(changed),
+                        len(index))
+            if (self.workers is not None) and (self.workers > 1):
+                with _Phase("parse",sum(e.num_rows for e,b in changed)):
+                    _ParseBlocksParallel(self.meshtal_filename,mm,changed,
+                                         self.workers,[None]*len(changed))
+            else:
+                for entry,block in changed:
+                    _LoadMappedData(mm,entry,block)
+
+        blocks = {}
+        for entry,block in index:
+            old = self._blocks.get(entry.tally_number)
+            if (old is not None) and \
+               (checksums[entry.tally_number] ==
+                self._checksums.get(entry.tally_number)):
+                old.index = entry
+                old.histories = block.histories
+                blocks[entry.tally_number] = old
+            else:
+                blocks[entry.tally_number] = block
+        for entry,block in changed:
+            self.history.setdefault(entry.tally_number,[]).append(
+                _ConvergenceRecord(block,self.threshold))
+        self._blocks = blocks
+        self._checksums = checksums
+        self._order = [entry.tally_number for entry,block in index]
+        return [entry.tally_number for entry,block in changed]
+
+    # #####################################################
+    async def PollAsync(self):
+        """ Poll in a thread of the running event loop's executor, so
+        that parsing does not block the loop. """
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None,self.Poll)
+
+    # #####################################################
+    async def Watch(self,interval=10.0):
+        """ Asynchronous generator polling every interval seconds and
+        yielding the list of changed tally numbers whenever there is
+        one:
+
+            async for changed in watcher.Watch(30.0):
+                ... """
+
+        while True:
+            changed = await self.PollAsync()
+            if changed:
+                yield changed
+            await asyncio.sleep(interval)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _FormatFixedWidth(fmt,values):
+    """ Formats every value with fmt in one go.
+
+    Returns:
+        chars: [uint8 array] [len(values),width], or None if fmt did not
+               give every value the same width. """
+
+    values = np.asarray(values).ravel()
+    if len(values) == 0:
+        return np.zeros([0,len(fmt % 0.0)],dtype=np.uint8)
+    text = (fmt*len(values) % tuple(values.tolist())).encode("ascii")
+    width = len(fmt % values[0])
+    if len(text) != width*len(values):
+        return None
+    return np.frombuffer(text,dtype=np.uint8).reshape([len(values),width])
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _FormatCenters(centers,width=10):
+    """ Formats voxel centers as fixed-width fields with three decimals,
+    widening the fields if some center does not fit. """
+
+    chars = _FormatFixedWidth(" %" + str(width) + ".3f",centers)
+    if chars is None:
+        chars = _FormatFixedWidth(" %24.3f",centers)
+    return chars
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _EncodeScientific(values):
+    """ Encodes values as 13-character "  d.dddddE+xx" fields (the
+    " %12.5E" layout) with vectorized digit arithmetic. Much faster
+    than string formatting, but the last digit is not guaranteed to be
+    correctly rounded, so it is only used for synthetic data (whose
+    value is by definition what gets written). Exponents are clamped
+    to two digits.
+
+    Returns:
+        chars: [uint8 array] [len(values),13] """
+
+    values = np.asarray(values,dtype=np.float64).ravel()
+    n = len(values)
+    a = np.abs(values)
+    nonzero = a > 0.0
+    exponent = np.zeros(n,dtype=np.int64)
+    exponent[nonzero] = np.floor(np.log10(a[nonzero]))
+    mantissa = np.rint(a/10.0**exponent*1.0e5).astype(np.int64)
+    low = nonzero & (mantissa < 100000)
+    exponent[low] -= 1
+    mantissa[low] = np.rint(a[low]/10.0**exponent[low]*1.0e5)
+    high = mantissa >= 1000000
+    exponent[high] += 1
+    mantissa[high] = np.rint(a[high]/10.0**exponent[high]*1.0e5)
+    under = exponent < -99
+    mantissa[under] = 0
+    exponent[under] = 0
+    over = exponent > 99
+    mantissa[over] = 999999
+    exponent[over] = 99
+
+    chars = np.empty([n,13],dtype=np.uint8)
+    chars[:,0] = ord(" ")
+    chars[:,1] = np.where(values < 0.0,ord("-"),ord(" "))
+    digits = [2,4,5,6,7,8]
+    for k,col in enumerate(digits):
+        chars[:,col] = 48 + (mantissa // 10**(5-k)) % 10
+    chars[:,3] = ord(".")
+    chars[:,9] = ord("E")
+    chars[:,10] = np.where(exponent < 0,ord("-"),ord("+"))
+    exponent = np.abs(exponent)
+    chars[:,11] = 48 + exponent // 10
+    chars[:,12] = 48 + exponent % 10
+
+    return chars
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _BlockFields(block):
+    """ Don't use this method outside MMPP.
+    Field source of a block for the _Write*Rows functions: returns
+    fields(index), which formats the Result and Rel Error of the
+    voxels with the given flat [ng,nx,ny,nz] indices as two
+    [len(index),13] character arrays. MCNP's E format has two exponent
+    digits, so magnitudes below 1e-99 are written as 0 and above
+    1e100 are clamped. """
+
+    shape = (block.ng,block.nx,block.ny,block.nz)
+    def fields(index):
+        sel = np.unravel_index(index,shape)
+        out = []
+        for c in (3,4):
+            a = np.asarray(block._Select(c,sel),dtype=np.float64)
+            a = np.where(np.abs(a) < 1.0e-99,0.0,
+                         np.clip(a,-9.99994e99,9.99994e99))
+            chars = _FormatFixedWidth(" %12.5E",a)
+            if chars is None:
+                raise ValueError("Mesh tally %d: values cannot be written "
+                                 "in fixed width" % block.tally_number)
+            out.append(chars)
+        return out
+    return fields
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _WriteMeshtalHeader(mfile,title,histories):
+    """ Don't use this method outside MMPP.
+    Writes the file header of a meshtal file. """
+
+    mfile.write(b" MMPP meshtal file\n")
+    mfile.write((" " + title + "\n").encode("ascii","replace"))
+    mfile.write((" Number of histories used for normalizing tallies = "
+                 "%16.2f\n\n" % histories).encode("ascii"))
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _WriteBlockHeader(mfile,block):
+    """ Don't use this method outside MMPP.
+    Writes the tally number, particle and bin boundary lines of a
+    block. """
+
+    lines = [" Mesh Tally Number %9d" % block.tally_number]
+    if block.particle:
+        lines.append(" This is a %s mesh tally." % block.particle)
+    lines += ["",
+              " Tally bin boundaries:"]
+    names = ["X direction:","Y direction:","Z direction:",
+             "Energy bin boundaries:"]
+    bins = [block.x_bins,block.y_bins,block.z_bins,block.e_bins]
+    for k in range(0,4):
+        bounds = [block.bin_lows[k]]+list(bins[k])
+        lines.append("    " + names[k] + " " +
+                     " ".join(repr(float(b)) for b in bounds))
+    mfile.write(("\n".join(lines) + "\n\n").encode("ascii"))
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _WriteColumnRows(mfile,block,fields):
+    """ Don't use this method outside MMPP.
+    Writes the data of a block in MCNP's column format. Rows are
+    assembled as fixed-width character arrays, _BULK_CHUNK_ROWS at a
+    time.
+
+    Arguments:
+        fields: [callable] Field source, see _BlockFields. """
+
+    mfile.write(b"   Energy         X         Y         Z     Result"
+                b"     Rel Error\n")
+
+    # Energy and coordinate fields are formatted once per bin
+    energies = np.concatenate([
+        _FormatFixedWidth(" %10.3E",block.e_bins[0:block.ng-1]),
+        np.frombuffer(b"   Total   ",dtype=np.uint8).reshape([1,11])])
+    coords = [_FormatCenters(centers) for centers in
+              (block.x_centers,block.y_centers,block.z_centers)]
+    shape = (block.ng,block.nx,block.ny,block.nz)
+    newline = np.frombuffer(b"\n",dtype=np.uint8)
+    num_rows = block.ng*block.nx*block.ny*block.nz
+    for r0 in range(0,num_rows,_BULK_CHUNK_ROWS):
+        r1 = min(r0+_BULK_CHUNK_ROWS,num_rows)
+        index = np.arange(r0,r1)
+        g,ix,iy,iz = np.unravel_index(index,shape)
+        v,u = fields(index)
+        rows = np.concatenate([energies[g],coords[0][ix],coords[1][iy],
+                               coords[2][iz],v,u,
+                               np.broadcast_to(newline,(r1-r0,1))],axis=1)
+        mfile.write(rows.tobytes())
+    mfile.write(b"\n\n")
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _WriteMatrixRows(mfile,block,fields,out):
+    """ Don't use this method outside MMPP.
+    Writes the data of a block in MCNP's matrix format: per energy
+    group and bin of the third axis a "Tally Results" and a "Relative
+    Errors" table.
+
+    Arguments:
+        fields: [callable] Field source, see _BlockFields.
+        out: [str] "ij", "ik" or "jk": the across and down axes. """
+
+    across,down = {"ij":(0,1),"ik":(0,2),"jk":(1,2)}[out]
+    other = 3-across-down
+    names = "XYZ"
+    dims = [block.nx,block.ny,block.nz]
+    shape = (block.ng,block.nx,block.ny,block.nz)
+    centers = [block.x_centers,block.y_centers,block.z_centers]
+    edges = [[block.bin_lows[k]]+list(bins) for k,bins in
+             enumerate([block.x_bins,block.y_bins,block.z_bins])]
+    e_edges = [block.bin_lows[3]]+list(block.e_bins)
+
+    down_chars = _FormatCenters(centers[down])
+    header = (" "*down_chars.shape[1] + "".join("%13.3f" % c for c in
+              centers[across]) + "\n").encode("ascii")
+    newline = np.frombuffer(b"\n",dtype=np.uint8)
+    index = [None,None,None]
+    index[down] = np.arange(0,dims[down]).reshape([-1,1])
+    index[across] = np.arange(0,dims[across]).reshape([1,-1])
+    titles = [("  Tally Results:  %s (across) by %s (down)\n" %
+               (names[across],names[down])).encode("ascii"),
+              b"  Relative Errors\n"]
+
+    for g in range(0,block.ng):
+        if g < block.ng-1:
+            mfile.write((" Energy Bin: %.2E - %.2E MeV\n\n" %
+                         (e_edges[g],e_edges[g+1])).encode("ascii"))
+        else:
+            mfile.write(b" Total Energy Bin\n\n")
+        for c in range(0,dims[other]):
+            mfile.write((" %s bin: %9.2f  -  %9.2f\n" %
+                         (names[other],edges[other][c],
+                          edges[other][c+1])).encode("ascii"))
+            index[other] = c
+            ix,iy,iz = np.broadcast_arrays(*index)
+            flat = np.ravel_multi_index((g,ix,iy,iz),shape).ravel()
+            for title,chars in zip(titles,fields(flat)):
+                rows = np.concatenate([
+                    down_chars,chars.reshape([dims[down],-1]),
+                    np.broadcast_to(newline,(dims[down],1))],axis=1)
+                mfile.write(title)
+                mfile.write(header)
+                mfile.write(rows.tobytes())
+            mfile.write(b"\n")
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _WriteBlock(mfile,block,fields,out):
+    """ Don't use this method outside MMPP.
+    Writes one block, in the column format or the matrix format
+    given by out. """
+
+    if out not in ("column","ij","ik","jk"):
+        raise ValueError('out must be "column", "ij", "ik" or "jk", '
+                         'not ' + repr(out))
+    _WriteBlockHeader(mfile,block)
+    if out == "column":
+        _WriteColumnRows(mfile,block,fields)
+    else:
+        _WriteMatrixRows(mfile,block,fields,out)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def WriteMeshtalfile(meshtal_filename,blocks,histories=None,
+                     title="MMPP",out="column"):
+    """ Writes data blocks to a meshtal file which ReadMeshtalfile (and
+    other meshtal tools) can read back.
+
+    Arguments:
+        meshtal_filename: [str] Path of the file to write.
+        blocks: [list of MeshTalBlock] Blocks of either layout.
+        histories: [float] Number of histories written to the header.
+                   Default: that of the first block.
+        title: [str] Problem title line.
+        out: [str] "column" for MCNP's column format, or "ij", "ik",
+             "jk" for the matrix format (as FMESH OUT=...). """
+
+    if histories is None:
+        histories = blocks[0].histories if len(blocks) > 0 else 0.0
+    with open(meshtal_filename,"wb") as mfile:
+        _WriteMeshtalHeader(mfile,title,histories)
+        for block in blocks:
+            _WriteBlock(mfile,block,_BlockFields(block),out)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _HashUniform(key):
+    """ Counter-based uniform random numbers in (0,1): the SplitMix64
+    finalizer of each uint64 key. The same key always gives the same
+    number, however the keys are batched. """
+
+    with np.errstate(over="ignore"):
+        z = key + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30)))*np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27)))*np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return ((z >> np.uint64(11)).astype(np.float64)+0.5)*2.0**-53
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _SyntheticFields(block,seed,distribution,zero_fraction):
+    """ Don't use this method outside MMPP.
+    Field source (see _BlockFields) of synthetic data. Every value is
+    a pure function of (seed, tally, group, voxel), so the column and
+    matrix formats of the same tally carry identical data. The total
+    group is the sum of the other groups. """
+
+    nvox = block.nx*block.ny*block.nz
+    ng = block.ng
+    centers = [block.x_centers,block.y_centers,block.z_centers]
+    middle = [0.5*(c[0]+c[-1]) for c in centers]
+    extent = max(max(block.x_bins[-1]-block.bin_lows[0],
+                     block.y_bins[-1]-block.bin_lows[1]),
+                 block.z_bins[-1]-block.bin_lows[2])
+    length = extent/15.0
+    base = int(_HashUniform(np.array([seed*7919+block.tally_number],
+                                     dtype=np.uint64))[0]*2.0**52)
+
+    def sample(g,voxel):
+        key = (np.uint64(base) + g.astype(np.uint64)*np.uint64(nvox) +
+               voxel.astype(np.uint64))*np.uint64(4)
+        h = [_HashUniform(key+np.uint64(k)) for k in range(0,4)]
+        normal = np.sqrt(-2.0*np.log(h[0]))*np.cos(2.0*np.pi*h[1])
+        if distribution == "uniform":
+            v = h[0]
+            u = 0.01+0.3*h[2]
+        elif distribution == "lognormal":
+            v = 1.0e-4*np.exp(2.0*normal)
+            u = 0.01+0.3*h[2]
+        else:
+            ix,iy,iz = np.unravel_index(voxel,(block.nx,block.ny,block.nz))
+            r = np.sqrt((centers[0][ix]-middle[0])**2 +
+                        (centers[1][iy]-middle[1])**2 +
+                        (centers[2][iz]-middle[2])**2)
+            v = 1.0e-2*np.exp(-r/length)/(g+1)*np.abs(1.0+0.05*normal)
+            u = np.minimum(0.99,0.005*np.exp(r/(2.0*length))*
+                           (1.0+0.2*h[2]))
+        zero = h[3] < zero_fraction
+        v[zero] = 0.0
+        u[zero] = 0.0
+        return v,u
+
+    def fields(index):
+        g,voxel = np.divmod(index,nvox)
+        if ng == 1:
+            v,u = sample(g,voxel)
+            return _EncodeScientific(v),_EncodeScientific(u)
+        v = np.empty(len(index))
+        u = np.empty(len(index))
+        real = g < ng-1
+        v[real],u[real] = sample(g[real],voxel[real])
+        total = ~real
+        if np.any(total):
+            vsum = np.zeros(np.count_nonzero(total))
+            variance = np.zeros(len(vsum))
+            for group in range(0,ng-1):
+                vg,ug = sample(np.full(len(vsum),group),voxel[total])
+                vsum += vg
+                variance += (vg*ug)**2
+            v[total] = vsum
+            u[total] = _SumRelError(vsum,variance)
+        return _EncodeScientific(v),_EncodeScientific(u)
+
+    return fields
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def GenerateMeshtalfile(meshtal_filename,nx=20,ny=20,nz=20,num_groups=2,
+                        num_tallies=1,out="column",
+                        distribution="attenuation",zero_fraction=0.0,
+                        seed=0,extent=100.0,particle="neutron",
+                        histories=1.0e6):
+    """ Writes a synthetic meshtal file, for tests and benchmarks. The
+    data is generated and written in chunks, so files far larger than
+    memory can be made.
+
+    Arguments:
+        meshtal_filename: [str] Path of the file to write.
+        nx,ny,nz: [int] Number of voxels along each axis. The mesh is
+                  a cube of side extent centered on the origin.
+        num_groups: [int] Number of energy groups (decades up to
+                    20 MeV). A Total group is always added.
+        num_tallies: [int] Number of mesh tallies (4, 14, 24, ...).
+        out: [str] "column", or "ij", "ik", "jk" for the matrix format.
+        distribution: [str] "attenuation": a point source at the
+                      center attenuated over many decades, with errors
+                      growing as the result drops (like a shielding
+                      problem). "uniform": results uniform in (0,1).
+                      "lognormal": results spread over decades.
+        zero_fraction: [float] Fraction of voxels without a score.
+        seed: [int] Different seeds give different data.
+        extent: [float] Side of the mesh cube.
+        particle: [str] Particle named in the tally headers.
+        histories: [float] Number of histories in the file header. """
+
+    if distribution not in ("attenuation","uniform","lognormal"):
+        raise ValueError('distribution must be "attenuation", '
+                         '"uniform" or "lognormal", not ' +
+                         repr(distribution))
+
+    with open(meshtal_filename,"wb") as mfile:
+        _WriteMeshtalHeader(mfile,"Synthetic meshtal file, seed %d" %
+                            seed,histories)
+        for t in range(0,num_tallies):
+            block = MeshTalBlock()
+            block.tally_number = 4+10*t
+            block.particle = particle
+            block.histories = histories
+            centers = []
+            for k,n in enumerate((nx,ny,nz)):
+                edges = np.linspace(-0.5*extent,0.5*extent,n+1)
+                [block.x_bins,block.y_bins,block.z_bins][k].extend(
+                    edges[1:].tolist())
+                block.bin_lows[k] = float(edges[0])
+                block.bin_lims[k] = float(edges[1])
+                centers.append(0.5*(edges[:-1]+edges[1:]))
+            block.e_bins = (20.0*10.0**np.arange(1-num_groups,1.0)).tolist()
+            block.bin_lims[3] = block.e_bins[0]
+            block.SizeDataValues(allocate=False)
+            block.layout = "compact"
+            block._x_centers,block._y_centers,block._z_centers = centers
+            fields = _SyntheticFields(block,seed,distribution,
+                                      zero_fraction)
+            _WriteBlock(mfile,block,fields,out)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _GroupArray(block,g,c):
+    """ Don't use this method outside MMPP.
+    Results (c=3) or relative errors (c=4) of group g as an [nx,ny,nz]
+    array, a view of the stored data where the layout allows. A sparse
+    block is densified one group at a time. """
+
+    if block.layout != "sparse":
+        return block._Column(c)[g]
+    block.LoadDataValues()
+    index,values,errors = block._sparse
+    nvox = block.nx*block.ny*block.nz
+    lo,hi = np.searchsorted(index,[g*nvox,(g+1)*nvox])
+    dense = np.zeros(nvox,dtype=block.dtype)
+    dense[index[lo:hi]-g*nvox] = (values if c == 3 else errors)[lo:hi]
+    return dense.reshape([block.nx,block.ny,block.nz])
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _CellArrays(block,groups,dtype):
+    """ Don't use this method outside MMPP.
+    The cell arrays exported for a block: (name,g,c,num_bytes) of the
+    results and relative errors of every group in groups. """
+
+    if groups is None:
+        groups = range(0,block.ng)
+    nbytes = block.nx*block.ny*block.nz*np.dtype(dtype).itemsize
+    arrays = []
+    for g in groups:
+        g = int(g) % block.ng
+        label = "total" if g == block.ng-1 else "g%d" % g
+        arrays.append(("values_" + label,g,3,nbytes))
+        arrays.append(("rel_error_" + label,g,4,nbytes))
+    return arrays
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _WriteCellArray(out,array,dtype):
+    """ Don't use this method outside MMPP.
+    Writes an [nx,ny,nz] array as raw little-endian binary in the
+    x-fastest order of VTK and XDMF cell data, transposing a slab of
+    z planes at a time. """
+
+    nx,ny,nz = array.shape
+    step = max(1,4*_STREAM_CHUNK_ROWS // max(1,nx*ny))
+    for z0 in range(0,nz,step):
+        chunk = np.ascontiguousarray(array[:,:,z0:z0+step].transpose(2,1,0),
+                                     dtype=np.dtype(dtype).newbyteorder("<"))
+        out.write(chunk.data)
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _BlockEdges(block):
+    """ Don't use this method outside MMPP.
+    Bin boundaries of a block along x, y and z, and over energy. """
+
+    return [np.array([block.bin_lows[k]]+list(bins),dtype=np.float64)
+            for k,bins in enumerate((block.x_bins,block.y_bins,
+                                     block.z_bins,block.e_bins))]
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def WriteVTKfile(vtk_filename,block,groups=None,dtype=None):
+    """ Writes a block as a VTK XML rectilinear grid (.vtr) for
+    ParaView or VisIt: the bin boundaries as coordinates and the
+    results and relative errors of every group as cell arrays
+    (values_g0, rel_error_g0, ..., values_total, rel_error_total). The
+    energy boundaries are stored in the field array e_bounds. The
+    arrays are streamed into raw appended binary data.
+
+    Arguments:
+        vtk_filename: [str] Path of the file to write.
+        block: [MeshTalBlock] Block of any layout.
+        groups: [int list] The groups to write. Default: all, the
+                total included.
+        dtype: [numpy dtype] Type of the cell arrays. Default: the
+               block's dtype. """
+
+    dtype = np.dtype(block.dtype if dtype is None else dtype)
+    vtk_type = {4:"Float32",8:"Float64"}[dtype.itemsize]
+    edges = _BlockEdges(block)
+    arrays = _CellArrays(block,groups,dtype)
+    extent = "0 %d 0 %d 0 %d" % (block.nx,block.ny,block.nz)
+
+    # Every appended array is preceded by its UInt64 size in bytes
+    offset = 0
+    lines = ['<?xml version="1.0"?>',
+             '<VTKFile type="RectilinearGrid" version="1.0" '
+             'byte_order="LittleEndian" header_type="UInt64">',
+             '<RectilinearGrid WholeExtent="%s">' % extent,
+             '<FieldData>',
+             '<DataArray type="Float64" Name="e_bounds" '
+             'NumberOfTuples="%d" format="appended" offset="%d"/>' %
+             (len(edges[3]),offset),
+             '</FieldData>',
+             '<Piece Extent="%s">' % extent]
+    offset += 8+edges[3].nbytes
+    lines.append('<CellData Scalars="%s">' % arrays[0][0] if arrays else
+                 '<CellData>')
+    for name,g,c,nbytes in arrays:
+        lines.append('<DataArray type="%s" Name="%s" format="appended" '
+                     'offset="%d"/>' % (vtk_type,name,offset))
+        offset += 8+nbytes
+    lines += ['</CellData>','<Coordinates>']
+    for k in range(0,3):
+        lines.append('<DataArray type="Float64" Name="%s" format="appended" '
+                     'offset="%d"/>' % ("xyz"[k],offset))
+        offset += 8+edges[k].nbytes
+    lines += ['</Coordinates>','</Piece>','</RectilinearGrid>',
+              '<AppendedData encoding="raw">']
+
+    with _Phase("export",block.ng*block.nx*block.ny*block.nz,offset):
+        with open(vtk_filename,"wb") as vfile:
+            vfile.write(("\n".join(lines) + "\n_").encode("ascii"))
+            vfile.write(np.array(edges[3].nbytes,dtype="<u8").tobytes())
+            vfile.write(edges[3].astype("<f8").tobytes())
+            for name,g,c,nbytes in arrays:
+                vfile.write(np.array(nbytes,dtype="<u8").tobytes())
+                _WriteCellArray(vfile,_GroupArray(block,g,c),dtype)
+            for k in range(0,3):
+                vfile.write(np.array(edges[k].nbytes,dtype="<u8").tobytes())
+                vfile.write(edges[k].astype("<f8").tobytes())
+            vfile.write(b"\n</AppendedData>\n</VTKFile>\n")
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def WriteXDMFfile(xdmf_filename,blocks,groups=None,dtype=None):
+    """ Writes blocks as an XDMF file (one rectilinear grid per tally)
+    with the heavy data in a raw binary file next to it (the same name
+    with extension .bin). The grids hold the same cell arrays as
+    WriteVTKfile. ParaView opens the .xdmf file with its XDMF3 reader.
+
+    Arguments:
+        xdmf_filename: [str] Path of the .xdmf file to write.
+        blocks: [list of MeshTalBlock] Blocks of any layout.
+        groups: [int list] The groups to write. Default: all, the
+                total included.
+        dtype: [numpy dtype] Type of the cell arrays. Default: each
+               block's dtype. """
+
+    bin_filename = os.path.splitext(xdmf_filename)[0] + ".bin"
+    heavy = os.path.basename(bin_filename)
+
+    def item(dims,precision,seek):
+        return ('<DataItem Dimensions="%s" NumberType="Float" '
+                'Precision="%d" Format="Binary" Endian="Little" '
+                'Seek="%d">%s</DataItem>' % (dims,precision,seek,heavy))
+
+    lines = ['<?xml version="1.0" ?>',
+             '<Xdmf Version="3.0">',
+             '<Domain>',
+             '<Grid Name="meshtal" GridType="Collection" '
+             'CollectionType="Spatial">']
+    seek = 0
+    with open(bin_filename,"wb") as bfile:
+        for block in blocks:
+            block_dtype = np.dtype(block.dtype if dtype is None else dtype)
+            edges = _BlockEdges(block)
+            arrays = _CellArrays(block,groups,block_dtype)
+            lines += ['<Grid Name="tally_%d" GridType="Uniform">' %
+                      block.tally_number,
+                      '<Topology TopologyType="3DRectMesh" '
+                      'Dimensions="%d %d %d"/>' %
+                      (block.nz+1,block.ny+1,block.nx+1),
+                      '<Geometry GeometryType="VXVYVZ">']
+            with _Phase("export",block.ng*block.nx*block.ny*block.nz,
+                        sum(a[3] for a in arrays)):
+                for k in range(0,3):
+                    lines.append(item(len(edges[k]),8,seek))
+                    bfile.write(edges[k].astype("<f8").tobytes())
+                    seek += edges[k].nbytes
+                lines.append('</Geometry>')
+                for name,g,c,nbytes in arrays:
+                    lines += ['<Attribute Name="%s" AttributeType="Scalar" '
+                              'Center="Cell">' % name,
+                              item("%d %d %d" % (block.nz,block.ny,block.nx),
+                                   block_dtype.itemsize,seek),
+                              '</Attribute>']
+                    _WriteCellArray(bfile,_GroupArray(block,g,c),
+                                    block_dtype)
+                    seek += nbytes
+            lines += ['<Information Name="e_bounds" Value="%s"/>' %
+                      " ".join("%.6e" % e for e in edges[3]),
+                      '</Grid>']
+    lines += ['</Grid>','</Domain>','</Xdmf>']
+    with open(xdmf_filename,"w") as xfile:
+        xfile.write("\n".join(lines) + "\n")
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ReadTallyTask(info):
+    """ Don't use this method outside MMPP.
+    Process-pool worker: reads the data of one scanned tally.
+
+    Returns:
+        values: [float array] [ng,nx,ny,nz] Results.
+        rel_error: [float array] [ng,nx,ny,nz] Relative errors.
+        centers: [list of float arrays] x, y and z centers. """
+
+    block = info.ToBlock("compact")
+    return block.values,block.rel_error, \
+           [block.x_centers,block.y_centers,block.z_centers]
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _ReadTalliesInOrder(infos,workers):
+    """ Don't use this method outside MMPP.
+    Yields _ReadTallyTask(info) for every info, in order. With
+    workers > 1 the reads run in a process pool, at most two per
+    worker ahead of the consumer. """
+
+    if (workers is None) or (workers <= 1):
+        for info in infos:
+            yield _ReadTallyTask(info)
+        return
+
+    remaining = iter(infos)
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        pending = [pool.submit(_ReadTallyTask,info) for info in
+                   itertools.islice(remaining,2*workers)]
+        while pending:
+            result = pending.pop(0).result()
+            info = next(remaining,None)
+            if info is not None:
+                pending.append(pool.submit(_ReadTallyTask,info))
+            yield result
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def MergeMeshtalfiles(meshtal_filenames,output_filename=None,
+                      weighting="histories",histories=None,workers=None,
+                      layout="full",dtype=np.float64):
+    """ Combines meshtal files of independent runs of the same problem
+    (same mesh tallies, different seeds) voxel by voxel.
+
+    The files are scanned first and their tally numbers and x, y, z
+    and energy bins must agree. Then each tally is read from every file
+    in turn and folded into two accumulator arrays, so memory holds one
+    mesh's worth of accumulators (plus the reads in flight) however
+    many files there are.
+
+    Arguments:
+        meshtal_filenames: [list of str] The files to merge.
+        output_filename: [str] Optional. Also write the merged tallies
+                         to this meshtal file.
+        weighting: [str] "histories": mean weighted by the number of
+                   histories of each run, the usual way of combining
+                   runs; the variances add with the squared weights.
+                   "inverse_variance": weights 1/sigma^2 per voxel
+                   (voxels without a score in a run are left out of
+                   that run's contribution, which biases sparse
+                   voxels upwards).
+        histories: [list of float] Histories of each run. Default: as
+                   read from the files' headers.
+        workers: [int] Read the files in a pool of this many processes.
+        layout: [str] Layout of the merged blocks, see ReadMeshtalfile.
+        dtype: [numpy dtype] See ReadMeshtalfile.
+
+    Returns:
+        blocks: [list of MeshTalBlock] The merged tallies. Their
+                histories are the total over all runs. """
+
+    if weighting not in ("histories","inverse_variance"):
+        raise ValueError('weighting must be "histories" or '
+                         '"inverse_variance", not ' + repr(weighting))
+    if len(meshtal_filenames) == 0:
+        raise ValueError("No files to merge")
+
+    ############################## Check that the files agree
+    catalogs = [ScanMeshtalfile(fn) for fn in meshtal_filenames]
+    reference = catalogs[0]
+    for fn,catalog in zip(meshtal_filenames,catalogs):
+        if len(catalog) != len(reference):
+            raise ValueError('"%s" has %d mesh tallies, "%s" has %d' %
+                             (fn,len(catalog),meshtal_filenames[0],
+                              len(reference)))
+        for info,ref in zip(catalog,reference):
+            for name in ("tally_number","x_bins","y_bins","z_bins",
+                         "e_bins","bin_lows"):
+                if not np.array_equal(getattr(info,name),
+                                      getattr(ref,name)):
+                    raise ValueError('"%s": %s of mesh tally %d differs '
+                                     'from "%s"' % (fn,name,
+                                     ref.tally_number,
+                                     meshtal_filenames[0]))
+
+    if histories is None:
+        histories = [catalog[0].histories if len(catalog) > 0 else 0.0
+                     for catalog in catalogs]
+    histories = np.asarray(histories,dtype=np.float64)
+    if (weighting == "histories") and np.any(histories <= 0.0):
+        bad = meshtal_filenames[int(np.argmin(histories))]
+        raise ValueError('Number of histories of "%s" unknown, pass '
+                         'histories=' % bad)
+    run_weights = histories/np.sum(histories)
+
+    ############################## Merge tally by tally
+    mfile = None
+    if output_filename is not None:
+        mfile = open(output_filename,"wb")
+        _WriteMeshtalHeader(mfile,"Merged from %d runs" %
+                            len(meshtal_filenames),np.sum(histories))
+
+    num_files = len(catalogs)
+    infos = [catalog[t] for t in range(0,len(reference))
+             for catalog in catalogs]
+    blocks = []
+    try:
+        for k,(values,rel_error,centers) in \
+            enumerate(_ReadTalliesInOrder(infos,workers)):
+            t,f = divmod(k,num_files)
+            if f == 0:
+                total = np.zeros(values.shape)
+                second = np.zeros(values.shape)
+                scratch = np.empty(values.shape)
+
+            # sigma of this run, then its contribution
+            np.multiply(values,rel_error,out=scratch)
+            if weighting == "histories":
+                scratch *= run_weights[f]
+                scratch **= 2
+                second += scratch
+                total += run_weights[f]*values
+            else:
+                scratch **= 2
+                np.divide(1.0,scratch,out=scratch,where=(scratch > 0.0))
+                total += scratch*values
+                second += scratch
+
+            if f < num_files-1:
+                continue
+
+            ############################## Finish the tally
+            if weighting == "histories":
+                values = total
+                variance = second
+            else:
+                values = np.zeros(total.shape)
+                np.divide(total,second,out=values,where=(second > 0.0))
+                variance = np.zeros(total.shape)
+                np.divide(1.0,second,out=variance,where=(second > 0.0))
+            ref = reference[t]
+            block = MeshTalBlock()
+            block.tally_number = ref.tally_number
+            block.particle = ref.particle
+            block.histories = float(np.sum(histories))
+            block.x_bins = list(ref.x_bins)
+            block.y_bins = list(ref.y_bins)
+            block.z_bins = list(ref.z_bins)
+            block.e_bins = list(ref.e_bins)
+            block.bin_lims = list(ref.bin_lims)
+            block.bin_lows = list(ref.bin_lows)
+            block.SizeDataValues(allocate=False)
+            block.layout = "compact"
+            block.dtype = dtype
+            block._x_centers,block._y_centers,block._z_centers = centers
+            block._values = values.astype(dtype,copy=False)
+            block._rel_error = \
+                _SumRelError(values,variance).astype(dtype,copy=False)
+            total = second = scratch = None
+            if layout == "full":
+                # Assembles the 5-column tensor from the compact fields
+                block.data_values = block.data_values
+            elif layout == "sparse":
+                block.ToSparse(dtype)
+            if mfile is not None:
+                _WriteBlock(mfile,block,_BlockFields(block),"column")
+            blocks.append(block)
+    finally:
+        if mfile is not None:
+            mfile.close()
+
+    return blocks
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+# Voxels per chunk of CompareMeshtalfiles: the comparison makes a few
+# dozen temporaries per chunk, which stay in cache at this size
+_COMPARE_CHUNK_ROWS = 1 << 16
+
+_DEVIATION_DECADES = (-4.0,4.0)   # |z| range of the percentile histogram
+_DEVIATION_BINS = 1600            # Histogram bins over that range
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+class _DiffAccumulator:
+    """ Don't use this method outside MMPP.
+    Running comparison of one tally of two files, fed chunk by chunk
+    by CompareMeshtalfiles. Memory is bounded: percentiles of |z| come
+    from a histogram with 200 bins per decade, and only the
+    max_flagged largest deviations are kept. """
+
+    # #####################################################
+    # Constructor
+    def __init__(self,shape,sigma_tolerance,ratio_tolerance,max_flagged,
+                 deviation_out,ratio_out):
+        ng = shape[0]
+        self.shape = shape
+        self.sigma_tolerance = sigma_tolerance
+        self.ratio_tolerance = ratio_tolerance
+        self.max_flagged = max_flagged
+        self.sums = {name:np.zeros(ng) for name in
+                     ("count","compared","only_reference","only_test",
+                      "flagged","finite","ratio","ratio2","z","z2")}
+        self.max_z = np.zeros(ng)
+        self.max_z_at = np.zeros([ng,3],dtype=np.int64)
+        self.max_ratio_deviation = np.zeros(ng)
+        self.histogram = np.zeros([ng,_DEVIATION_BINS+2])
+        self.worst = None
+        self.deviation = None if deviation_out is None else \
+                         _StreamOutput(deviation_out,"deviation_out",shape)
+        self.ratio = None if ratio_out is None else \
+                     _StreamOutput(ratio_out,"ratio_out",shape)
+
+    # #####################################################
+    def Add(self,chunk,values,rel_error):
+        """ Compares a chunk of the reference with the test file's
+        values and relative errors of the same voxels. """
+
+        ng = self.shape[0]
+        g = chunk.g
+        a,b = chunk.values,values
+        diff = b-a
+        sigma = np.sqrt((a*chunk.rel_error)**2+(b*rel_error)**2)
+        z = np.zeros(len(a))
+        np.divide(diff,sigma,out=z,where=(sigma > 0.0))
+        z[(sigma == 0.0) & (diff != 0.0)] = np.inf
+        ratio = np.full(len(a),np.nan)
+        np.divide(b,a,out=ratio,where=(a != 0.0))
+        compared = (a != 0.0) & (b != 0.0)
+        ratio_deviation = np.where(np.isnan(ratio),np.inf,np.abs(ratio-1.0))
+        abs_z = np.abs(z)
+        flagged = (abs_z > self.sigma_tolerance) & \
+                  (ratio_deviation > self.ratio_tolerance)
+        finite = np.isfinite(z)
+
+        sums = self.sums
+        sums["count"] += np.bincount(g,None,ng)
+        sums["compared"] += np.bincount(g,compared,ng)
+        sums["only_reference"] += np.bincount(g,(a != 0.0) & (b == 0.0),ng)
+        sums["only_test"] += np.bincount(g,(a == 0.0) & (b != 0.0),ng)
+        sums["flagged"] += np.bincount(g,flagged,ng)
+        r = np.where(compared,ratio,0.0)
+        sums["ratio"] += np.bincount(g,r,ng)
+        sums["ratio2"] += np.bincount(g,r*r,ng)
+        zf = np.where(finite,z,0.0)
+        sums["finite"] += np.bincount(g,finite,ng)
+        sums["z"] += np.bincount(g,zf,ng)
+        sums["z2"] += np.bincount(g,zf*zf,ng)
+
+        # Histogram of log10|z| over the voxels scoring in either file;
+        # bin 0 holds |z| below the range, the last one above it
+        lo,hi = _DEVIATION_DECADES
+        scoring = (a != 0.0) | (b != 0.0)
+        position = np.zeros(len(a),dtype=np.int64)
+        differ = abs_z > 0.0
+        with np.errstate(over="ignore"):
+            position[differ] = np.clip(np.floor(
+                (np.log10(abs_z[differ])-lo)/(hi-lo)*_DEVIATION_BINS)+1,
+                0,_DEVIATION_BINS+1).astype(np.int64)
+        self.histogram += np.bincount(
+            g[scoring]*(_DEVIATION_BINS+2)+position[scoring],
+            minlength=self.histogram.size).reshape(self.histogram.shape)
+
+        # Largest deviations, over the runs of equal group (a chunk is
+        # one group or a few consecutive ones)
+        starts = np.concatenate([[0],np.flatnonzero(np.diff(g))+1,
+                                 [len(g)]])
+        compared_deviation = np.where(compared,ratio_deviation,0.0)
+        for s0,s1 in zip(starts[:-1],starts[1:]):
+            k = g[s0]
+            top = s0+int(np.argmax(abs_z[s0:s1]))
+            if abs_z[top] > self.max_z[k]:
+                self.max_z[k] = abs_z[top]
+                self.max_z_at[k] = (chunk.ix[top],chunk.iy[top],
+                                    chunk.iz[top])
+            self.max_ratio_deviation[k] = max(
+                self.max_ratio_deviation[k],
+                float(compared_deviation[s0:s1].max()))
+        if np.any(flagged) and (self.max_flagged > 0):
+            rows = np.nonzero(flagged)[0]
+            found = np.rec.fromarrays(
+                [g[rows],chunk.ix[rows],chunk.iy[rows],chunk.iz[rows],
+                 a[rows],b[rows],z[rows],ratio[rows]],
+                names="g,ix,iy,iz,reference,test,z,ratio")
+            if self.worst is not None:
+                found = np.concatenate([self.worst,found]).view(np.recarray)
+            if len(found) > self.max_flagged:
+                keep = np.argpartition(-np.abs(found.z),
+                                       self.max_flagged-1)[:self.max_flagged]
+                found = found[keep]
+            self.worst = found
+
+        if self.deviation is not None:
+            self.deviation[g,chunk.ix,chunk.iy,chunk.iz] = z
+        if self.ratio is not None:
+            self.ratio[g,chunk.ix,chunk.iy,chunk.iz] = ratio
+
+    # #####################################################
+    def Finish(self,percentiles):
+        """ The summary of the comparison, see CompareMeshtalfiles. """
+
+        sums = self.sums
+        ng = self.shape[0]
+        def ratio(x,y):
+            out = np.zeros(ng)
+            np.divide(x,y,out=out,where=(y > 0.0))
+            return out
+
+        # Percentiles from the cumulative histogram, at bin upper edges
+        lo,hi = _DEVIATION_DECADES
+        edges = np.concatenate([[0.0],10.0**np.linspace(
+            lo,hi,_DEVIATION_BINS+1),[np.inf]])
+        cumulative = np.cumsum(self.histogram,axis=1)
+        table = np.zeros([ng,len(percentiles)])
+        for k in range(0,ng):
+            if cumulative[k,-1] == 0:
+                continue
+            rank = np.asarray(percentiles)/100.0*cumulative[k,-1]
+            b = np.minimum(np.searchsorted(cumulative[k],rank),
+                           _DEVIATION_BINS+1)
+            table[k] = np.where(b == 0,0.0,edges[b+1])
+            table[k] = np.where(b == _DEVIATION_BINS+1,self.max_z[k],
+                                table[k])
+
+        compared = sums["compared"]
+        mean_ratio = ratio(sums["ratio"],compared)
+        worst = self.worst
+        if worst is not None:
+            worst = worst[np.argsort(-np.abs(worst.z),kind="stable")]
+        return {"count":sums["count"],
+                "compared":compared,
+                "only_reference":sums["only_reference"],
+                "only_test":sums["only_test"],
+                "mean_ratio":mean_ratio,
+                "std_ratio":np.sqrt(np.maximum(ratio(sums["ratio2"],compared)
+                                               -mean_ratio**2,0.0)),
+                "max_ratio_deviation":self.max_ratio_deviation,
+                "mean_z":ratio(sums["z"],sums["finite"]),
+                "rms_z":np.sqrt(ratio(sums["z2"],sums["finite"])),
+                "max_abs_z":self.max_z,
+                "max_abs_z_at":self.max_z_at,
+                "abs_z_percentiles":table,
+                "percentiles":np.asarray(percentiles,dtype=np.float64),
+                "flagged":sums["flagged"],
+                "flagged_voxels":worst,
+                "passed":bool(np.sum(sums["flagged"]) == 0)}
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _CompareTally(info_ref,info_test,chunk_rows,accumulator,aligned):
+    """ Don't use this method outside MMPP.
+    Streams both tallies chunk by chunk into the accumulator. With
+    aligned, the two streams are expected to deliver the same voxels
+    in the same chunks (files written in the same format); otherwise
+    the test tally is first streamed into temporary memory-mapped
+    arrays and looked up per chunk.
+
+    Returns:
+        done: [bool] False if the chunks did not line up after all and
+              the caller must start again without aligned. """
+
+    test_stream = MeshTalStream(info_test,chunk_rows)
+    if aligned:
+        chunks_test = test_stream.Chunks()
+        try:
+            for chunk in MeshTalStream(info_ref,chunk_rows).Chunks():
+                other = next(chunks_test,None)
+                if (other is None) or (len(other.g) != len(chunk.g)) or \
+                   not (np.array_equal(other.g,chunk.g) and
+                        np.array_equal(other.ix,chunk.ix) and
+                        np.array_equal(other.iy,chunk.iy) and
+                        np.array_equal(other.iz,chunk.iz)):
+                    return False
+                accumulator.Add(chunk,other.values,other.rel_error)
+        finally:
+            chunks_test.close()
+        return True
+
+    temp_dir = tempfile.mkdtemp(prefix="mmpp_compare_")
+    try:
+        values,rel_error = test_stream.Run(StreamToArrays(
+            os.path.join(temp_dir,"values.npy"),
+            os.path.join(temp_dir,"rel_error.npy")))
+        for chunk in MeshTalStream(info_ref,chunk_rows).Chunks():
+            sel = (chunk.g,chunk.ix,chunk.iy,chunk.iz)
+            accumulator.Add(chunk,values[sel],rel_error[sel])
+        del values,rel_error
+    finally:
+        shutil.rmtree(temp_dir,ignore_errors=True)
+    return True
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def CompareMeshtalfiles(reference_filename,test_filename,tallies=None,
+                        sigma_tolerance=3.0,ratio_tolerance=0.0,
+                        percentiles=(50.0,90.0,99.0,99.9),max_flagged=100,
+                        deviation_out=None,ratio_out=None,
+                        chunk_rows=_COMPARE_CHUNK_ROWS):
+    """ Compares two meshtal files voxel by voxel (e.g. before and
+    after a change of cross-section library or code version). The
+    bins of the tallies must agree. Both files are streamed in chunks
+    (see MeshTalStream), so memory stays bounded whatever their size.
+
+    For every voxel the ratio test/reference and the difference in
+    standard deviations, z = (test-reference)/sqrt(s_ref^2+s_test^2),
+    are computed from the relative errors of both files. z is infinite
+    where the values differ but neither has an error. A voxel is
+    flagged when |z| > sigma_tolerance and |ratio-1| > ratio_tolerance
+    (a voxel scoring in one file only counts as an infinite ratio
+    deviation).
+
+    Arguments:
+        reference_filename,test_filename: [str] The two files.
+        tallies: [list of int] Tally numbers to compare. Default: all
+                 tallies (both files must hold the same ones).
+        sigma_tolerance: [float] |z| a voxel may reach unflagged.
+        ratio_tolerance: [float] |ratio-1| a voxel may reach unflagged.
+        percentiles: [float list] Percentiles of |z| to report.
+        max_flagged: [int] Number of the largest flagged deviations
+                     listed per tally.
+        deviation_out: [dict] Optional, tally number: output of z as
+                       [ng,nx,ny,nz], a .npy file name (memory-mapped)
+                       or an array.
+        ratio_out: [dict] The same for the ratio (NaN where the
+                   reference is 0).
+        chunk_rows: [int] Voxels per chunk.
+
+    Returns:
+        summary: [dict] Per tally number a dict with [ng] arrays:
+                 "count", "compared" (voxels scoring in both),
+                 "only_reference", "only_test", "mean_ratio",
+                 "std_ratio" and "max_ratio_deviation" (of compared
+                 voxels), "mean_z", "rms_z" (finite z), "max_abs_z",
+                 "max_abs_z_at" ([ng,3] bins), "abs_z_percentiles"
+                 (over voxels scoring in either file,
+                 [ng,len(percentiles)], to 1.2% of |z|), "flagged";
+                 "flagged_voxels", a record array (g, ix, iy, iz,
+                 reference, test, z, ratio) of the largest flagged
+                 deviations or None; and "passed", True if no voxel
+                 is flagged. """
+
+    catalogs = [{info.tally_number:info for info in ScanMeshtalfile(fn)}
+                for fn in (reference_filename,test_filename)]
+    if tallies is None:
+        if sorted(catalogs[0]) != sorted(catalogs[1]):
+            raise ValueError('"%s" has mesh tallies %s, "%s" has %s' %
+                             (reference_filename,sorted(catalogs[0]),
+                              test_filename,sorted(catalogs[1])))
+        tallies = [t for t in catalogs[0]]
+    for t in tallies:
+        for fn,catalog in zip((reference_filename,test_filename),catalogs):
+            if t not in catalog:
+                raise ValueError('"%s" has no mesh tally %d' % (fn,t))
+        for name in ("x_bins","y_bins","z_bins","e_bins","bin_lows"):
+            if not np.array_equal(getattr(catalogs[0][t],name),
+                                  getattr(catalogs[1][t],name)):
+                raise ValueError('%s of mesh tally %d differ between "%s" '
+                                 'and "%s"' % (name,t,reference_filename,
+                                               test_filename))
+
+    deviation_out = deviation_out or {}
+    ratio_out = ratio_out or {}
+    summary = {}
+    for t in tallies:
+        info_ref,info_test = catalogs[0][t],catalogs[1][t]
+        shape = (info_ref.ng,info_ref.nx,info_ref.ny,info_ref.nz)
+        logger.info("Comparing mesh tally %d",t)
+        with _Phase("compare",2*int(np.prod(shape))):
+            accumulator = _DiffAccumulator(shape,sigma_tolerance,
+                                           ratio_tolerance,max_flagged,
+                                           deviation_out.get(t),
+                                           ratio_out.get(t))
+            aligned = info_ref.index.format == info_test.index.format
+            if not _CompareTally(info_ref,info_test,chunk_rows,accumulator,
+                                 aligned):
+                logger.debug("Chunks of mesh tally %d do not line up, "
+                             "comparing through a temporary copy",t)
+                accumulator = _DiffAccumulator(shape,sigma_tolerance,
+                                               ratio_tolerance,max_flagged,
+                                               deviation_out.get(t),
+                                               ratio_out.get(t))
+                _CompareTally(info_ref,info_test,chunk_rows,accumulator,
+                              False)
+            summary[t] = accumulator.Finish(percentiles)
+    return summary
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+_RENDER_BLOCKS = {}       # Blocks of the files being rendered
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _RenderInit(meshtal_filenames,rendered):
+    """ Don't use this method outside MMPP.
+    Process-pool initializer of RenderSlices: takes the blocks parsed
+    by the parent, or with rendered None loads the files from the
+    sidecar cache written by the parent (memory-mapped, no parsing). """
+
+    if rendered is not None:
+        _RENDER_BLOCKS.update(rendered)
+        return
+    for meshtal_filename in meshtal_filenames:
+        _RENDER_BLOCKS[meshtal_filename] = {
+            b.tally_number:b for b in ReadMeshtalfile(
+                meshtal_filename,layout="compact",cache=True)}
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _RenderFrame(task):
+    """ Don't use this method outside MMPP.
+    Renders one slice to PNG images (headless, Agg) or an .npz dump.
+
+    Returns:
+        filenames: [list of str] The files written. """
+
+    (meshtal_filename,tally,axis,index,energy,quantities,limits,fmt,
+     prefix,dpi,cmap) = task
+    block = _RENDER_BLOCKS[meshtal_filename][tally]
+    s,t,v,u = block.slice(axis,index,energy)
+    edges = _BlockEdges(block)
+    c0,c1 = [k for k in range(0,3) if k != axis]
+    arrays = {"values":v,"rel_error":u}
+
+    if fmt == "npz":
+        filename = prefix + ".npz"
+        np.savez(filename,**{"xyz"[c0] + "_edges":edges[c0],
+                             "xyz"[c1] + "_edges":edges[c1],
+                             "values":v,"rel_error":u})
+        return [filename]
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.colors import LogNorm
+
+    position = 0.5*(edges[axis][index]+edges[axis][index+1])
+    e_high = block.e_bins[energy] if energy % block.ng < block.ng-1 \
+             else None
+    filenames = []
+    for quantity in quantities:
+        vmin,vmax = limits[quantity]
+        figure = Figure(figsize=(6.4,4.8))
+        FigureCanvasAgg(figure)
+        ax = figure.add_subplot(1,1,1)
+        data = np.ma.masked_less_equal(np.asarray(arrays[quantity]),0.0)
+        mesh = ax.pcolorfast(edges[c0],edges[c1],data.T,cmap=cmap,
+                             norm=LogNorm(vmin=vmin,vmax=vmax))
+        figure.colorbar(mesh,ax=ax,label="Relative error" if
+                        quantity == "rel_error" else "Result")
+        ax.set_xlabel("%s [cm]" % "XYZ"[c0])
+        ax.set_ylabel("%s [cm]" % "XYZ"[c1])
+        ax.set_title("Tally %d, %s = %.4g cm, %s" %
+                     (tally,"xyz"[axis],position,"Total" if e_high is None
+                      else "E <= %.4g MeV" % e_high))
+        ax.set_aspect("equal")
+        filename = "%s_%s.png" % (prefix,quantity)
+        figure.savefig(filename,dpi=dpi)
+        filenames.append(filename)
+    return filenames
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _BinRange(text,n):
+    """ Don't use this method outside MMPP.
+    Bin numbers of a "start:stop[:step]" range, a single bin number or
+    "all", bounded to n bins. """
+
+    if text == "all":
+        return list(range(0,n))
+    parts = [int(p) if p else None for p in text.split(":")]
+    if len(parts) == 1:
+        return [parts[0] % n]
+    return list(range(0,n))[slice(*parts)]
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def _PositiveRange(array):
+    """ Don't use this method outside MMPP.
+    Smallest and largest positive entries of an array, for log color
+    scales. (None,None) if there are none. """
+
+    a = np.asarray(array)
+    positive = a[a > 0.0]
+    if len(positive) == 0:
+        return None,None
+    return float(positive.min()),float(positive.max())
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def RenderSlices(meshtal_filenames,out_dir=".",tallies=None,axes=("z",),
+                 bins="all",energies=(-1,),
+                 quantities=("values","rel_error"),fmt="png",workers=None,
+                 value_range=None,error_range=None,dpi=100,cmap="jet",
+                 cache=False):
+    """ Renders sets of slices of mesh tallies to PNG images (log color
+    scale, matplotlib's headless Agg backend) or .npz array dumps, in
+    a pool of processes. Each file is parsed once and the blocks are
+    sent to the workers. With cache, the file is parsed into its
+    sidecar cache (see ReadMeshtalfile) instead, which the workers
+    memory-map and later runs reuse.
+
+    Arguments:
+        meshtal_filenames: [list of str] Meshtal files.
+        out_dir: [str] Directory for the output files.
+        tallies: [list of int] Tally numbers. Default: all.
+        axes: [list of str or int] Axes normal to the slices.
+        bins: [str] Bins along each axis: "start:stop[:step]", a bin
+              number or "all".
+        energies: [list of int] Energy bin numbers (-1: the total).
+        quantities: [list of str] "values" and/or "rel_error" (PNG).
+        fmt: [str] "png", or "npz" for the bin edges, values and
+             relative errors of each slice.
+        workers: [int] Processes. Default: all cores.
+        value_range,error_range: [(float,float)] Color scale limits.
+                                 Default: the positive range of each
+                                 tally and energy bin, the same for
+                                 every frame.
+        dpi: [int] Resolution of the PNG images.
+        cmap: [str] Matplotlib colormap.
+        cache: [bool] Read through (and write) the sidecar cache of
+               each file, <file>.mmpp. It is left in place.
+
+    Returns:
+        filenames: [list of str] The files written, in task order. """
+
+    if fmt not in ("png","npz"):
+        raise ValueError('fmt must be "png" or "npz", not ' + repr(fmt))
+    os.makedirs(out_dir,exist_ok=True)
+
+    ############################## Parse each file once
+    rendered = {}
+    for meshtal_filename in meshtal_filenames:
+        blocks = None
+        if cache:
+            try:
+                blocks = ReadMeshtalfile(meshtal_filename,layout="compact",
+                                         cache=True)
+            except OSError as error:
+                logger.warning("Cannot cache %s (%s); sending the parsed "
+                               "blocks to the workers",meshtal_filename,
+                               error)
+                cache = False
+        if blocks is None:
+            blocks = ReadMeshtalfile(meshtal_filename,layout="compact")
+        rendered[meshtal_filename] = {b.tally_number:b for b in blocks}
+
+    ############################## One task per slice
+    tasks = []
+    for meshtal_filename in meshtal_filenames:
+        stem = os.path.splitext(os.path.basename(meshtal_filename))[0]
+        by_tally = rendered[meshtal_filename]
+        for tally in (sorted(by_tally) if tallies is None else tallies):
+            if tally not in by_tally:
+                raise ValueError("%s has no mesh tally %d" %
+                                 (meshtal_filename,tally))
+            block = by_tally[tally]
+            for energy in energies:
+                g = energy % block.ng
+                limits = {"values":value_range or
+                                   _PositiveRange(block.values[g]),
+                          "rel_error":error_range or
+                                      _PositiveRange(block.rel_error[g])}
+                for axis in axes:
+                    axis = _AxisNumber(axis)
+                    n = (block.nx,block.ny,block.nz)[axis]
+                    for index in _BinRange(str(bins),n):
+                        prefix = os.path.join(out_dir,"%s_t%d_%s%04d_e%d" %
+                                              (stem,tally,"xyz"[axis],index,
+                                               g))
+                        tasks.append((meshtal_filename,tally,axis,index,g,
+                                      tuple(quantities),limits,fmt,prefix,
+                                      dpi,cmap))
+    logger.info("Rendering %d slices",len(tasks))
+
+    ############################## Render
+    workers = os.cpu_count() if workers is None else workers
+    filenames = []
+    if (workers <= 1) or (len(tasks) <= 1):
+        _RENDER_BLOCKS.update(rendered)
+        try:
+            for task in tasks:
+                filenames += _RenderFrame(task)
+        finally:
+            for meshtal_filename in rendered:
+                _RENDER_BLOCKS.pop(meshtal_filename,None)
+        return filenames
+    chunk = max(1,len(tasks) // (4*workers))
+    with concurrent.futures.ProcessPoolExecutor(
+            workers,initializer=_RenderInit,
+            initargs=(list(meshtal_filenames),
+                      None if cache else rendered)) as pool:
+        for written in pool.map(_RenderFrame,tasks,chunksize=chunk):
+            filenames += written
+    return filenames
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+def main(argv=None):
+    """ Command-line entry point, see python MMPP.py --help. """
+
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="MMPP.py",
+        description="Renders slices of MCNP mesh tallies to PNG images or "
+                    ".npz arrays, in parallel.")
+    parser.add_argument("meshtal_files",nargs="+")
+    parser.add_argument("--list",action="store_true",
+                        help="only list the tallies of each file")
+    parser.add_argument("--tallies",nargs="+",type=int,default=None,
+                        help="tally numbers (default: all)")
+    parser.add_argument("--axes",nargs="+",default=["z"],
+                        choices=["x","y","z"],
+                        help="axes normal to the slices")
+    parser.add_argument("--bins",default="all",
+                        help='bins along each axis: "start:stop[:step]", '
+                             'a bin number or "all"')
+    parser.add_argument("--energies",nargs="+",type=int,default=[-1],
+                        help="energy bin numbers, -1 for the total")
+    parser.add_argument("--quantities",nargs="+",
+                        default=["values","rel_error"],
+                        choices=["values","rel_error"])
+    parser.add_argument("--format",default="png",choices=["png","npz"])
+    parser.add_argument("--out",default=".",help="output directory")
+    parser.add_argument("--workers",type=int,default=None,
+                        help="processes (default: all cores)")
+    parser.add_argument("--value-range",nargs=2,type=float,default=None)
+    parser.add_argument("--error-range",nargs=2,type=float,default=None)
+    parser.add_argument("--dpi",type=int,default=100)
+    parser.add_argument("--cmap",default="jet")
+    parser.add_argument("--cache",action="store_true",
+                        help="parse each file into a binary sidecar cache, "
+                             "<file>.mmpp, that the workers memory-map and "
+                             "later runs reuse; it is left next to the file "
+                             "(default: no files written besides the "
+                             "output)")
+    parser.add_argument("-v","--verbose",action="count",default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=[logging.WARNING,logging.INFO,
+                               logging.DEBUG][min(args.verbose,2)],
+                        format="%(name)s: %(message)s")
+    if args.list:
+        for meshtal_filename in args.meshtal_files:
+            print(meshtal_filename)
+            for info in ScanMeshtalfile(meshtal_filename):
+                print("  ",info)
+        return 0
+
+    start = time.perf_counter()
+    filenames = RenderSlices(args.meshtal_files,args.out,args.tallies,
+                             args.axes,args.bins,args.energies,
+                             args.quantities,args.format,args.workers,
+                             args.value_range,args.error_range,args.dpi,
+                             args.cmap,args.cache)
+    print("Wrote %d files to %s in %.1f s" % (len(filenames),args.out,
+                                              time.perf_counter()-start))
+    return 0
+
+# $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""Scaling benchmark for the MCNP Meshtal Python Processor (MMPP)
+
+Generates synthetic meshtal files of increasing size with
+MMPP.GenerateMeshtalfile, measures each one in a fresh process and writes
+a JSON report:
+
+    python benchmark.py --out report.json
+    python benchmark.py --sizes 1e3 1e5 1e7 1e8 --layout compact --out big.json
+
+Two reports (e.g. before and after a change) are compared with
+
+    python benchmark.py --out new.json --compare report.json
+
+which exits with status 1 if any metric got worse by more than --tolerance.
+"""
+
+# ========================================== Import modules
+import argparse
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import MMPP
+
+REPORT_VERSION = 1
+
+# Metrics compared between reports and whether larger is better
+METRICS = {"parse_s":False,
+           "rows_per_s":True,
+           "mb_per_s":True,
+           "peak_rss_mb":False,
+           "slice_ms":False,
+           "line_ms":False,
+           "query_points_per_s":True,
+           "interp_points_per_s":True}
+
+# ========================================== Measurements
+def _PeakRSS():
+    """Peak resident set size of this process in MB, None if unknown."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak/2.0**20
+    return peak/2.0**10
+
+def _Median(function,repeats):
+    """Median wall time of function() in seconds."""
+    times = []
+    for r in range(0,repeats):
+        t0 = time.perf_counter()
+        function()
+        times.append(time.perf_counter()-t0)
+    return float(np.median(times))
+
+def MeasureCase(filename,layout,workers,repeats,num_points):
+    """Runs in a fresh process: parses filename and times extraction."""
+    rng = np.random.default_rng(0)
+    size = os.path.getsize(filename)
+
+    t0 = time.perf_counter()
+    blocks = MMPP.ReadMeshtalfile(filename,layout=layout,workers=workers)
+    parse_s = time.perf_counter()-t0
+    phases = {name:dict(total) for name,total in MMPP.stats.phases.items()}
+    rows = sum(b.ng*b.nx*b.ny*b.nz for b in blocks)
+    block = blocks[0]
+
+    result = {"parse_s":parse_s,
+              "rows_per_s":rows/parse_s,
+              "mb_per_s":size/2.0**20/parse_s}
+
+    # 2D slices and lines of the total group, random bins per repeat
+    e = block.ng-1
+    dims = [block.nx,block.ny,block.nz]
+    slices = {}
+    for axis in range(0,3):
+        index = iter(rng.integers(0,dims[axis],repeats).tolist())
+        slices["xyz"[axis]] = 1.0e3*_Median(
+            lambda: block.slice(axis,next(index),e,copy=True),repeats)
+    result["slice_ms"] = float(np.mean(list(slices.values())))
+    result["slice_ms_by_axis"] = slices
+    lines = iter(zip(rng.integers(0,block.nx,repeats).tolist(),
+                     rng.integers(0,block.ny,repeats).tolist()))
+    result["line_ms"] = 1.0e3*_Median(
+        lambda: block.line("z",*next(lines),e,copy=True),repeats)
+
+    # Point queries at random points inside the mesh
+    lower,upper = [np.array(b) for b in (
+        [block.bin_lows[0],block.bin_lows[1],block.bin_lows[2]],
+        [block.x_bins[-1],block.y_bins[-1],block.z_bins[-1]])]
+    points = lower+(upper-lower)*rng.random([num_points,3])
+    x,y,z = points.T
+    query_s = _Median(lambda: block.QueryPoints(x,y,z),repeats)
+    result["query_points_per_s"] = num_points/query_s
+    interpolator = MMPP.MeshTalInterpolator(block)
+    interp_s = _Median(lambda: interpolator.Sample(x,y,z),repeats)
+    result["interp_points_per_s"] = num_points/interp_s
+
+    result["peak_rss_mb"] = _PeakRSS()
+    result["read_phases"] = phases
+    return result
+
+def _MeasureInChild(queue,args):
+    try:
+        queue.put(("ok",MeasureCase(*args)))
+    except BaseException as error:
+        queue.put(("error","%s: %s" % (type(error).__name__,error)))
+
+def MeasureInFreshProcess(*args):
+    """MeasureCase in a new interpreter, so that peak RSS and warm
+    caches of one case do not leak into the next."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_MeasureInChild,args=(queue,args))
+    process.start()
+    status,result = None,None
+    while process.is_alive() or not queue.empty():
+        try:
+            status,result = queue.get(timeout=1.0)
+            break
+        except Exception:
+            continue
+    process.join()
+    if status is None:
+        return {"error":"process exited with code %s" % process.exitcode}
+    if status == "error":
+        return {"error":result}
+    return result
+
+# ========================================== Report
+def Environment():
+    """Versions and machine the report was made with."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(here,"MMPP.py"),"rb") as source:
+        source_hash = hashlib.blake2b(source.read(),digest_size=8).hexdigest()
+    try:
+        commit = subprocess.run(["git","rev-parse","HEAD"],cwd=here,
+                                capture_output=True,text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError,subprocess.SubprocessError):
+        commit = None
+    return {"python":platform.python_version(),
+            "numpy":np.__version__,
+            "platform":platform.platform(),
+            "machine":platform.machine(),
+            "cpu_count":os.cpu_count(),
+            "git_commit":commit,
+            "mmpp_hash":source_hash}
+
+def CaseKey(case):
+    return "%s/%s/%d^3x%d" % (case["format"],case["layout"],case["n"],
+                              case["num_groups"])
+
+def Compare(report,baseline,tolerance):
+    """Prints the ratio of every metric to the baseline. Returns the
+    list of regressions beyond tolerance."""
+    cases = {CaseKey(c):c for c in baseline["cases"] if "error" not in c}
+    regressions = []
+    print("%-28s %-20s %12s %12s %8s" %
+          ("case","metric","baseline","new","ratio"))
+    for case in report["cases"]:
+        key = CaseKey(case)
+        if key not in cases or "error" in case:
+            continue
+        for metric,larger_is_better in METRICS.items():
+            old,new = cases[key].get(metric),case.get(metric)
+            if not old or new is None:
+                continue
+            ratio = new/old
+            worse = ratio < 1.0-tolerance if larger_is_better else \
+                    ratio > 1.0+tolerance
+            flag = "  <-- regression" if worse else ""
+            print("%-28s %-20s %12.4g %12.4g %8.3f%s" %
+                  (key,metric,old,new,ratio,flag))
+            if worse:
+                regressions.append((key,metric,ratio))
+    return regressions
+
+# ========================================== Main
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes",nargs="+",type=float,
+                        default=[1e3,1e4,1e5,1e6],
+                        help="voxel counts (rounded to cubes), e.g. 1e3 1e8")
+    parser.add_argument("--groups",type=int,default=2,
+                        help="energy groups besides the total")
+    parser.add_argument("--formats",nargs="+",default=["column","ij"],
+                        choices=["column","ij","ik","jk"])
+    parser.add_argument("--layout",default="full",
+                        choices=["full","compact"])
+    parser.add_argument("--workers",type=int,default=None)
+    parser.add_argument("--distribution",default="attenuation",
+                        choices=["attenuation","uniform","lognormal"])
+    parser.add_argument("--repeats",type=int,default=20)
+    parser.add_argument("--points",type=int,default=100000,
+                        help="points per query/interpolation batch")
+    parser.add_argument("--workdir",default=None,
+                        help="directory for the generated files; they are "
+                             "kept and reused (default: a temporary "
+                             "directory, deleted afterwards)")
+    parser.add_argument("--out",default="benchmark_report.json")
+    parser.add_argument("--compare",default=None,
+                        help="baseline report to compare against")
+    parser.add_argument("--tolerance",type=float,default=0.2,
+                        help="relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="mmpp_bench_")
+    os.makedirs(workdir,exist_ok=True)
+    report = {"report_version":REPORT_VERSION,
+              "created":datetime.datetime.now().isoformat(timespec="seconds"),
+              "environment":Environment(),
+              "config":vars(args),
+              "cases":[]}
+    try:
+        for size in args.sizes:
+            n = max(1,int(round(size**(1.0/3.0))))
+            for out in args.formats:
+                filename = os.path.join(workdir,"bench_%s_%d_%d_%s.msht" %
+                                        (out,n,args.groups,
+                                         args.distribution))
+                generate_s = None
+                if not os.path.exists(filename):
+                    t0 = time.perf_counter()
+                    MMPP.GenerateMeshtalfile(filename,n,n,n,
+                                             num_groups=args.groups,out=out,
+                                             distribution=args.distribution)
+                    generate_s = time.perf_counter()-t0
+                case = {"format":out,"layout":args.layout,"n":n,
+                        "voxels":n**3,"num_groups":args.groups,
+                        "rows":(args.groups+1)*n**3,
+                        "file_mb":os.path.getsize(filename)/2.0**20,
+                        "generate_s":generate_s}
+                case.update(MeasureInFreshProcess(filename,args.layout,
+                                                  args.workers,args.repeats,
+                                                  args.points))
+                report["cases"].append(case)
+                if "error" in case:
+                    print("%-28s %s" % (CaseKey(case),case["error"]))
+                else:
+                    print("%-28s parse %8.3f s %12.0f rows/s %8.1f MB/s "
+                          "RSS %8.1f MB slice %8.3f ms query %10.0f pts/s" %
+                          (CaseKey(case),case["parse_s"],case["rows_per_s"],
+                           case["mb_per_s"],case["peak_rss_mb"] or 0.0,
+                           case["slice_ms"],case["query_points_per_s"]))
+                sys.stdout.flush()
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir,ignore_errors=True)
+
+    with open(args.out,"w") as report_file:
+        json.dump(report,report_file,indent=1)
+    print("Report written to " + args.out)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = Compare(report,baseline,args.tolerance)
+        if regressions:
+            print("%d regression(s) beyond %.0f%%" %
+                  (len(regressions),100*args.tolerance))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+"""Shared fixtures: small synthetic meshtal files written with
+MMPP.GenerateMeshtalfile into a per-test temporary directory."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import MMPP
+
+
+@pytest.fixture
+def meshtal(tmp_path):
+    """make(name="test.msht",**kwargs) writes a synthetic meshtal file
+    (kwargs as for MMPP.GenerateMeshtalfile) and returns its path."""
+    def make(name="test.msht",**kwargs):
+        path = str(tmp_path/name)
+        MMPP.GenerateMeshtalfile(path,**kwargs)
+        return path
+    return make
@@ -0,0 +1,77 @@
+"""The vectorized data parser against the line-by-line one and float()."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+def _Identical(a,b):
+    return a.shape == b.shape and np.array_equal(
+        np.ascontiguousarray(a).view(np.int64),
+        np.ascontiguousarray(b).view(np.int64))
+
+
+def _ParseRows(rows):
+    data = "".join(rows).encode()
+    out = [np.zeros(len(rows)) for c in range(0,5)]
+    MMPP._ParseDataRows(data,len(rows),out)
+    return np.stack(out,axis=1)
+
+
+def _FloatRows(rows):
+    return np.array([[float(w) for w in row.split()[1:6]] for row in rows])
+
+
+@pytest.mark.parametrize("distribution",["attenuation","lognormal"])
+def test_bulk_matches_line_parser(meshtal,distribution):
+    path = meshtal(nx=9,ny=7,nz=5,num_groups=3,distribution=distribution,
+                   zero_fraction=0.2,num_tallies=2)
+    bulk = MMPP.ReadMeshtalfile(path)
+    lines = MMPP.ReadMeshtalfile(path,bulk=False)
+    assert len(bulk) == len(lines) == 2
+    for b,l in zip(bulk,lines):
+        assert _Identical(b.data_values,l.data_values)
+
+
+@pytest.mark.parametrize("out",["ij","ik","jk"])
+def test_matrix_format_matches_column(meshtal,out):
+    column = MMPP.ReadMeshtalfile(meshtal("c.msht",nx=6,ny=5,nz=4,seed=3))
+    matrix = MMPP.ReadMeshtalfile(meshtal("m.msht",nx=6,ny=5,nz=4,seed=3,
+                                          out=out))
+    assert _Identical(matrix[0].values,column[0].values)
+    assert _Identical(matrix[0].rel_error,column[0].rel_error)
+
+
+def test_decoder_is_bit_identical_to_float():
+    rng = np.random.default_rng(1)
+    n = 3000
+    x = rng.uniform(-999.0,999.0,n)
+    x[::7] = -0.0
+    results = 10.0**rng.uniform(-99,99,n)*rng.choice([1.0,-1.0],n)
+    results[::11] = 0.0
+    results[::13] = -0.0
+    rows = ["%11.3E%11.3f%11.3f%11.3f %12.5E %12.5E\n" %
+            (1.0,a,b,c,r,e) for a,b,c,r,e in
+            zip(x,x[::-1],0.5*x,results,rng.uniform(0.0,1.0,n))]
+    assert MMPP._ParseDataRowsFixedWidth("".join(rows).encode(),n,
+                                         [np.zeros(n)]*5) > 0
+    assert _Identical(_ParseRows(rows),_FloatRows(rows))
+
+
+def test_rows_of_varying_width_fall_back():
+    rows = ["1.0 %g %g %g %.5E %.5E\n" % (x,-x,2*x,x*1e-3,0.5)
+            for x in np.linspace(-30.0,30.0,41)]
+    assert MMPP._ParseDataRowsFixedWidth("".join(rows).encode(),len(rows),
+                                         [np.zeros(len(rows))]*5) == 0
+    assert _Identical(_ParseRows(rows),_FloatRows(rows))
+
+
+def test_corrupt_field_is_not_silently_decoded():
+    rows = ["%11.3E%11.3f%11.3f%11.3f %12.5E %12.5E\n" % (1.0,x,x,x,1.0,0.5)
+            for x in np.linspace(-50.0,50.0,100)]
+    rows[40] = rows[40][:11] + "    ***.***" + rows[40][22:]
+    assert MMPP._ParseDataRowsFixedWidth("".join(rows).encode(),len(rows),
+                                         [np.zeros(len(rows))]*5) == 0
+    with pytest.raises(ValueError):
+        _ParseRows(rows)
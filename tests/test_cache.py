@@ -0,0 +1,97 @@
+"""MeshTalBlock.EnableCache: memoized slices, lines and points, and
+in-place edits of the data while results are cached."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture(params=["full","compact","sparse"])
+def block(meshtal,request):
+    path = meshtal(nx=4,ny=3,nz=5,num_groups=1,zero_fraction=0.3)
+    block = MMPP.ReadMeshtalfile(path,layout=request.param)[0]
+    block.EnableCache()
+    return block
+
+
+def test_repeated_calls_hit(block):
+    first = block.slice(2,1,0)
+    assert block.slice(2,1,0) is first
+    block.line(0,1,2,0)
+    block.line(0,1,2,0)
+    assert block.cache.hits == 2
+    assert block.cache.misses == 2
+    assert not first[2].flags.writeable
+
+
+def _Stored(block):
+    """Results as stored by the block (sparse blocks densify values)."""
+    if block.layout == "sparse":
+        return block.NonzeroVoxels()[1]
+    return block.values
+
+
+def test_in_place_edit_raises_while_cached(block):
+    block.slice(0,1,0)
+    with pytest.raises(ValueError):
+        _Stored(block)[0] = -5.0
+    if block.layout == "full":
+        with pytest.raises(ValueError):
+            block.data_values[0,1,:,:,3] = -5.0
+
+
+def test_edit_after_clear_is_seen(meshtal):
+    path = meshtal(nx=4,ny=3,nz=5,num_groups=1)
+    block = MMPP.ReadMeshtalfile(path)[0]
+    block.EnableCache()
+    x = float(block.x_centers[1])
+    y,z = float(block.y_centers[0]),float(block.z_centers[0])
+    block.slice(0,1,0)
+    block.UnpackGivenXE(x,0)
+    block.QueryPoints(x,y,z)
+
+    block.cache.Clear()
+    block.data_values[:,1,:,:,3] = -5.0
+    assert np.all(block.slice(0,1,0)[2] == -5.0)
+    assert np.all(block.UnpackGivenXE(x,0)[2] == -5.0)
+    assert block.QueryPoints(x,y,z)[4] == -5.0
+
+
+def test_disable_cache_makes_the_data_writeable(block):
+    block.slice(1,0,0)
+    block.DisableCache()
+    _Stored(block)[...] = 7.0
+    v = block.slice(1,0,0)[2]
+    assert np.all((v == 7.0) | (v == 0.0))
+    assert np.any(v == 7.0)
+
+
+def test_replacing_data_values_clears(meshtal):
+    block = MMPP.ReadMeshtalfile(meshtal(nx=4,ny=3,nz=5,num_groups=1))[0]
+    block.EnableCache()
+    old = block.data_values
+    block.slice(0,1,0)
+    new = old.copy()
+    new[...,3] = 1.0
+    block.data_values = new
+    assert len(block.cache) == 0
+    assert old.flags.writeable
+    assert np.all(block.slice(0,1,0)[2] == 1.0)
+
+
+@pytest.mark.parametrize("convert",["ToCompact","ToSparse"])
+def test_layout_conversion_clears(meshtal,convert):
+    block = MMPP.ReadMeshtalfile(meshtal(nx=4,ny=3,nz=5,num_groups=1))[0]
+    block.EnableCache()
+    old = block.data_values
+    block.slice(2,0,0)
+    getattr(block,convert)()
+    assert len(block.cache) == 0
+    assert old.flags.writeable
+    stored = _Stored(block)
+    assert stored.flags.writeable
+    stored[...] = 99.0
+    v = block.slice(2,0,0)[2]
+    assert np.any(v == 99.0)
+    assert np.all((v == 99.0) | (v == 0.0))
@@ -0,0 +1,106 @@
+"""CompareMeshtalfiles against the same statistics over two parsed
+blocks."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture
+def pair(meshtal):
+    ref = meshtal("ref.msht",nx=5,ny=4,nz=3,num_groups=2,num_tallies=2,
+                  distribution="uniform",zero_fraction=0.2,seed=1)
+    test = meshtal("test.msht",nx=5,ny=4,nz=3,num_groups=2,num_tallies=2,
+                   distribution="uniform",zero_fraction=0.2,seed=2)
+    return ref,test
+
+
+def _Expected(ref,test,t):
+    a = MMPP.ReadMeshtalfile(ref)[t]
+    b = MMPP.ReadMeshtalfile(test)[t]
+    va,vb = a.values,b.values
+    sigma = np.hypot(va*a.rel_error,vb*b.rel_error)
+    with np.errstate(divide="ignore",invalid="ignore"):
+        z = np.where(sigma > 0.0,(vb-va)/sigma,
+                     np.where(vb != va,np.inf,0.0))
+        ratio = np.where(va != 0.0,vb/va,np.nan)
+    return va,vb,z,ratio
+
+
+def test_file_against_itself(pair):
+    summary = MMPP.CompareMeshtalfiles(pair[0],pair[0])
+    assert sorted(summary) == [4,14]
+    for s in summary.values():
+        assert s["passed"]
+        assert np.all(s["max_abs_z"] == 0.0)
+        assert np.allclose(s["mean_ratio"][s["compared"] > 0],1.0)
+        assert s["flagged_voxels"] is None
+
+
+@pytest.mark.parametrize("chunk_rows",[7,100000])
+def test_statistics(pair,chunk_rows):
+    out = {}
+    summary = MMPP.CompareMeshtalfiles(pair[0],pair[1],tallies=[14],
+                                       sigma_tolerance=1.0,
+                                       ratio_tolerance=0.5,max_flagged=20,
+                                       deviation_out={14:None},
+                                       ratio_out=out,chunk_rows=chunk_rows)
+    s = summary[14]
+    va,vb,z,ratio = _Expected(pair[0],pair[1],1)
+    compared = (va != 0.0) & (vb != 0.0)
+    deviation = np.where(np.isnan(ratio),np.inf,np.abs(ratio-1.0))
+    flagged = (np.abs(z) > 1.0) & (deviation > 0.5)
+    axes = (1,2,3)
+    assert np.array_equal(s["count"],[60,60,60])
+    assert np.array_equal(s["compared"],compared.sum(axis=axes))
+    assert np.array_equal(s["only_reference"],
+                          ((va != 0.0) & (vb == 0.0)).sum(axis=axes))
+    assert np.array_equal(s["only_test"],
+                          ((va == 0.0) & (vb != 0.0)).sum(axis=axes))
+    assert np.array_equal(s["flagged"],flagged.sum(axis=axes))
+    assert s["passed"] == (not np.any(flagged))
+    mean_ratio = [ratio[g][compared[g]].mean() for g in range(0,3)]
+    assert np.allclose(s["mean_ratio"],mean_ratio,rtol=1e-12)
+    assert np.allclose(s["max_abs_z"],np.abs(z).max(axis=axes))
+    for g in range(0,3):
+        at = tuple(s["max_abs_z_at"][g])
+        assert np.abs(z[g][at]) == s["max_abs_z"][g]
+    worst = s["flagged_voxels"]
+    assert len(worst) == min(20,flagged.sum())
+    assert np.all(np.diff(np.abs(worst.z)) <= 0.0)
+    largest = np.sort(np.abs(z[flagged]))[::-1][0:len(worst)]
+    assert np.allclose(np.abs(worst.z),largest,rtol=1e-12)
+
+
+def test_deviation_and_ratio_arrays(pair,tmp_path):
+    out = str(tmp_path/"z.npy")
+    ratio_out = np.empty((3,5,4,3))
+    MMPP.CompareMeshtalfiles(pair[0],pair[1],tallies=[4],
+                             deviation_out={4:out},ratio_out={4:ratio_out})
+    va,vb,z,ratio = _Expected(pair[0],pair[1],0)
+    assert np.allclose(np.load(out),z,rtol=1e-12)
+    assert np.allclose(ratio_out,ratio,rtol=1e-12,equal_nan=True)
+
+
+def test_formats_need_not_match(pair,meshtal):
+    matrix = meshtal("matrix.msht",nx=5,ny=4,nz=3,num_groups=2,
+                     num_tallies=2,distribution="uniform",zero_fraction=0.2,
+                     seed=2,out="ik")
+    a = MMPP.CompareMeshtalfiles(pair[0],pair[1])
+    b = MMPP.CompareMeshtalfiles(pair[0],matrix)
+    for t in (4,14):
+        for name in ("flagged","compared","max_abs_z","mean_ratio",
+                     "abs_z_percentiles"):
+            assert np.allclose(a[t][name],b[t][name],rtol=1e-12)
+
+
+def test_mismatches_raise(pair,meshtal):
+    other = meshtal("other.msht",nx=5,ny=4,nz=4,num_groups=2,num_tallies=2)
+    with pytest.raises(ValueError):
+        MMPP.CompareMeshtalfiles(pair[0],other)
+    single = meshtal("single.msht",nx=5,ny=4,nz=3,num_groups=2)
+    with pytest.raises(ValueError):
+        MMPP.CompareMeshtalfiles(pair[0],single)
+    with pytest.raises(ValueError):
+        MMPP.CompareMeshtalfiles(pair[0],single,tallies=[14])
@@ -0,0 +1,95 @@
+"""VTK XML and XDMF export, read back with the standard library."""
+
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture(params=["full","sparse"])
+def blocks(meshtal,request):
+    path = meshtal(nx=4,ny=3,nz=5,num_groups=2,num_tallies=2,
+                   zero_fraction=0.3)
+    return MMPP.ReadMeshtalfile(path,layout=request.param)
+
+
+def _ReadVTK(filename):
+    """The appended arrays of a raw .vtr file, by name."""
+    with open(filename,"rb") as vfile:
+        text = vfile.read()
+    base = text.index(b'<AppendedData encoding="raw">')
+    base = text.index(b"_",base)+1
+    header = text[:base].decode("ascii")
+    ElementTree.fromstring(header[:header.rindex("<AppendedData")] +
+                           "</VTKFile>")   # The XML part is well-formed
+    arrays = {}
+    for match in re.finditer(r'<DataArray type="(\w+)" Name="(\w+)"[^>]*'
+                             r'offset="(\d+)"',header):
+        kind,name,offset = match.groups()
+        start = base+int(offset)
+        size = int(np.frombuffer(text[start:start+8],"<u8")[0])
+        dtype = {"Float32":"<f4","Float64":"<f8"}[kind]
+        arrays[name] = np.frombuffer(text[start+8:start+8+size],dtype)
+    return arrays
+
+
+def test_vtk_arrays(blocks,tmp_path):
+    block = blocks[0]
+    filename = str(tmp_path/"tally.vtr")
+    MMPP.WriteVTKfile(filename,block)
+    arrays = _ReadVTK(filename)
+    edges = MMPP._BlockEdges(block)
+    for k in range(0,3):
+        assert np.array_equal(arrays["xyz"[k]],edges[k])
+    assert np.array_equal(arrays["e_bounds"],edges[3])
+    for g,label in enumerate(["g0","g1","total"]):
+        # VTK cell data runs x fastest
+        assert np.array_equal(arrays["values_" + label],
+                              block.values[g].ravel(order="F"))
+        assert np.array_equal(arrays["rel_error_" + label],
+                              block.rel_error[g].ravel(order="F"))
+
+
+def test_vtk_groups_and_dtype(blocks,tmp_path):
+    filename = str(tmp_path/"tally.vtr")
+    MMPP.WriteVTKfile(filename,blocks[0],groups=[-1],dtype=np.float32)
+    arrays = _ReadVTK(filename)
+    assert sorted(n for n in arrays if "_" in n and n != "e_bounds") == \
+           ["rel_error_total","values_total"]
+    assert arrays["values_total"].dtype == np.float32
+    assert np.allclose(arrays["values_total"],
+                       blocks[0].values[-1].ravel(order="F"),rtol=1e-7)
+
+
+def test_xdmf(blocks,tmp_path):
+    filename = str(tmp_path/"tallies.xdmf")
+    MMPP.WriteXDMFfile(filename,blocks)
+    heavy = np.fromfile(str(tmp_path/"tallies.bin"),dtype=np.uint8)
+    grids = ElementTree.parse(filename).getroot().findall(
+        "./Domain/Grid/Grid")
+    assert [g.get("Name") for g in grids] == ["tally_4","tally_14"]
+
+    def load(item):
+        count = int(np.prod([int(d) for d in item.get("Dimensions").split()]))
+        seek = int(item.get("Seek"))
+        dtype = "<f%s" % item.get("Precision")
+        size = count*int(item.get("Precision"))
+        assert item.text == "tallies.bin"
+        return heavy[seek:seek+size].view(dtype)
+
+    for grid,block in zip(grids,blocks):
+        edges = MMPP._BlockEdges(block)
+        items = grid.findall("./Geometry/DataItem")
+        for k in range(0,3):
+            assert np.array_equal(load(items[k]),edges[k])
+        attributes = {a.get("Name"):a for a in grid.findall("Attribute")}
+        assert np.array_equal(load(attributes["values_g1"][0]),
+                              block.values[1].ravel(order="F"))
+        assert np.array_equal(load(attributes["rel_error_total"][0]),
+                              block.rel_error[-1].ravel(order="F"))
+        assert grid.find("Topology").get("Dimensions") == "6 4 5"
+    assert os.path.getsize(str(tmp_path/"tallies.bin")) == heavy.size
@@ -0,0 +1,84 @@
+"""Response folding and energy-group collapse."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture(params=["full","compact","sparse"])
+def block(meshtal,request):
+    path = meshtal(nx=4,ny=3,nz=5,num_groups=3,zero_fraction=0.3)
+    return MMPP.ReadMeshtalfile(path,layout=request.param)[0]
+
+
+def _Fold(block,weights):
+    """sum_g w_g*v_g and its relative error, group by group."""
+    v = sum(w*block.values[g] for g,w in enumerate(weights))
+    var = sum((w*block.values[g]*block.rel_error[g])**2
+              for g,w in enumerate(weights))
+    u = np.zeros(v.shape)
+    u[v != 0] = np.sqrt(var[v != 0])/np.abs(v[v != 0])
+    return v,u
+
+
+def test_fold_groups(block):
+    weights = [0.5,2.0,1.5,0.0]
+    values,rel_error = block.FoldGroups(weights)
+    expected = _Fold(block,weights)
+    assert np.allclose(values,expected[0],rtol=1e-13)
+    assert np.allclose(rel_error,expected[1],rtol=1e-12)
+
+    both = block.FoldGroups([weights,[0.0,0.0,0.0,1.0]])[0]
+    assert both.shape == (2,block.nx,block.ny,block.nz)
+    assert np.allclose(both[1],block.values[-1],rtol=1e-15)
+    with pytest.raises(ValueError):
+        block.FoldGroups([1.0,1.0])
+
+
+def test_fold_response(block):
+    mids = MMPP._EnergyGroupMidpoints(block)
+    # Log-log interpolation reproduces a power law exactly
+    energies = np.geomspace(1.0e-3,100.0,7)
+    response = MMPP.ResponseFunction(energies,3.0*energies**0.7)
+    values,rel_error = block.FoldResponse(response)
+    expected = _Fold(block,list(3.0*mids**0.7)+[0.0])
+    assert np.allclose(values,expected[0],rtol=1e-12)
+    assert np.allclose(rel_error,expected[1],rtol=1e-10)
+
+    table = block.FoldResponse((energies,3.0*energies**0.7),groups=[1])
+    assert np.allclose(table[0],3.0*mids[1]**0.7*block.values[1],
+                       rtol=1e-12)
+    with pytest.raises(ValueError):
+        block.FoldResponse(response,groups=[0,-1])
+
+
+def test_response_table_checks():
+    with pytest.raises(ValueError):
+        MMPP.ResponseFunction([1.0,0.5],[1.0,2.0])
+    with pytest.raises(ValueError):
+        MMPP.ResponseFunction([1.0,2.0],[1.0])
+    response = MMPP.ResponseFunction([1.0,10.0],[2.0,20.0])
+    assert np.allclose(response.Evaluate([0.1,1.0,5.0,100.0]),
+                       [2.0,2.0,10.0,20.0])
+
+
+def test_collapse_onto_existing_bounds(block):
+    collapsed = block.CollapseGroups([2.0,20.0])
+    assert collapsed.layout == block.layout
+    assert collapsed.ng == 3
+    assert list(collapsed.e_bins) == [2.0,20.0]
+    expected = _Fold(block,[1.0,1.0,0.0,0.0])
+    assert np.allclose(collapsed.values[0],expected[0],rtol=1e-13)
+    assert np.allclose(collapsed.rel_error[0],expected[1],rtol=1e-12)
+    assert np.allclose(collapsed.values[1],block.values[2],rtol=1e-15)
+    assert np.allclose(collapsed.values[-1],block.values[-1],rtol=1e-15)
+
+
+def test_collapse_splits_a_group_by_width(block):
+    collapsed = block.CollapseGroups([1.1,20.0])
+    share = (1.1-0.2)/(2.0-0.2)
+    assert np.allclose(collapsed.values[0],
+                       block.values[0]+share*block.values[1],rtol=1e-13)
+    with pytest.raises(ValueError):
+        block.CollapseGroups([2.0,1.0])
@@ -0,0 +1,62 @@
+"""Synthetic meshtal generator and WriteMeshtalfile round trips."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+def test_same_seed_same_file(meshtal):
+    a = meshtal("a.msht",nx=4,ny=3,nz=2,seed=5)
+    b = meshtal("b.msht",nx=4,ny=3,nz=2,seed=5)
+    c = meshtal("c.msht",nx=4,ny=3,nz=2,seed=6)
+    with open(a,"rb") as fa, open(b,"rb") as fb, open(c,"rb") as fc:
+        text = fa.read()
+        assert text == fb.read()
+        assert text != fc.read()
+
+
+def test_mesh_and_groups(meshtal):
+    block = MMPP.ReadMeshtalfile(meshtal(nx=4,ny=5,nz=2,num_groups=3,
+                                         extent=10.0,particle="photon"))[0]
+    assert (block.nx,block.ny,block.nz,block.ng) == (4,5,2,4)
+    assert block.bin_lows[0:3] == [-5.0,-5.0,-5.0]
+    assert block.x_bins[-1] == 5.0
+    assert np.allclose(block.e_bins,[0.2,2.0,20.0])
+    assert block.particle == "photon"
+
+
+@pytest.mark.parametrize("distribution",["attenuation","uniform",
+                                         "lognormal"])
+def test_distributions(meshtal,distribution):
+    block = MMPP.ReadMeshtalfile(meshtal(nx=10,ny=10,nz=10,num_groups=1,
+                                         distribution=distribution,
+                                         zero_fraction=0.25))[0]
+    v,u = block.values[0],block.rel_error[0]
+    zero = v == 0.0
+    assert 0.15 < zero.mean() < 0.35
+    assert np.all(u[zero] == 0.0)
+    assert np.all(v >= 0.0) and np.all(u[~zero] > 0.0)
+    if distribution == "uniform":
+        assert np.all(v < 1.0)
+
+
+def test_unknown_distribution(tmp_path):
+    with pytest.raises(ValueError):
+        MMPP.GenerateMeshtalfile(str(tmp_path/"x.msht"),distribution="flat")
+
+
+@pytest.mark.parametrize("layout",["full","compact","sparse"])
+@pytest.mark.parametrize("out",["column","ij","jk"])
+def test_write_round_trip(meshtal,tmp_path,layout,out):
+    path = meshtal(nx=4,ny=3,nz=5,num_groups=2,num_tallies=2,
+                   zero_fraction=0.3)
+    blocks = MMPP.ReadMeshtalfile(path,layout=layout)
+    copy = str(tmp_path/"copy.msht")
+    MMPP.WriteMeshtalfile(copy,blocks,out=out)
+    for a,b in zip(blocks,MMPP.ReadMeshtalfile(copy)):
+        assert b.tally_number == a.tally_number
+        assert b.histories == a.histories
+        assert list(b.z_bins) == list(a.z_bins)
+        assert np.array_equal(b.values,a.values)
+        assert np.array_equal(b.rel_error,a.rel_error)
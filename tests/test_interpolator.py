@@ -0,0 +1,110 @@
+"""MeshTalInterpolator: trilinear in space, log-log in energy, with
+propagated relative errors."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture
+def block(meshtal):
+    return MMPP.ReadMeshtalfile(meshtal(nx=5,ny=4,nz=3,num_groups=3))[0]
+
+
+def _SetField(block,values,rel_error=0.1):
+    data = block.data_values.copy()
+    data[...,3] = values
+    data[...,4] = rel_error
+    block.data_values = data
+
+
+def test_centers_give_the_voxel_values(block):
+    sampler = MMPP.MeshTalInterpolator(block)
+    x,y,z = np.meshgrid(block.x_centers,block.y_centers,block.z_centers,
+                        indexing="ij")
+    v,u = sampler.Sample(x,y,z)
+    assert np.allclose(v,block.values[-1],rtol=1e-12,atol=0.0)
+    scoring = block.values[-1] != 0.0
+    assert np.allclose(u[scoring],block.rel_error[-1][scoring],rtol=1e-12)
+
+
+def test_linear_field_is_reproduced(block):
+    x,y,z = np.meshgrid(block.x_centers,block.y_centers,block.z_centers,
+                        indexing="ij")
+    _SetField(block,300.0+x+2.0*y-0.5*z)
+    rng = np.random.default_rng(3)
+    px = rng.uniform(block.x_centers[0],block.x_centers[-1],200)
+    py = rng.uniform(block.y_centers[0],block.y_centers[-1],200)
+    pz = rng.uniform(block.z_centers[0],block.z_centers[-1],200)
+    v,u = MMPP.MeshTalInterpolator(block).Sample(px,py,pz)
+    assert np.allclose(v,300.0+px+2.0*py-0.5*pz,rtol=1e-12)
+
+
+def test_error_of_a_midpoint(block):
+    x = block.x_centers
+    _SetField(block,np.where(np.arange(block.nx) % 2 == 0,1.0,3.0)
+              [np.newaxis,:,np.newaxis,np.newaxis],0.2)
+    v,u = MMPP.MeshTalInterpolator(block).Sample(
+        0.5*(x[0]+x[1]),block.y_centers[1],block.z_centers[1])
+    assert v == pytest.approx(2.0)
+    assert u == pytest.approx(np.sqrt((0.5*0.2*1.0)**2+(0.5*0.2*3.0)**2)/2.0)
+
+
+def test_power_law_spectrum_is_reproduced(block):
+    mids = MMPP._EnergyGroupMidpoints(block)
+    spectrum = np.append(mids**-1.5,0.0)
+    _SetField(block,spectrum[:,np.newaxis,np.newaxis,np.newaxis])
+    e = np.geomspace(mids[0],mids[-1],25)
+    v,u = MMPP.MeshTalInterpolator(block).Sample(0.0,0.0,0.0,e)
+    assert np.allclose(v,e**-1.5,rtol=1e-10)
+    assert np.all(u <= 0.1+1e-12)
+
+
+def test_outside_is_masked(block):
+    v,u = MMPP.MeshTalInterpolator(block).Sample([0.0,80.0],0.0,0.0,
+                                                 [1.0,1.0])
+    assert list(v.mask) == [False,True]
+    v,u = MMPP.MeshTalInterpolator(block).Sample(0.0,0.0,0.0,30.0)
+    assert v.mask
+
+
+@pytest.mark.parametrize("layout",["compact","sparse"])
+def test_layouts_agree(meshtal,layout):
+    path = meshtal(nx=5,ny=4,nz=3,num_groups=3,zero_fraction=0.3)
+    full = MMPP.ReadMeshtalfile(path)[0]
+    other = MMPP.ReadMeshtalfile(path,layout=layout)[0]
+    rng = np.random.default_rng(5)
+    points = rng.uniform(-45.0,45.0,(3,100))
+    e = rng.uniform(0.05,19.0,100)
+    a = MMPP.MeshTalInterpolator(full).Sample(*points,e)
+    b = MMPP.MeshTalInterpolator(other).Sample(*points,e)
+    assert np.allclose(a[0],b[0],rtol=1e-12)
+    assert np.allclose(a[1],b[1],rtol=1e-12)
+
+
+def test_weights_are_reused_for_other_tallies(meshtal):
+    blocks = MMPP.ReadMeshtalfile(meshtal(nx=5,ny=4,nz=3,num_tallies=2))
+    sampler = MMPP.MeshTalInterpolator(blocks[0])
+    weights = sampler.Weights([1.0,-7.0],[3.0,2.0],[0.0,5.0])
+    v,u = sampler.Apply(weights,blocks[1])
+    expected = MMPP.MeshTalInterpolator(blocks[1]).Sample(
+        [1.0,-7.0],[3.0,2.0],[0.0,5.0])
+    assert np.array_equal(v,expected[0])
+
+
+def test_other_mesh_raises(meshtal,block):
+    other = MMPP.ReadMeshtalfile(meshtal("o.msht",nx=3,ny=4,nz=3,
+                                         num_groups=3))[0]
+    sampler = MMPP.MeshTalInterpolator(block)
+    with pytest.raises(ValueError):
+        sampler.Apply(sampler.Weights(0.0,0.0,0.0),other)
+
+
+def test_polyline(block):
+    s,points,v,u = MMPP.MeshTalInterpolator(block).SamplePolyline(
+        [[-40.0,0.0,0.0],[40.0,0.0,0.0],[40.0,30.0,0.0]],num_points=11)
+    assert s[-1] == pytest.approx(110.0)
+    assert np.allclose(points[0],[-40.0,0.0,0.0])
+    assert np.allclose(points[-1],[40.0,30.0,0.0])
+    assert v.shape == (11,)
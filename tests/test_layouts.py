@@ -0,0 +1,50 @@
+"""Compact storage layout: the same data as the full tensor, read
+directly or converted, in float64 or float32."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture
+def path(meshtal):
+    return meshtal(nx=5,ny=4,nz=3,num_groups=2,num_tallies=2)
+
+
+@pytest.mark.parametrize("bulk",[True,False])
+def test_compact_read_matches_full(path,bulk):
+    full = MMPP.ReadMeshtalfile(path)
+    compact = MMPP.ReadMeshtalfile(path,layout="compact",bulk=bulk)
+    for a,b in zip(full,compact):
+        assert b.layout == "compact"
+        assert np.array_equal(a.data_values,b.data_values)
+        assert np.array_equal(a.values,b.values)
+        assert np.array_equal(a.rel_error,b.rel_error)
+        assert np.array_equal(a.z_centers,b.z_centers)
+        assert b.values.flags.c_contiguous
+
+
+def test_to_compact_releases_the_tensor(path):
+    block = MMPP.ReadMeshtalfile(path)[0]
+    expected = block.data_values.copy()
+    block.ToCompact()
+    assert block.layout == "compact"
+    assert len(block._data_values) == 0
+    assert np.array_equal(block.data_values,expected)
+
+
+def test_float32_storage(path):
+    full = MMPP.ReadMeshtalfile(path)[0]
+    block = MMPP.ReadMeshtalfile(path,layout="compact",dtype=np.float32)[0]
+    assert block.values.dtype == np.float32
+    assert block.values.nbytes == full.values.size*4
+    assert np.allclose(block.values,full.values,rtol=1e-6,atol=0.0)
+
+
+def test_slices_agree_across_layouts(path):
+    full = MMPP.ReadMeshtalfile(path)[1]
+    compact = MMPP.ReadMeshtalfile(path,layout="compact")[1]
+    for axis in range(0,3):
+        for a,b in zip(full.slice(axis,1,0),compact.slice(axis,1,0)):
+            assert np.array_equal(a,b)
@@ -0,0 +1,38 @@
+"""Lazy reads from the mapped file and from the sidecar cache."""
+
+import numpy as np
+
+import MMPP
+
+
+def test_lazy_blocks_parse_on_first_access(meshtal):
+    path = meshtal(nx=5,ny=4,nz=3,num_tallies=3)
+    eager = MMPP.ReadMeshtalfile(path)
+    lazy = MMPP.ReadMeshtalfile(path,lazy=True)
+    assert not any(b.IsLoaded() for b in lazy)
+    assert np.array_equal(lazy[1].values,eager[1].values)
+    assert [b.IsLoaded() for b in lazy] == [False,True,False]
+
+
+def test_lazy_is_honored_for_cached_reads(meshtal):
+    path = meshtal(nx=5,ny=4,nz=3,num_tallies=2)
+    first = MMPP.ReadMeshtalfile(path,lazy=True,cache=True)
+    # Writing the cache needs every block parsed
+    assert all(b.IsLoaded() for b in first)
+    for use_mmap in (True,False):
+        cached = MMPP.ReadMeshtalfile(path,lazy=True,cache=True,
+                                      cache_mmap=use_mmap)
+        assert not any(b.IsLoaded() for b in cached)
+        assert np.array_equal(cached[0].data_values,first[0].data_values)
+        assert cached[0].IsLoaded() and not cached[1].IsLoaded()
+
+
+def test_lazy_cached_compact_blocks_keep_their_layout(meshtal):
+    path = meshtal(nx=5,ny=4,nz=3)
+    first = MMPP.ReadMeshtalfile(path,layout="compact",dtype=np.float32,
+                                 cache=True)
+    cached = MMPP.ReadMeshtalfile(path,layout="compact",dtype=np.float32,
+                                  cache=True,lazy=True)
+    assert cached[0].layout == "compact" and not cached[0].IsLoaded()
+    assert np.array_equal(cached[0].values,first[0].values)
+    assert cached[0].values.dtype == np.float32
@@ -0,0 +1,44 @@
+"""Logging instead of prints, phase statistics and progress callbacks."""
+
+import logging
+
+import pytest
+
+import MMPP
+
+
+def test_reading_prints_nothing_and_logs(meshtal,capsys,caplog):
+    path = meshtal(nx=4,ny=3,nz=2)
+    with caplog.at_level(logging.INFO,logger="MMPP"):
+        MMPP.ReadMeshtalfile(path)
+        MMPP.ReadMeshtalfile(path,bulk=False)
+    assert capsys.readouterr().out == ""
+    assert any("Reading file" in r.getMessage() for r in caplog.records)
+
+
+def test_phases_are_recorded(meshtal):
+    path = meshtal(nx=4,ny=3,nz=2,num_groups=1)
+    MMPP.stats.Reset()
+    MMPP.ReadMeshtalfile(path)
+    phases = MMPP.stats.phases
+    assert phases["parse"]["calls"] == 1
+    assert phases["parse"]["rows"] == 2*4*3*2
+
+
+@pytest.mark.parametrize("bulk",[True,False])
+def test_progress_reaches_the_total(meshtal,bulk):
+    path = meshtal(nx=6,ny=5,nz=4,num_tallies=2)
+    calls = []
+    MMPP.ReadMeshtalfile(path,bulk=bulk,
+                         progress=lambda done,total: calls.append((done,total)))
+    assert calls
+    assert calls[-1][0] == calls[-1][1]
+    assert all(a[0] <= b[0] for a,b in zip(calls,calls[1:]))
+
+
+def test_plane_of_a_single_bin_raises(meshtal):
+    block = MMPP.ReadMeshtalfile(meshtal(nx=4,ny=1,nz=3))[0]
+    with pytest.raises(ValueError):
+        block.UnpackGivenXE_bins(0,0)
+    s,t,v,u = block.UnpackGivenYE_bins(0,0)
+    assert v.shape == (4,3)
@@ -0,0 +1,79 @@
+"""MergeMeshtalfiles: history-weighted and inverse-variance means of
+independent runs."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture
+def runs(meshtal):
+    return [meshtal("run%d.msht" % k,nx=4,ny=3,nz=2,num_tallies=2,seed=k,
+                    zero_fraction=0.2,histories=h)
+            for k,h in enumerate([1.0e6,2.0e6,1.0e6])]
+
+
+def _Inputs(runs,t):
+    blocks = [MMPP.ReadMeshtalfile(path)[t] for path in runs]
+    return np.array([b.values for b in blocks]), \
+           np.array([b.rel_error for b in blocks])
+
+
+def test_history_weighted_mean(runs):
+    merged = MMPP.MergeMeshtalfiles(runs)
+    w = np.array([0.25,0.5,0.25])[:,None,None,None,None]
+    for t in range(0,2):
+        v,u = _Inputs(runs,t)
+        mean = np.sum(w*v,axis=0)
+        sigma = np.sqrt(np.sum((w*v*u)**2,axis=0))
+        assert np.allclose(merged[t].values,mean,rtol=1e-13)
+        scoring = mean != 0.0
+        assert np.allclose(merged[t].rel_error[scoring],
+                           sigma[scoring]/mean[scoring],rtol=1e-12)
+        assert merged[t].histories == 4.0e6
+
+
+def test_inverse_variance_mean(runs):
+    merged = MMPP.MergeMeshtalfiles(runs,weighting="inverse_variance")
+    v,u = _Inputs(runs,1)
+    sigma = v*u
+    weight = np.where(sigma > 0.0,1.0/np.where(sigma > 0.0,sigma,1.0)**2,
+                      0.0)
+    total = weight.sum(axis=0)
+    scored = total > 0.0
+    mean = np.sum(weight*v,axis=0)[scored]/total[scored]
+    assert np.allclose(merged[1].values[scored],mean,rtol=1e-12)
+    assert np.allclose(merged[1].rel_error[scored],
+                       np.sqrt(1.0/total[scored])/mean,rtol=1e-12)
+    assert not np.any(merged[1].values[~scored])
+
+
+def test_a_run_merged_with_itself(runs):
+    block = MMPP.ReadMeshtalfile(runs[0])[0]
+    merged = MMPP.MergeMeshtalfiles([runs[0],runs[0]])[0]
+    assert np.allclose(merged.values,block.values,rtol=1e-15)
+    assert np.allclose(merged.rel_error,block.rel_error/np.sqrt(2.0),
+                       rtol=1e-13)
+
+
+def test_output_file_and_workers(runs,tmp_path):
+    out = str(tmp_path/"merged.msht")
+    merged = MMPP.MergeMeshtalfiles(runs,out,layout="compact")
+    parallel = MMPP.MergeMeshtalfiles(runs,workers=2,layout="sparse")
+    written = MMPP.ReadMeshtalfile(out)
+    for a,b,c in zip(merged,parallel,written):
+        assert a.layout == "compact" and b.layout == "sparse"
+        assert np.array_equal(a.values,b.values)
+        assert np.allclose(c.values,a.values,rtol=1e-5)
+        assert c.histories == 4.0e6
+
+
+def test_mismatched_meshes_raise(runs,meshtal):
+    other = meshtal("other.msht",nx=5,ny=3,nz=2,num_tallies=2)
+    with pytest.raises(ValueError):
+        MMPP.MergeMeshtalfiles([runs[0],other])
+    with pytest.raises(ValueError):
+        MMPP.MergeMeshtalfiles(runs,weighting="equal")
+    with pytest.raises(ValueError):
+        MMPP.MergeMeshtalfiles(runs,histories=[1.0,0.0,1.0])
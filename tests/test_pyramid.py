@@ -0,0 +1,47 @@
+"""Level-of-detail pyramid: coarse planes and the bin chosen for a
+coordinate on a bin boundary."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture
+def block(meshtal):
+    return MMPP.ReadMeshtalfile(meshtal(nx=8,ny=6,nz=4,num_groups=1))[0]
+
+
+@pytest.mark.parametrize("axis",["x","y","z"])
+def test_boundary_coordinate_picks_the_lower_bin(block,axis):
+    c = MMPP._AxisNumber(axis)
+    bins = (block.x_bins,block.y_bins,block.z_bins)[c]
+    unpack = (block.UnpackGivenXE,block.UnpackGivenYE,block.UnpackGivenZE)[c]
+    value = float(bins[1])
+    point = [0.0,0.0,0.0]
+    point[c] = value
+    index = MMPP.MeshTalBlock.FindBins(block,*point)[c]
+    assert index == 1
+    s,t,v,u,level = block.PyramidSlice(axis,value,block.ng-1)
+    assert level == 0
+    assert np.array_equal(v,block.slice(c,1,block.ng-1)[2])
+    assert np.array_equal(v,unpack(value,block.ng-1)[2])
+
+
+def test_boundary_coordinate_in_a_coarse_level(block):
+    pyramid = block.BuildPyramid(min_cells=4)
+    assert len(pyramid) == 1
+    value = float(block.x_bins[1])
+    s,t,v,u,level = block.PyramidSlice("x",value,0,resolution=2)
+    assert level == 1
+    assert np.array_equal(v,pyramid.values[0][0,0])
+    assert np.array_equal(u,pyramid.rel_error[0][0,0])
+
+
+def test_coordinates_outside_the_mesh_are_clamped(block):
+    first = block.slice(0,0,0)[2]
+    last = block.slice(0,block.nx-1,0)[2]
+    assert np.array_equal(block.PyramidSlice("x",-1.0e6,0)[2],first)
+    assert np.array_equal(block.PyramidSlice("x",1.0e6,0)[2],last)
+    assert np.array_equal(block.PyramidSlice("x",block.bin_lows[0],0)[2],
+                          first)
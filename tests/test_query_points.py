@@ -0,0 +1,64 @@
+"""Batched point queries (FindBins and QueryPoints) against a loop
+over the points."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+def _LoopBin(upper_bounds,low,value,on_bound_lower=True):
+    """Bin of one value by walking the bounds; -1 outside."""
+    if not (value >= low):
+        return -1
+    for i,upper in enumerate(upper_bounds):
+        if (value <= upper) if on_bound_lower else (value < upper):
+            return i
+    return -1
+
+
+@pytest.fixture
+def block(meshtal):
+    return MMPP.ReadMeshtalfile(meshtal(nx=6,ny=5,nz=4,num_groups=3))[0]
+
+
+def test_random_points_match_a_loop(block):
+    rng = np.random.default_rng(1)
+    x,y,z = rng.uniform(-60.0,60.0,(3,500))
+    e = rng.uniform(0.0,25.0,500)
+    ix,iy,iz,ie,v,u = block.QueryPoints(x,y,z,e)
+    for k in range(0,500):
+        expected = (_LoopBin(block.x_bins,block.bin_lows[0],x[k]),
+                    _LoopBin(block.y_bins,block.bin_lows[1],y[k]),
+                    _LoopBin(block.z_bins,block.bin_lows[2],z[k]),
+                    _LoopBin(block.e_bins,block.bin_lows[3],e[k],False))
+        assert (ix[k],iy[k],iz[k],ie[k]) == expected
+        if min(expected) < 0:
+            assert v.mask[k] and u.mask[k]
+        else:
+            a,b,c,g = expected
+            assert v[k] == block.values[g,a,b,c]
+            assert u[k] == block.rel_error[g,a,b,c]
+
+
+def test_points_on_boundaries(block):
+    bounds = [block.bin_lows[0]] + list(block.x_bins)
+    ix = block.FindBins(bounds,0.0,0.0)[0]
+    assert list(ix) == [0] + list(range(0,block.nx))
+    ie = block.FindBins(0.0,0.0,0.0,block.e_bins[0])[3]
+    assert ie == 1
+
+
+def test_total_when_no_energy(block):
+    ix,iy,iz,ie,v,u = block.QueryPoints(block.x_centers,block.y_centers[2],
+                                        block.z_centers[1])
+    assert np.all(ie == block.ng-1)
+    assert np.array_equal(v,block.line("x",2,1,block.ng-1)[1])
+
+
+def test_broadcasting(block):
+    x = block.x_centers[:,np.newaxis]
+    y = block.y_centers[np.newaxis,:]
+    ix,iy,iz,ie,v,u = block.QueryPoints(x,y,block.z_centers[1])
+    assert v.shape == (block.nx,block.ny)
+    assert np.array_equal(v,block.slice(2,1,block.ng-1)[2])
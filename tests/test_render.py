@@ -0,0 +1,57 @@
+"""RenderSlices and the command line: .npz dumps, PNG frames, the
+process pool and the opt-in sidecar cache."""
+
+import os
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture
+def path(meshtal):
+    return meshtal("run.msht",nx=4,ny=3,nz=5,num_groups=1,num_tallies=2)
+
+
+@pytest.mark.parametrize("workers",[1,2])
+def test_npz_slices_match_the_blocks(path,tmp_path,workers):
+    out = str(tmp_path/"frames")
+    filenames = MMPP.RenderSlices([path],out,tallies=[14],axes=("x","z"),
+                                  fmt="npz",workers=workers)
+    assert len(filenames) == 4+5
+    block = MMPP.ReadMeshtalfile(path)[1]
+    with np.load(os.path.join(out,"run_t14_z0002_e1.npz")) as frame:
+        assert np.array_equal(frame["values"],block.slice(2,2,1)[2])
+        assert np.array_equal(frame["rel_error"],block.slice(2,2,1)[3])
+        assert len(frame["x_edges"]) == block.nx+1
+    assert not os.path.exists(path + ".mmpp")
+    assert MMPP._RENDER_BLOCKS == {}
+
+
+def test_cache_is_opt_in(path,tmp_path):
+    MMPP.RenderSlices([path],str(tmp_path/"frames"),fmt="npz",workers=2,
+                      bins="0",cache=True)
+    assert os.path.isdir(path + ".mmpp")
+    MMPP.ClearMeshtalCache(path)
+
+
+def test_png_frames(path,tmp_path):
+    pytest.importorskip("matplotlib")
+    out = str(tmp_path/"frames")
+    filenames = MMPP.RenderSlices([path],out,tallies=[4],bins="1",
+                                  workers=1)
+    assert [os.path.basename(f) for f in filenames] == \
+           ["run_t4_z0001_e1_values.png","run_t4_z0001_e1_rel_error.png"]
+    for filename in filenames:
+        with open(filename,"rb") as image:
+            assert image.read(8) == b"\x89PNG\r\n\x1a\n"
+
+
+def test_command_line(path,tmp_path,capsys):
+    out = str(tmp_path/"arrays")
+    assert MMPP.main([path,"--format","npz","--bins","0:2","--workers","1",
+                      "--out",out]) == 0
+    assert "Wrote 4 files" in capsys.readouterr().out
+    assert len(os.listdir(out)) == 4
+    assert not os.path.exists(path + ".mmpp")
@@ -0,0 +1,73 @@
+"""Header-only catalog (ScanMeshtalfile) and the byte-offset index."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture
+def path(meshtal):
+    return meshtal(nx=5,ny=4,nz=3,num_groups=2,num_tallies=3,
+                   particle="photon",histories=2.5e7)
+
+
+def test_catalog_matches_the_blocks(path):
+    infos = MMPP.ScanMeshtalfile(path)
+    blocks = MMPP.ReadMeshtalfile(path)
+    assert [i.tally_number for i in infos] == [4,14,24]
+    for info,block in zip(infos,blocks):
+        assert info.particle == block.particle
+        assert info.histories == 2.5e7
+        assert info.format == "column"
+        assert info.x_bins == list(block.x_bins)
+        assert info.e_bins == list(block.e_bins)
+        assert (info.nx,info.ny,info.nz,info.ng) == (5,4,3,3)
+        assert info.data_bytes > 0
+    lower,upper = infos[0].Bounds()
+    assert lower[0:3] == [-50.0,-50.0,-50.0]
+    assert upper == [50.0,50.0,50.0,20.0]
+
+
+def test_offsets_point_at_the_header_lines(path):
+    with open(path,"rb") as mfile:
+        text = mfile.read()
+    for entry in MMPP.IndexMeshtalfile(path):
+        assert text[entry.header_offset:].lstrip().startswith(
+            b"Mesh Tally Number")
+        assert text[entry.x_offset:].lstrip().startswith(b"X direction")
+        assert text[entry.e_offset:].lstrip().startswith(b"Energy")
+        row = text[entry.data_offset:entry.data_offset+entry.row_len]
+        assert row.endswith(b"\n") and len(row.split()) == 6
+        assert entry.num_rows == 3*5*4*3
+
+
+def test_to_block_reads_one_tally(path):
+    info = MMPP.ScanMeshtalfile(path)[1]
+    block = info.ToBlock(layout="compact")
+    expected = MMPP.ReadMeshtalfile(path)[1]
+    assert block.layout == "compact"
+    assert np.array_equal(block.values,expected.values)
+    assert np.array_equal(block.rel_error,expected.rel_error)
+
+
+def test_matrix_format_is_listed(meshtal):
+    path = meshtal(nx=3,ny=4,nz=2,out="jk")
+    info = MMPP.ScanMeshtalfile(path)[0]
+    assert info.format == "matrix"
+    assert np.array_equal(info.ToBlock().values,
+                          MMPP.ReadMeshtalfile(path)[0].values)
+
+
+def test_changed_file_is_refused(path,meshtal):
+    info = MMPP.ScanMeshtalfile(path)[0]
+    meshtal(nx=5,ny=4,nz=3,num_groups=2,num_tallies=3,seed=2,
+            histories=1.0e7)
+    with pytest.raises(ValueError):
+        info.ToBlock()
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path/"empty.msht"
+    path.write_bytes(b"")
+    assert MMPP.ScanMeshtalfile(str(path)) == []
@@ -0,0 +1,94 @@
+"""Binary sidecar cache of ReadMeshtalfile and its invalidation."""
+
+import os
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+def _Parsed():
+    return MMPP.stats.phases.get("parse",{"calls":0})["calls"]
+
+
+@pytest.fixture
+def path(meshtal):
+    return meshtal(nx=5,ny=4,nz=3,num_tallies=2,zero_fraction=0.3)
+
+
+@pytest.mark.parametrize("layout",["full","compact","sparse"])
+def test_second_read_comes_from_the_cache(path,layout):
+    first = MMPP.ReadMeshtalfile(path,layout=layout,cache=True)
+    assert os.path.isfile(os.path.join(path + ".mmpp","header.json"))
+    MMPP.stats.Reset()
+    cached = MMPP.ReadMeshtalfile(path,layout=layout,cache=True)
+    assert _Parsed() == 0
+    for a,b in zip(first,cached):
+        assert b.layout == layout
+        assert b.tally_number == a.tally_number
+        assert b.histories == a.histories
+        assert list(b.x_bins) == list(a.x_bins)
+        assert np.array_equal(a.values,b.values)
+        assert np.array_equal(a.rel_error,b.rel_error)
+
+
+def test_mapped_arrays_are_read_only(path):
+    MMPP.ReadMeshtalfile(path,cache=True)
+    block = MMPP.ReadMeshtalfile(path,cache=True)[0]
+    assert isinstance(block.data_values,np.memmap)
+    assert not block.data_values.flags.writeable
+    block = MMPP.ReadMeshtalfile(path,cache=True,cache_mmap=False)[0]
+    assert not isinstance(block.data_values,np.memmap)
+
+
+def test_modified_source_invalidates(path,meshtal):
+    MMPP.ReadMeshtalfile(path,cache=True)
+    meshtal(nx=5,ny=4,nz=3,num_tallies=2,seed=7)
+    MMPP.stats.Reset()
+    blocks = MMPP.ReadMeshtalfile(path,cache=True)
+    assert _Parsed() > 0
+    assert np.array_equal(blocks[0].values,
+                          MMPP.ReadMeshtalfile(path)[0].values)
+
+
+def test_other_layout_or_dtype_reparses(path):
+    MMPP.ReadMeshtalfile(path,cache=True)
+    MMPP.stats.Reset()
+    MMPP.ReadMeshtalfile(path,layout="compact",dtype=np.float32,cache=True)
+    assert _Parsed() > 0
+
+
+def test_content_hash_catches_same_size_and_mtime(path):
+    MMPP.ReadMeshtalfile(path,cache=True,cache_hash=True)
+    stat = os.stat(path)
+    with open(path,"r+b") as mfile:
+        text = mfile.read()
+        pos = text.rindex(b"E-")
+        mfile.seek(pos)
+        mfile.write(b"E+")
+    os.utime(path,ns=(stat.st_atime_ns,stat.st_mtime_ns))
+
+    MMPP.stats.Reset()
+    MMPP.ReadMeshtalfile(path,cache=True)
+    assert _Parsed() == 0
+    MMPP.ReadMeshtalfile(path,cache=True,cache_hash=True)
+    assert _Parsed() > 0
+
+
+def test_clear(path):
+    MMPP.ReadMeshtalfile(path,cache=True)
+    MMPP.ClearMeshtalCache(path)
+    assert not os.path.exists(path + ".mmpp")
+    MMPP.ClearMeshtalCache(path)
+
+
+@pytest.mark.parametrize("layout",["full","compact","sparse"])
+def test_cached_read_keeps_the_dtype(path,layout):
+    cold = MMPP.ReadMeshtalfile(path,layout=layout,dtype=np.float32,
+                                cache=True)
+    warm = MMPP.ReadMeshtalfile(path,layout=layout,dtype=np.float32,
+                                cache=True)
+    for a,b in zip(cold,warm):
+        assert a.dtype == np.float32
+        assert b.dtype == a.dtype
@@ -0,0 +1,73 @@
+"""slice, line and the UnpackGiven* methods against the element-wise
+loops they replaced."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+def _LoopPlane(block,axis,index,e):
+    """The 2D plane as the original UnpackGiven*E_bins loops built it."""
+    c0,c1 = [k for k in range(0,3) if k != axis]
+    n = (block.nx,block.ny,block.nz)
+    out = [np.zeros([n[c0],n[c1]]) for k in range(0,4)]
+    for i in range(0,n[c0]):
+        for j in range(0,n[c1]):
+            sel = [e,0,0,0]
+            sel[1+axis],sel[1+c0],sel[1+c1] = index,i,j
+            row = block.data_values[tuple(sel)]
+            for k,c in enumerate((c0,c1,3,4)):
+                out[k][i,j] = row[c]
+    return out
+
+
+@pytest.fixture
+def block(meshtal):
+    return MMPP.ReadMeshtalfile(meshtal(nx=5,ny=4,nz=3,num_groups=2))[0]
+
+
+@pytest.mark.parametrize("axis",[0,1,2])
+def test_planes_match_the_loops(block,axis):
+    unpack = (block.UnpackGivenXE_bins,block.UnpackGivenYE_bins,
+              block.UnpackGivenZE_bins)[axis]
+    for got in (block.slice(axis,2,1),block.slice("xyz"[axis],2,1,True),
+                unpack(2,1)):
+        for a,b in zip(got,_LoopPlane(block,axis,2,1)):
+            assert np.array_equal(a,b)
+
+
+def test_lines_match_the_loops(block):
+    s,v = block.UnpackGivenXYE(3,1,0)
+    assert np.array_equal(s,block.data_values[0,3,1,:,2])
+    assert np.array_equal(v,block.data_values[0,3,1,:,3])
+    s,v = block.UnpackGivenXZE(3,2,0)
+    assert np.array_equal(v,block.data_values[0,3,:,2,3])
+    s,v,u = block.line("x",1,2,2)
+    assert np.array_equal(s,block.x_centers)
+    assert np.array_equal(u,block.data_values[2,:,1,2,4])
+
+
+def test_views_and_copies(block):
+    s,t,v,u = block.slice(2,1,0)
+    assert np.shares_memory(v,block.data_values)
+    s,t,v,u = block.slice(2,1,0,copy=True)
+    assert not np.shares_memory(v,block.data_values)
+    assert all(a.flags.c_contiguous for a in (s,t,v,u))
+    v[...] = 0.0
+    assert np.any(block.slice(2,1,0)[2] != 0.0)
+
+
+def test_unpack_copies_by_default(block):
+    v = block.UnpackGivenYE_bins(1,0)[2]
+    assert not np.shares_memory(v,block.data_values)
+    v = block.UnpackGivenYE_bins(1,0,copy=False)[2]
+    assert np.shares_memory(v,block.data_values)
+
+
+def test_coordinate_choice(block):
+    x = float(block.x_centers[3])
+    assert np.array_equal(block.UnpackGivenXE(x,1)[2],
+                          block.slice(0,3,1)[2])
+    assert np.array_equal(block.UnpackGivenXE(1.0e6,1)[2],
+                          block.slice(0,block.nx-1,1)[2])
@@ -0,0 +1,63 @@
+"""Sparse storage layout for mostly-zero tallies."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture
+def path(meshtal):
+    return meshtal(nx=6,ny=5,nz=4,num_groups=2,zero_fraction=0.8)
+
+
+@pytest.mark.parametrize("lazy",[False,True])
+def test_sparse_read_matches_full(path,lazy):
+    full = MMPP.ReadMeshtalfile(path)[0]
+    block = MMPP.ReadMeshtalfile(path,layout="sparse",lazy=lazy)[0]
+    assert block.layout == "sparse"
+    assert np.array_equal(block.values,full.values)
+    assert np.array_equal(block.rel_error,full.rel_error)
+    index,values,errors = block.NonzeroVoxels()
+    assert len(index) == np.count_nonzero((full.values != 0.0) |
+                                          (full.rel_error != 0.0))
+    assert np.all(np.diff(index) > 0)
+
+
+def test_line_parser_fills_sparse_too(path):
+    full = MMPP.ReadMeshtalfile(path)[0]
+    block = MMPP.ReadMeshtalfile(path,layout="sparse",bulk=False)[0]
+    assert np.array_equal(block.values,full.values)
+
+
+def test_conversions_round_trip(path):
+    full = MMPP.ReadMeshtalfile(path)[0]
+    block = MMPP.ReadMeshtalfile(path)[0]
+    block.ToSparse()
+    assert block.layout == "sparse"
+    block.ToCompact()
+    assert block.layout == "compact"
+    assert np.array_equal(block.values,full.values)
+    assert np.array_equal(block.data_values,full.data_values)
+
+
+def test_queries_without_densifying(path):
+    full = MMPP.ReadMeshtalfile(path)[0]
+    block = MMPP.ReadMeshtalfile(path,layout="sparse")[0]
+    for axis in range(0,3):
+        assert np.array_equal(block.slice(axis,2,1)[2],
+                              full.slice(axis,2,1)[2])
+    assert np.array_equal(block.line("y",1,3,0)[1],
+                          full.line("y",1,3,0)[1])
+    x = full.x_centers[[0,2,5]]
+    y = full.y_centers[[1,1,4]]
+    z = full.z_centers[[3,0,2]]
+    assert np.array_equal(block.QueryPoints(x,y,z)[4],
+                          full.QueryPoints(x,y,z)[4])
+
+
+def test_all_zero_tally(meshtal):
+    path = meshtal(nx=3,ny=3,nz=3,num_groups=1,zero_fraction=1.0)
+    block = MMPP.ReadMeshtalfile(path,layout="sparse")[0]
+    assert len(block.NonzeroVoxels()[0]) == 0
+    assert not np.any(block.values)
@@ -0,0 +1,93 @@
+"""Out-of-core stream reductions against the same sums over a parsed
+block."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.fixture(params=["column","ij"])
+def tally(meshtal,request):
+    path = meshtal(nx=5,ny=4,nz=3,num_groups=2,zero_fraction=0.2,
+                   out=request.param)
+    info = MMPP.ScanMeshtalfile(path)[0]
+    block = MMPP.ReadMeshtalfile(path)[0]
+    widths = [np.diff(e) for e in MMPP._BlockEdges(block)[0:3]]
+    volume = widths[0][:,None,None]*widths[1][None,:,None] * \
+             widths[2][None,None,:]
+    return MMPP.MeshTalStream(info,chunk_rows=17),block,volume
+
+
+def test_chunks_cover_every_voxel_once(tally):
+    stream,block,volume = tally
+    seen = np.zeros(stream.shape,dtype=int)
+    values = np.zeros(stream.shape)
+    for chunk in stream.Chunks():
+        np.add.at(seen,(chunk.g,chunk.ix,chunk.iy,chunk.iz),1)
+        values[chunk.g,chunk.ix,chunk.iy,chunk.iz] = chunk.values
+        assert np.allclose(chunk.volume,
+                           volume[chunk.ix,chunk.iy,chunk.iz])
+    assert np.all(seen == 1)
+    assert np.array_equal(values,block.values)
+
+
+def test_energy_integral(tally,tmp_path):
+    stream,block,volume = tally
+    v,u = block.values[:-1],block.rel_error[:-1]
+    total = v.sum(axis=0)
+    sigma = np.sqrt(np.sum((v*u)**2,axis=0))
+    out = str(tmp_path/"total.npy")
+    values,rel_error = stream.Run(MMPP.StreamEnergyIntegral(values_out=out))
+    assert np.allclose(values,total,rtol=1e-13)
+    assert np.allclose(rel_error[total != 0],
+                       sigma[total != 0]/total[total != 0],rtol=1e-12)
+    assert np.allclose(np.load(out),total,rtol=1e-13)
+
+
+def test_projection_and_region(tally):
+    stream,block,volume = tally
+    integral = block.values*volume
+    variance = (integral*block.rel_error)**2
+    projection,region = stream.Run(
+        MMPP.StreamProjection("z"),
+        MMPP.StreamRegionSum(lower=[-30.0,-50.0,-50.0],upper=[30.0,0.0,50.0]))
+    assert np.allclose(projection[0],integral.sum(axis=(1,2)),rtol=1e-13)
+    assert np.allclose(projection[1],
+                       np.sqrt(variance.sum(axis=(1,2)))/
+                       integral.sum(axis=(1,2)),rtol=1e-12)
+    x,y = block.x_centers,block.y_centers
+    inside = ((np.abs(x) <= 30.0)[:,None,None] &
+              (y <= 0.0)[None,:,None])
+    expected = np.sum(np.where(inside,integral,0.0),axis=(1,2,3))
+    assert np.allclose(region[0],expected,rtol=1e-13)
+    assert region[2] == pytest.approx(np.sum(np.where(
+        inside,volume,0.0)))
+
+
+def test_extrema_and_statistics(tally):
+    stream,block,volume = tally
+    (vmin,imin,vmax,imax),stats = stream.Run(
+        MMPP.StreamExtrema(),MMPP.StreamErrorStatistics(threshold=0.1))
+    for g in range(0,block.ng):
+        v = block.values[g]
+        assert vmin[g] == v.min() and vmax[g] == v.max()
+        assert v[tuple(imax[g])] == v.max()
+        scoring = v != 0.0
+        assert stats["count"][g] == v.size
+        assert stats["scoring"][g] == np.count_nonzero(scoring)
+        assert stats["reliable_fraction"][g] == pytest.approx(
+            np.mean(block.rel_error[g][scoring] <= 0.1))
+        assert stats["mean"][g] == pytest.approx(
+            np.sum(v*volume)/np.sum(volume))
+
+
+def test_to_arrays_and_progress(tally,tmp_path):
+    stream,block,volume = tally
+    calls = []
+    values,rel_error = stream.Run(
+        MMPP.StreamToArrays(str(tmp_path/"v.npy"),str(tmp_path/"u.npy")),
+        progress=lambda done,total: calls.append((done,total)))
+    assert np.array_equal(np.load(str(tmp_path/"v.npy")),block.values)
+    assert np.array_equal(rel_error,block.rel_error)
+    assert calls[-1] == (block.values.size,block.values.size)
@@ -0,0 +1,79 @@
+"""MeshTalWatcher: polls that skip unchanged files and sections, and
+re-parse the tallies of a new dump."""
+
+import os
+
+import numpy as np
+
+import MMPP
+
+
+def _Touch(path):
+    """Changes the modification time, keeping the content."""
+    stat = os.stat(path)
+    os.utime(path,ns=(stat.st_atime_ns,stat.st_mtime_ns-10**9))
+
+
+def _Phase(name):
+    return MMPP.stats.phases.get(name,{"calls":0,"rows":0,"bytes":0})
+
+
+def test_first_poll_reads_every_tally(meshtal):
+    path = meshtal(nx=3,ny=4,nz=2,num_tallies=3)
+    watcher = MMPP.MeshTalWatcher(path,settle=0.0)
+    assert watcher.Poll() == [4,14,24]
+    blocks = MMPP.ReadMeshtalfile(path)
+    for old,new in zip(watcher.blocks,blocks):
+        assert np.array_equal(old.values,new.values)
+    assert [len(watcher.history[t]) for t in (4,14,24)] == [1,1,1]
+
+
+def test_unchanged_file_is_not_read(meshtal):
+    path = meshtal(nx=3,ny=4,nz=2,num_tallies=2)
+    watcher = MMPP.MeshTalWatcher(path,settle=0.0)
+    watcher.Poll()
+    MMPP.stats.Reset()
+    assert watcher.Poll() == []
+    assert _Phase("scan")["calls"] == 0
+
+    _Touch(path)
+    assert watcher.Poll() == []
+    assert _Phase("scan")["calls"] == 1
+    assert _Phase("checksum")["bytes"] == 0
+    assert _Phase("parse")["calls"] == 0
+
+
+def test_new_dump_is_parsed(meshtal):
+    path = meshtal(nx=3,ny=4,nz=2,num_tallies=2)
+    watcher = MMPP.MeshTalWatcher(path,settle=0.0)
+    watcher.Poll()
+    meshtal(nx=3,ny=4,nz=2,num_tallies=2,seed=1,histories=2.0e6)
+    _Touch(path)
+    assert watcher.Poll() == [4,14]
+    block = MMPP.ReadMeshtalfile(path)[1]
+    assert np.array_equal(watcher.Block(14).values,block.values)
+    assert watcher.Block(14).histories == 2.0e6
+    assert len(watcher.history[14]) == 2
+
+
+def test_verify_checksums_sections(meshtal):
+    path = meshtal(nx=3,ny=4,nz=2,num_tallies=2)
+    blocks = MMPP.ReadMeshtalfile(path)
+    MMPP.WriteMeshtalfile(path,blocks)
+    watcher = MMPP.MeshTalWatcher(path,settle=0.0,verify=True)
+    trusting = MMPP.MeshTalWatcher(path,settle=0.0)
+    watcher.Poll()
+    trusting.Poll()
+
+    # Same header and layout, new results in the second tally only
+    values = blocks[1].data_values.copy()
+    values[...,3] *= 2.0
+    blocks[1].data_values = values
+    MMPP.WriteMeshtalfile(path,blocks)
+    _Touch(path)
+    MMPP.stats.Reset()
+    assert watcher.Poll() == [14]
+    assert _Phase("checksum")["bytes"] > 0
+    assert np.array_equal(watcher.Block(14).values,
+                          MMPP.ReadMeshtalfile(path)[1].values)
+    assert trusting.Poll() == []
@@ -0,0 +1,39 @@
+"""Parallel parsing with workers=: identical to the serial read."""
+
+import numpy as np
+import pytest
+
+import MMPP
+
+
+@pytest.mark.parametrize("layout",["full","compact","sparse"])
+def test_parallel_read_matches_serial(meshtal,layout):
+    path = meshtal(nx=6,ny=5,nz=4,num_tallies=3,zero_fraction=0.4)
+    serial = MMPP.ReadMeshtalfile(path,layout=layout)
+    parallel = MMPP.ReadMeshtalfile(path,layout=layout,workers=2)
+    for a,b in zip(serial,parallel):
+        assert b.layout == layout
+        assert np.array_equal(a.values,b.values)
+        assert np.array_equal(a.rel_error,b.rel_error)
+        assert np.array_equal(a.x_centers,b.x_centers)
+
+
+def test_large_tally_is_cut_into_row_ranges(meshtal,monkeypatch):
+    monkeypatch.setattr(MMPP,"_PARALLEL_MIN_ROWS",50)
+    path = meshtal(nx=10,ny=8,nz=6,num_groups=2)
+    serial = MMPP.ReadMeshtalfile(path)[0]
+    calls = []
+    parallel = MMPP.ReadMeshtalfile(
+        path,workers=3,progress=lambda done,total: calls.append(done))[0]
+    assert np.array_equal(serial.data_values,parallel.data_values)
+    assert len(calls) > 1
+
+
+def test_matrix_format_in_parallel(meshtal):
+    column = MMPP.ReadMeshtalfile(meshtal("c.msht",nx=5,ny=4,nz=3,
+                                          num_tallies=2))
+    matrix = MMPP.ReadMeshtalfile(meshtal("m.msht",nx=5,ny=4,nz=3,
+                                          num_tallies=2,out="ik"),
+                                  workers=2)
+    for a,b in zip(column,matrix):
+        assert np.array_equal(a.values,b.values)